@@ -0,0 +1,215 @@
+"""
+Measures end-to-end latency and API request counts of spoticli commands run against
+the local fake Web API, for libraries of several sizes.
+
+    python -m benchmarks.bench_commands --items 10 --items 1000 --items 50000 \
+        --latency 30 --jitter 10 --output results.json
+
+Pass --baseline with the results of an earlier run to fail when a command got slower
+(beyond --tolerance) or started making more requests.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from statistics import median
+from typing import Any, Optional
+
+import click
+
+from benchmarks.fake_spotify import PLAYLIST_ID, FakeSpotify
+from spoticli.commands.main_setup import STATE_STR
+
+TOKEN_INFO = {
+    "access_token": "bench",
+    "expires_at": 9999999999,
+    "refresh_token": "bench",
+    "scope": STATE_STR,
+    "token_type": "Bearer",
+}
+# name: (arguments, answers to the command's prompts)
+SCENARIOS = {
+    "now": (["now"], ""),
+    "next": (["next"], ""),
+    "rsa": (["rsa"], "y\nq\n"),
+    "spa": (["spa", f"https://open.spotify.com/playlist/{PLAYLIST_ID}"], "y\n"),
+    "recent": (["recent", "-l", "50"], "q\n0\nt\n"),
+    "queue-playlist": (["search", "-t", "playlist", "bench"], "0\nq\ny\n"),
+}
+# queueing a playlist makes a request per track, so it's capped at this many items.
+MAX_QUEUED_ITEMS = 1000
+
+
+def run_command(
+    api: FakeSpotify, args: list[str], answers: str, cache_dir: str
+) -> float:
+    """
+    Runs spoticli in a fresh process against the fake API and returns its wall time
+    in milliseconds.
+    """
+
+    env = {
+        **os.environ,
+        "CACHED_TOKEN_INFO": json.dumps(TOKEN_INFO),
+        "PAGER": "cat",
+        "SPOTICLI_API_PREFIX": api.prefix,
+        "SPOTIPY_CLIENT_ID": "bench",
+        "SPOTIPY_CLIENT_SECRET": "bench",
+        "SPOTIPY_REDIRECT_URI": "http://127.0.0.1/callback",
+        "XDG_CACHE_HOME": cache_dir,
+        "XDG_CONFIG_HOME": cache_dir,
+    }
+    command = [sys.executable, "-c", "from spoticli.spoticli import main; main()"]
+    started = time.perf_counter()
+    result = subprocess.run(
+        command + args, input=answers, env=env, capture_output=True, text=True
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        raise click.ClickException(
+            f"'spoticli {' '.join(args)}' failed:\n{result.stdout}{result.stderr}"
+        )
+    return elapsed
+
+
+def bench_scenario(
+    api: FakeSpotify, name: str, repeat: int, warm: bool
+) -> dict[str, Any]:
+    args, answers = SCENARIOS[name]
+    timings = []
+    with tempfile.TemporaryDirectory() as shared_cache:
+        if warm:
+            run_command(api, args, answers, shared_cache)
+        for _ in range(repeat):
+            api.reset_counts()
+            if warm:
+                timings.append(run_command(api, args, answers, shared_cache))
+                continue
+            with tempfile.TemporaryDirectory() as cache_dir:
+                timings.append(run_command(api, args, answers, cache_dir))
+    return {
+        "scenario": name,
+        "items": api.items,
+        "median_ms": median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        # the counts of the last run, as each run makes the same requests.
+        "requests": sum(api.requests.values()),
+        "rate_limited": api.rate_limited,
+        "endpoints": dict(sorted(api.requests.items())),
+    }
+
+
+def find_regressions(
+    results: list[dict[str, Any]], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """
+    Compares results with those of an earlier run, returning what got worse.
+    """
+
+    previous = {(r["scenario"], r["items"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["items"]))
+        if before is None:
+            continue
+        label = f"{result['scenario']} ({result['items']} items)"
+        if result["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: {before['median_ms']:.0f} ms -> "
+                f"{result['median_ms']:.0f} ms"
+            )
+        # 429s are retried, so they're left out of the comparison.
+        if (
+            result["requests"] - result["rate_limited"]
+            > before["requests"] - before["rate_limited"]
+        ):
+            regressions.append(
+                f"{label}: {before['requests']} -> {result['requests']} requests"
+            )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--items",
+    multiple=True,
+    type=click.IntRange(10, 50000),
+    default=(10, 1000),
+    show_default=True,
+    help="library and playlist sizes to run (repeatable)",
+)
+@click.option(
+    "-s",
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(list(SCENARIOS)),
+    help="commands to run (all by default)",
+)
+@click.option("--repeat", default=5, show_default=True, type=int)
+@click.option("--latency", default=0.0, show_default=True, help="milliseconds")
+@click.option("--jitter", default=0.0, show_default=True, help="milliseconds")
+@click.option("--rate-limit", default=0.0, show_default=True, help="share of 429s")
+@click.option("--warm", is_flag=True, help="keep the caches between runs")
+@click.option("--output", type=click.Path(dir_okay=False), help="write results here")
+@click.option("--baseline", type=click.File("r"), help="results to compare with")
+@click.option("--tolerance", default=0.2, show_default=True, help="allowed slowdown")
+def main(
+    items: tuple[int, ...],
+    scenarios: tuple[str, ...],
+    repeat: int,
+    latency: float,
+    jitter: float,
+    rate_limit: float,
+    warm: bool,
+    output: Optional[str],
+    baseline: Optional[Any],
+    tolerance: float,
+):
+    settings = {
+        "latency_ms": latency,
+        "jitter_ms": jitter,
+        "rate_limit": rate_limit,
+        "repeat": repeat,
+        "warm": warm,
+    }
+    results = []
+    for size in items:
+        for name in scenarios or SCENARIOS:
+            if name == "queue-playlist" and size > MAX_QUEUED_ITEMS:
+                continue
+            with FakeSpotify(size, latency, jitter, rate_limit) as api:
+                result = bench_scenario(api, name, repeat, warm)
+            results.append(result)
+            click.echo(
+                f"{name:<16}{size:>7} items{result['median_ms']:10.1f} ms"
+                f"{result['requests']:7} requests"
+            )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "settings": settings,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if baseline:
+        regressions = find_regressions(results, json.load(baseline), tolerance)
+        if regressions:
+            click.secho("\n".join(["Regressions:", *regressions]), fg="red")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
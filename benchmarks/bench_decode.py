@@ -0,0 +1,87 @@
+"""
+Measures how long decoding API pages takes with and without orjson and pruning.
+
+    python -m benchmarks.bench_decode --repeat 20
+"""
+
+import json
+import time
+from statistics import median
+
+import click
+
+from spoticli.lib import transport
+
+# Spotify lists roughly this many markets for most tracks and albums.
+MARKETS = ["A" + chr(ord("A") + i % 26) for i in range(185)]
+
+
+def saved_albums_page(limit: int = 50, tracks: int = 12) -> bytes:
+    """
+    Builds a page shaped like a GET me/albums response.
+    """
+
+    def artist(i):
+        return {"name": f"Artist {i}", "uri": f"spotify:artist:{i:022d}"}
+
+    items = []
+    for i in range(limit):
+        album = {
+            "album_type": "album",
+            "artists": [artist(i)],
+            "available_markets": MARKETS,
+            "name": f"Album {i}",
+            "release_date": "2020-01-01",
+            "total_tracks": tracks,
+            "uri": f"spotify:album:{i:022d}",
+            "tracks": {
+                "items": [
+                    {
+                        "artists": [artist(i)],
+                        "available_markets": MARKETS,
+                        "duration_ms": 200000 + j,
+                        "name": f"Track {j}",
+                        "uri": f"spotify:track:{i:011d}{j:011d}",
+                    }
+                    for j in range(tracks)
+                ]
+            },
+        }
+        items.append({"added_at": "2022-01-01T00:00:00Z", "album": album})
+    # Spotify pretty-prints its responses.
+    return json.dumps({"items": items, "next": None}, indent=2).encode()
+
+
+def _time(func, content: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - started)
+    return median(timings) * 1000
+
+
+@click.command()
+@click.option("--repeat", default=10, show_default=True, type=int)
+@click.option("--tracks", default=12, show_default=True, type=int)
+def main(repeat: int, tracks: int):
+    content = saved_albums_page(tracks=tracks)
+    pruned = transport.prune(content)
+    click.echo(
+        f"page: {len(content) / 1024:.0f} KiB, pruned: {len(pruned) / 1024:.0f} KiB"
+    )
+    cases = {
+        "json": json.loads,
+        "json + prune": lambda c: json.loads(transport.prune(c)),
+    }
+    if transport.orjson:
+        cases["orjson"] = transport.orjson.loads
+        cases["orjson + prune"] = lambda c: transport.orjson.loads(transport.prune(c))
+    else:
+        click.echo("orjson isn't installed, so only the stdlib decoder is measured.")
+    for name, func in cases.items():
+        click.echo(f"{name:<16}{_time(func, content, repeat):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
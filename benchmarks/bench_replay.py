@@ -0,0 +1,40 @@
+"""
+Measures how long a command takes to parse and render responses replayed from a
+cassette, with no network involved. Record one first with the global --record flag:
+
+    spoticli --record spa.cassette spa URL
+    python -m benchmarks.bench_replay spa.cassette --input y -- spa URL
+"""
+
+import time
+from statistics import median
+
+import click
+from click.testing import CliRunner
+
+from spoticli.spoticli import main as spoticli
+
+
+@click.command()
+@click.argument("cassette", type=click.Path(exists=True, dir_okay=False))
+@click.argument("args", nargs=-1, required=True)
+@click.option("--input", "answers", multiple=True, help="answers to prompts, in order")
+@click.option("--repeat", default=10, show_default=True, type=int)
+def main(cassette: str, args: tuple[str, ...], answers: tuple[str, ...], repeat: int):
+    runner = CliRunner()
+    stdin = "".join(f"{answer}\n" for answer in answers)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = runner.invoke(spoticli, ["--replay", cassette, *args], input=stdin)
+        timings.append((time.perf_counter() - started) * 1000)
+        if result.exit_code:
+            raise click.ClickException(f"the command failed:\n{result.output}")
+    click.echo(
+        f"median {median(timings):.1f} ms, min {min(timings):.1f} ms, "
+        f"max {max(timings):.1f} ms over {repeat} runs"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,638 @@
+"""
+A local stand-in for the parts of the Spotify Web API that spoticli uses, serving a
+synthetic library of any size with configurable latency, jitter and rate limiting.
+
+    python -m benchmarks.fake_spotify --items 50000 --latency 40 --jitter 20
+
+Point spoticli at it with SPOTICLI_API_PREFIX=http://127.0.0.1:PORT/v1/ and any
+CACHED_TOKEN_INFO.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import click
+
+from spoticli.lib.profiler import endpoint
+
+# Spotify lists roughly this many markets for tracks and albums asked for without one.
+MARKETS = ["A" + chr(ord("A") + i % 26) for i in range(185)]
+PLAYLIST_ID = "37i9dQZF1DXbench000000"
+USER_ID = "bench"
+DEVICE_ID = "bench-device"
+TRACKS_PER_ALBUM = 12
+# Every playlist item's album is shared with this many neighbouring items.
+ITEMS_PER_ALBUM = 4
+RECENT_ITEMS = 50
+QUEUE_LISTED = 20
+# Synthetic artists are numbered modulo this, and each has this many albums.
+ARTISTS = 997
+ALBUMS_PER_ARTIST = 60
+
+Handler = Callable[["FakeSpotify", re.Match, dict[str, str], Any], Any]
+ROUTES: list[tuple[str, re.Pattern, Handler]] = []
+
+
+def route(method: str, path: str) -> Callable[[Handler], Handler]:
+    def register(func: Handler) -> Handler:
+        ROUTES.append((method, re.compile(f"/v1/{path}/?$"), func))
+        return func
+
+    return register
+
+
+def _id(i: int) -> str:
+    return f"{i:022d}"
+
+
+def _index(id_or_uri: str) -> int:
+    return int(id_or_uri.rsplit(":", 1)[-1].rsplit("/", 1)[-1])
+
+
+def parse_fields(spec: str) -> dict[str, Any]:
+    """
+    Parses a fields filter such as "next,items(track(uri))" into nested dicts, with
+    None marking a field that's kept whole.
+    """
+
+    tree: dict[str, Any] = {}
+    stack = [tree]
+    name = ""
+    for char in spec + ",":
+        if char in ",()":
+            if name:
+                stack[-1][name.strip()] = None
+            if char == "(":
+                stack[-1][name.strip()] = {}
+                stack.append(stack[-1][name.strip()])
+            elif char == ")":
+                stack.pop()
+            name = ""
+        else:
+            name += char
+    return tree
+
+
+def project(obj: Any, tree: Optional[dict[str, Any]]) -> Any:
+    if tree is None:
+        return obj
+    if isinstance(obj, list):
+        return [project(item, tree) for item in obj]
+    if isinstance(obj, dict):
+        return {
+            name: project(obj[name], subtree)
+            for name, subtree in tree.items()
+            if name in obj
+        }
+    return obj
+
+
+class FakeSpotify:
+    """
+    Serves a synthetic library of `items` saved albums and playlist items, counting
+    the requests made to each endpoint.
+    """
+
+    def __init__(
+        self,
+        items: int = 1000,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: int = 0,
+        seed: int = 0,
+        port: int = 0,
+    ):
+        self.items = items
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.requests: Counter = Counter()
+        self.rate_limited = 0
+        self.queue: list[str] = []
+        # tracks added to playlists, by playlist ID.
+        self.playlists: dict[str, list[str]] = {}
+        self.player = {"index": 0, "is_playing": True, "progress_ms": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _Server(("127.0.0.1", port), _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def prefix(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/v1/"
+
+    def start(self) -> "FakeSpotify":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread:
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeSpotify":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.rate_limited = 0
+
+    def handle(
+        self, method: str, url: str, body: Any
+    ) -> tuple[int, dict[str, str], Any]:
+        """
+        Answers a request with its status, extra headers and JSON payload.
+        """
+
+        parsed = urlparse(url)
+        query = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+        with self._lock:
+            delay = self.latency_ms + self._random.uniform(
+                -self.jitter_ms, self.jitter_ms
+            )
+            limited = self._random.random() < self.rate_limit
+        time.sleep(max(delay, 0) / 1000)
+
+        for route_method, pattern, func in ROUTES:
+            match = pattern.match(parsed.path)
+            if route_method != method or not match:
+                continue
+            with self._lock:
+                # counted by endpoint the way --profile reports them.
+                self.requests[f"{method} {endpoint(parsed.path)}"] += 1
+                self.rate_limited += limited
+            if limited:
+                return 429, {"Retry-After": str(self.retry_after)}, _error(429)
+            payload = func(self, match, query, body)
+            if "fields" in query:
+                payload = project(payload, parse_fields(query["fields"]))
+            return (200 if payload is not None else 204), {}, payload
+        return 404, {}, _error(404)
+
+    # synthetic catalog
+
+    def artist(self, i: int) -> dict[str, Any]:
+        return {
+            "external_urls": {"spotify": f"https://open.spotify.com/artist/{_id(i)}"},
+            "id": _id(i),
+            "name": f"Artist {i}",
+            "type": "artist",
+            "uri": f"spotify:artist:{_id(i)}",
+        }
+
+    def album(self, i: int, market: Optional[str] = None) -> dict[str, Any]:
+        album = {
+            "album_type": "single" if i % 5 == 0 else "album",
+            "artists": [self.artist(i % ARTISTS)],
+            "external_urls": {"spotify": f"https://open.spotify.com/album/{_id(i)}"},
+            "id": _id(i),
+            "images": [],
+            "name": f"Album {i}",
+            "release_date": f"{1970 + i % 50}-01-01",
+            "release_date_precision": "day",
+            "total_tracks": 2 if i % 5 == 0 else TRACKS_PER_ALBUM,
+            "type": "album",
+            "uri": f"spotify:album:{_id(i)}",
+        }
+        if market is None:
+            album["available_markets"] = MARKETS
+        return album
+
+    def track(self, i: int, market: Optional[str] = None) -> dict[str, Any]:
+        track = {
+            "album": self.album(i // TRACKS_PER_ALBUM, market),
+            "artists": [self.artist(i // TRACKS_PER_ALBUM % ARTISTS)],
+            "disc_number": 1,
+            "duration_ms": 180000 + i % 120000,
+            "explicit": False,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{_id(i)}"},
+            "id": _id(i),
+            "is_local": False,
+            "name": f"Track {i}",
+            "popularity": i % 100,
+            "track_number": i % TRACKS_PER_ALBUM + 1,
+            "type": "track",
+            "uri": f"spotify:track:{_id(i)}",
+        }
+        if market is None:
+            track["available_markets"] = MARKETS
+        return track
+
+    def playlist(self) -> dict[str, Any]:
+        return {
+            "collaborative": False,
+            "description": "A synthetic playlist for benchmarks.",
+            "external_urls": {
+                "spotify": f"https://open.spotify.com/playlist/{PLAYLIST_ID}"
+            },
+            "id": PLAYLIST_ID,
+            "name": "Bench",
+            "owner": {"display_name": USER_ID, "id": USER_ID},
+            "public": True,
+            "tracks": {"total": self.items},
+            "type": "playlist",
+            "uri": f"spotify:playlist:{PLAYLIST_ID}",
+        }
+
+    def page(
+        self,
+        path: str,
+        query: dict[str, str],
+        total: int,
+        item: Callable[[int], Any],
+        max_limit: int = 50,
+    ) -> dict[str, Any]:
+        limit = min(int(query.get("limit", 20)), max_limit)
+        offset = int(query.get("offset", 0))
+
+        def link(at):
+            if at < 0 or at >= total:
+                return None
+            return f"{self.prefix}{path}?{urlencode({**query, 'offset': at})}"
+
+        return {
+            "href": link(offset),
+            "items": [item(i) for i in range(offset, min(offset + limit, total))],
+            "limit": limit,
+            "next": link(offset + limit),
+            "offset": offset,
+            "previous": link(offset - limit) if offset else None,
+            "total": total,
+        }
+
+
+def _error(status: int) -> dict[str, Any]:
+    return {"error": {"status": status, "message": "fake spotify"}}
+
+
+# user and devices
+
+
+@route("GET", "me")
+def _me(api, match, query, body):
+    return {"display_name": USER_ID, "id": USER_ID, "uri": f"spotify:user:{USER_ID}"}
+
+
+@route("GET", "me/player/devices")
+def _devices(api, match, query, body):
+    return {
+        "devices": [
+            {
+                "id": DEVICE_ID,
+                "is_active": True,
+                "is_private_session": False,
+                "is_restricted": False,
+                "name": "Bench",
+                "type": "Computer",
+                "volume_percent": 50,
+            }
+        ]
+    }
+
+
+# playback
+
+
+@route("GET", "me/player")
+def _current_playback(api, match, query, body):
+    return {
+        "actions": {"disallows": {"resuming": api.player["is_playing"]}},
+        "context": {"type": "playlist", "uri": f"spotify:playlist:{PLAYLIST_ID}"},
+        "currently_playing_type": "track",
+        "device": _devices(api, match, query, body)["devices"][0],
+        "is_playing": api.player["is_playing"],
+        "item": api.track(api.player["index"], query.get("market")),
+        "progress_ms": api.player["progress_ms"],
+        "repeat_state": "off",
+        "shuffle_state": False,
+        "timestamp": int(time.time() * 1000),
+    }
+
+
+@route("PUT", "me/player")
+def _transfer_playback(api, match, query, body):
+    return None
+
+
+@route("PUT", "me/player/play")
+def _start_playback(api, match, query, body):
+    uris = (body or {}).get("uris")
+    if uris:
+        api.player["index"] = _index(uris[0])
+    api.player["is_playing"] = True
+    return None
+
+
+@route("PUT", "me/player/pause")
+def _pause_playback(api, match, query, body):
+    api.player["is_playing"] = False
+    return None
+
+
+@route("POST", "me/player/next")
+def _next_track(api, match, query, body):
+    api.player["index"] += 1
+    api.player["progress_ms"] = 0
+    return None
+
+
+@route("POST", "me/player/previous")
+def _previous_track(api, match, query, body):
+    api.player["index"] = max(api.player["index"] - 1, 0)
+    api.player["progress_ms"] = 0
+    return None
+
+
+@route("PUT", "me/player/(seek|volume|shuffle|repeat)")
+def _player_setting(api, match, query, body):
+    if match.group(1) == "seek":
+        api.player["progress_ms"] = int(query["position_ms"])
+    return None
+
+
+@route("POST", "me/player/queue")
+def _add_to_queue(api, match, query, body):
+    api.queue.append(query["uri"])
+    return None
+
+
+@route("GET", "me/player/queue")
+def _queue(api, match, query, body):
+    current = api.track(api.player["index"], query.get("market"))
+    # like Spotify, only the next few tracks are listed.
+    return {
+        "currently_playing": current,
+        "queue": [api.track(_index(uri)) for uri in api.queue[:QUEUE_LISTED]],
+    }
+
+
+@route("GET", "me/player/recently-played")
+def _recently_played(api, match, query, body):
+    limit = min(int(query.get("limit", 20)), RECENT_ITEMS)
+    return {
+        "cursors": {"after": "1", "before": "0"},
+        "items": [
+            {
+                "context": None,
+                "played_at": f"2022-01-01T00:{i // 60:02d}:{i % 60:02d}.000Z",
+                "track": api.track(i * 7),
+            }
+            for i in range(limit)
+        ],
+        "limit": limit,
+        "next": None,
+    }
+
+
+# library
+
+
+@route("GET", "me/albums")
+def _saved_albums(api, match, query, body):
+    def item(i):
+        album = api.album(i, query.get("market"))
+        album["tracks"] = {
+            "items": [
+                api.track(i * TRACKS_PER_ALBUM + j, query.get("market"))
+                for j in range(album["total_tracks"])
+            ],
+            "total": album["total_tracks"],
+        }
+        return {"added_at": "2022-01-01T00:00:00Z", "album": album}
+
+    return api.page("me/albums", query, api.items, item)
+
+
+# newer spotipy releases use the library endpoints that take URIs of any type.
+@route("GET", "me/(?:albums|library)/contains")
+def _saved_albums_contains(api, match, query, body):
+    ids = query.get("ids") or query["uris"]
+    return [_index(id_) % 3 == 0 for id_ in ids.split(",")]
+
+
+@route("PUT", "me/(?:albums|library)")
+def _save_albums(api, match, query, body):
+    return None
+
+
+@route("GET", "me/tracks")
+def _saved_tracks(api, match, query, body):
+    return api.page(
+        "me/tracks",
+        query,
+        api.items,
+        lambda i: {
+            "added_at": "2022-01-01T00:00:00Z",
+            "track": api.track(i, query.get("market")),
+        },
+    )
+
+
+# catalog
+
+
+@route("GET", "albums/([0-9A-Za-z]+)/tracks")
+def _album_tracks(api, match, query, body):
+    album = api.album(_index(match.group(1)))
+    start = _index(match.group(1)) * TRACKS_PER_ALBUM
+    return api.page(
+        f"albums/{match.group(1)}/tracks",
+        query,
+        album["total_tracks"],
+        lambda i: api.track(start + i, query.get("market")),
+    )
+
+
+@route("GET", "albums/([0-9A-Za-z]+)")
+def _album(api, match, query, body):
+    return api.album(_index(match.group(1)), query.get("market"))
+
+
+@route("GET", "tracks/([0-9A-Za-z]+)")
+def _track(api, match, query, body):
+    return api.track(_index(match.group(1)), query.get("market"))
+
+
+@route("GET", "albums")
+def _albums(api, match, query, body):
+    return {
+        "albums": [
+            api.album(_index(id_), query.get("market"))
+            for id_ in query["ids"].split(",")
+        ]
+    }
+
+
+@route("GET", "tracks")
+def _tracks(api, match, query, body):
+    return {
+        "tracks": [
+            api.track(_index(id_), query.get("market"))
+            for id_ in query["ids"].split(",")
+        ]
+    }
+
+
+@route("GET", "artists/([0-9A-Za-z]+)/albums")
+def _artist_albums(api, match, query, body):
+    artist = _index(match.group(1)) % ARTISTS
+    return api.page(
+        f"artists/{match.group(1)}/albums",
+        query,
+        ALBUMS_PER_ARTIST,
+        lambda i: api.album(artist + i * ARTISTS, query.get("market")),
+    )
+
+
+@route("GET", "audio-features")
+def _audio_features(api, match, query, body):
+    return {
+        "audio_features": [
+            {
+                "danceability": _index(id_) % 100 / 100,
+                "energy": _index(id_) % 90 / 100,
+                "id": id_,
+                "key": _index(id_) % 12,
+                "tempo": 80.0 + _index(id_) % 100,
+                "time_signature": 4,
+                "uri": f"spotify:track:{id_}",
+            }
+            for id_ in query["ids"].split(",")
+        ]
+    }
+
+
+@route("GET", "search")
+def _search(api, match, query, body):
+    results: dict[str, Any] = {}
+    for type_ in query["type"].split(","):
+        if type_ == "playlist":
+            item: Callable[[int], Any] = lambda i: api.playlist()  # noqa: E731
+        elif type_ == "album":
+            item = api.album
+        elif type_ == "artist":
+            item = api.artist
+        else:
+            item = api.track
+        results[f"{type_}s"] = api.page("search", query, 1000, item)
+    return results
+
+
+# playlists
+
+
+@route("GET", "playlists/([0-9A-Za-z]+)/(?:tracks|items)")
+def _playlist_items(api, match, query, body):
+    return api.page(
+        f"playlists/{match.group(1)}/tracks",
+        query,
+        api.items,
+        lambda i: {
+            "added_at": "2022-01-01T00:00:00Z",
+            "is_local": False,
+            "track": api.track(i // ITEMS_PER_ALBUM * TRACKS_PER_ALBUM + i % 3),
+        },
+        max_limit=100,
+    )
+
+
+@route("GET", "me/playlists")
+def _current_user_playlists(api, match, query, body):
+    return api.page("me/playlists", query, 1, lambda i: api.playlist())
+
+
+@route("POST", "users/([^/]+)/playlists")
+def _create_playlist(api, match, query, body):
+    playlist_id = _id(len(api.playlists) + 1)
+    api.playlists[playlist_id] = []
+    return {
+        **api.playlist(),
+        "external_urls": {
+            "spotify": f"https://open.spotify.com/playlist/{playlist_id}"
+        },
+        "id": playlist_id,
+        "name": body["name"],
+        "tracks": {"total": 0},
+        "uri": f"spotify:playlist:{playlist_id}",
+    }
+
+
+@route("POST", "playlists/([0-9A-Za-z]+)/tracks")
+def _add_playlist_items(api, match, query, body):
+    # older spotipy releases send the URIs as a bare list.
+    uris = body["uris"] if isinstance(body, dict) else body
+    api.playlists.setdefault(match.group(1), []).extend(uris)
+    return {"snapshot_id": "bench"}
+
+
+@route("PUT", "playlists/([0-9A-Za-z]+)/tracks")
+def _replace_playlist_items(api, match, query, body):
+    api.playlists[match.group(1)] = list(body["uris"])
+    return {"snapshot_id": "bench"}
+
+
+class _Server(ThreadingHTTPServer):
+    # room for the connections concurrent clients open at once, which would otherwise
+    # wait out a SYN retransmit.
+    request_queue_size = 128
+
+
+def _make_handler(api: FakeSpotify) -> type:
+    class RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = json.loads(raw) if raw else None
+            status, headers, payload = api.handle(self.command, self.path, body)
+            content = b"" if payload is None else json.dumps(payload).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if content:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_PUT = do_POST = do_DELETE = _respond
+
+        def log_message(self, *args):
+            pass
+
+    return RequestHandler
+
+
+@click.command()
+@click.option("--items", default=1000, show_default=True, type=int)
+@click.option("--latency", default=0.0, show_default=True, help="milliseconds")
+@click.option("--jitter", default=0.0, show_default=True, help="milliseconds")
+@click.option("--rate-limit", default=0.0, show_default=True, help="share of 429s")
+@click.option("--port", default=8765, show_default=True, type=int)
+def main(items: int, latency: float, jitter: float, rate_limit: float, port: int):
+    api = FakeSpotify(items, latency, jitter, rate_limit, port=port).start()
+    click.echo(f"Serving {items} items at {api.prefix} (Ctrl+C to stop).")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
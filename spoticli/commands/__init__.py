@@ -1,9 +1,17 @@
 from .add_current_track_to_playlists import add_current_track_to_playlists  # noqa
+from .batch import batch  # noqa
+from .build_playlist import build_playlist  # noqa
+from .daemon import run_daemon, subscribe  # noqa
 from .get_random_saved_album import get_random_saved_album  # noqa
-from .main_setup import setup_session  # noqa
+from .jobs import resume_job, show_jobs  # noqa
+from .main_setup import load_settings, setup_session  # noqa
+from .queue_by import queue_by  # noqa
+from .queue_items import queue_items  # noqa
 from .recently_played import recently_played  # noqa
 from .save_playlist_items import save_playlist_items  # noqa
 from .search import search  # noqa
 from .seek import seek  # noqa
+from .shell import shell  # noqa
 from .start_playback import start_playback  # noqa
-from .volume import decrease_volume, increase_volume  # noqa
+from .trace import summarize_traces  # noqa
+from .volume import decrease_volume, fade_volume, increase_volume  # noqa
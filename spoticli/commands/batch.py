@@ -0,0 +1,84 @@
+import shlex
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TextIO
+
+import click
+from click import Context
+from click.exceptions import Abort, ClickException, Exit
+from requests.exceptions import RequestException
+from spotipy.client import SpotifyException
+
+# Commands that manage sessions of their own or never return.
+NOT_BATCHABLE = ("batch", "cfg", "daemon", "shell", "subscribe")
+MAX_PARALLEL_LINES = 8
+
+
+def run_command_line(ctx: Context, argv: list[str]) -> None:
+    """
+    Runs a single spoticli command line against the session already set up in the
+    context of the main group.
+    """
+
+    name, *args = argv
+    cmd = ctx.command.get_command(ctx, name)  # type: ignore[attr-defined]
+    if cmd is None or name in NOT_BATCHABLE:
+        raise click.UsageError(f"'{name}' can't be run here.")
+    with cmd.make_context(name, args, parent=ctx) as sub_ctx:
+        cmd.invoke(sub_ctx)
+
+
+def batch(ctx: Context, script: TextIO, keep_going: bool) -> None:
+    """
+    Runs spoticli commands from a script, one per line, sharing the session, device
+    and connection pool of a single invocation.
+
+    Lines ending in '&' run alongside the lines that follow them; the next line
+    without '&' waits for all of them to finish first.
+    """
+
+    ok = True
+    background: list[Future] = []
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_LINES) as executor:
+        for line_no, line in enumerate(script, start=1):
+            try:
+                argv = shlex.split(line, comments=True)
+            except ValueError as e:
+                click.secho(f"Line {line_no}: {e}.", fg="red", err=True)
+                argv, ok = [], False
+            if argv and argv[-1] == "&":
+                background.append(
+                    executor.submit(run_and_report, ctx, argv[:-1], f"Line {line_no}: ")
+                )
+                continue
+            ok &= all(future.result() for future in background)
+            background.clear()
+            if argv and (ok or keep_going):
+                ok &= run_and_report(ctx, argv, f"Line {line_no}: ")
+            if not (ok or keep_going):
+                break
+        ok &= all(future.result() for future in background)
+
+    if not ok:
+        ctx.exit(1)
+
+
+def run_and_report(ctx: Context, argv: list[str], prefix: str = "") -> bool:
+    """
+    Runs a command line, reporting any error instead of raising it.
+
+    Returns whether the command succeeded.
+    """
+
+    try:
+        run_command_line(ctx, argv)
+    except Exit as e:
+        return e.exit_code == 0
+    except ClickException as e:
+        click.secho(f"{prefix}{e.format_message()}", fg="red", err=True)
+    except Abort:
+        click.secho(f"{prefix}Aborted.", fg="red", err=True)
+    except (SpotifyException, RequestException) as e:
+        click.secho(f"{prefix}{e}", fg="red", err=True)
+    else:
+        return True
+    return False
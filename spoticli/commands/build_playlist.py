@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Iterable, Optional
+
+import click
+from spotipy.client import Spotify
+
+from spoticli.lib.async_client import AsyncSpotiCLIClient
+from spoticli.lib.jobs import Job, run_job
+from spoticli.lib.output import status
+from spoticli.lib.uris import abort_on_invalid, parse_uris
+
+
+def build_playlist(
+    sp_auth: Spotify,
+    user: str,
+    name: str,
+    lines: Iterable[str],
+    mode: Optional[str] = None,
+    **create_kwargs: Any,
+) -> None:
+    """
+    Fills a playlist with every track, album and playlist listed, in order.
+
+    A new playlist is created unless mode is "append" or "replace" and the user
+    already has a playlist with that name, in which case the tracks are added to it
+    or replace its tracks.
+    """
+
+    uris, invalid = parse_uris(lines)
+    abort_on_invalid(invalid)
+    user = user or sp_auth.me()["id"]
+
+    status(f"Retrieving the tracks of {len(uris)} items...")
+    tracks = asyncio.run(_get_track_uris(sp_auth, uris))
+
+    playlist = _find_playlist(sp_auth, user, name) if mode else None
+    if playlist is None:
+        playlist = sp_auth.user_playlist_create(user=user, name=name, **create_kwargs)
+        click.secho(f"Playlist '{name}' created successfully!", fg="green")
+    replace = mode == "replace"
+    if replace and not tracks:
+        sp_auth.playlist_replace_items(playlist["id"], [])
+    if tracks:
+        job = Job.create(
+            "playlist",
+            tracks,
+            f"playlist '{name}'",
+            {"playlist_id": playlist["id"], "replace": replace},
+        )
+        run_job(sp_auth, job)
+    click.secho(
+        f"{len(tracks)} tracks {'set as' if replace else 'added to'} '{name}'.",
+        fg="green",
+    )
+
+
+async def _get_track_uris(sp_auth: Spotify, uris: list[str]) -> list[str]:
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        expanded = await asyncio.gather(*(aio.track_uris(uri) for uri in uris))
+    return [track for tracks in expanded for track in tracks]
+
+
+def _find_playlist(sp_auth: Spotify, user: str, name: str) -> Optional[dict[str, Any]]:
+    offset = 0
+    while True:
+        playlists_res = sp_auth.current_user_playlists(limit=50, offset=offset)
+        for playlist in playlists_res["items"]:
+            # only playlists the user owns can be changed.
+            if playlist["name"] == name and playlist["owner"]["id"] == user:
+                return playlist
+        if not playlists_res.get("next"):
+            return None
+        offset += 50
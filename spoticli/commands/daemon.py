@@ -0,0 +1,318 @@
+import json
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Full, Queue
+from typing import Any, Optional
+
+import click
+from click.exceptions import Abort
+from requests.exceptions import RequestException
+from spotipy.client import Spotify, SpotifyException
+
+from spoticli.lib.auth import SpotiCLIOAuth, keep_token_fresh
+from spoticli.lib.metrics import CONTENT_TYPE, Metrics, start_metrics
+from spoticli.lib.state import write_atomic
+from spoticli.lib.util import get_current_playback
+
+# Subscribers that fall this many events behind are disconnected rather than allowed
+# to grow an unbounded backlog in the daemon.
+SUBSCRIBER_BACKLOG = 64
+# Progress drifting further than this from the extrapolated position is reported as
+# a seek.
+SEEK_TOLERANCE_MS = 3000
+METRICS_FILE_INTERVAL = 15.0
+
+
+def build_playback_event(res: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Builds a subscriber event from the response returned by Spotify.current_playback.
+    """
+
+    if not res or not res.get("item"):
+        return {"event": "idle", "timestamp": time.time()}
+
+    return {
+        "event": "playback",
+        "timestamp": time.time(),
+        "is_playing": res["is_playing"],
+        "progress_ms": res["progress_ms"],
+        "device": res["device"]["name"],
+        "playback": get_current_playback(res, display=False),
+    }
+
+
+class PlaybackBroadcaster:
+    """
+    Polls the current playback once per interval and fans every change out to all
+    subscribers, so the polling cost doesn't depend on how many clients are attached.
+    """
+
+    def __init__(self, sp_auth: Spotify, interval: float):
+        self.sp_auth = sp_auth
+        self.interval = interval
+        self.stopped = threading.Event()
+        self._subscribers: set[Queue] = set()
+        self._lock = threading.Lock()
+        self._last_event: Optional[dict[str, Any]] = None
+        self._last_line: Optional[str] = None
+
+    def subscribe(self) -> Queue:
+        subscriber: Queue = Queue(maxsize=SUBSCRIBER_BACKLOG)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            # new subscribers get the current state straight away instead of waiting
+            # for the next change.
+            if self._last_line:
+                subscriber.put_nowait(self._last_line)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event: dict[str, Any]) -> None:
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            self._last_event = event
+            self._last_line = line
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(line)
+                except Full:
+                    self._subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        self.stopped.set()
+        with self._lock:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.put_nowait(None)
+                except Full:
+                    pass
+            self._subscribers.clear()
+
+    def poll_forever(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                event = build_playback_event(self.sp_auth.current_playback())
+            except (SpotifyException, RequestException) as e:
+                click.secho(f"Polling playback failed: {e}", fg="red", err=True)
+            else:
+                if self._has_changed(event):
+                    self.publish(event)
+            self.stopped.wait(self.interval)
+
+    def _has_changed(self, event: dict[str, Any]) -> bool:
+        last = self._last_event
+        if last is None or last["event"] != event["event"]:
+            return True
+        if event["event"] == "idle":
+            return False
+        if any(last[key] != event[key] for key in ("is_playing", "device", "playback")):
+            return True
+        expected_ms = last["progress_ms"]
+        if last["is_playing"]:
+            expected_ms += (event["timestamp"] - last["timestamp"]) * 1000
+        return abs(event["progress_ms"] - expected_ms) > SEEK_TOLERANCE_MS
+
+
+class _NDJSONHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broadcaster = self.server.broadcaster  # type: ignore[attr-defined]
+        subscriber = broadcaster.subscribe()
+        try:
+            while True:
+                line = subscriber.get()
+                if line is None:
+                    break
+                self.wfile.write(line.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+
+class _NDJSONServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, broadcaster: PlaybackBroadcaster):
+        self.broadcaster = broadcaster
+        super().__init__(socket_path, _NDJSONHandler)
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/events":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        broadcaster = self.server.broadcaster  # type: ignore[attr-defined]
+        subscriber = broadcaster.subscribe()
+        try:
+            while True:
+                line = subscriber.get()
+                if line is None:
+                    break
+                self.wfile.write(f"data: {line.rstrip()}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SSEServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, broadcaster: PlaybackBroadcaster):
+        self.broadcaster = broadcaster
+        super().__init__(("127.0.0.1", port), _SSEHandler)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, metrics: Metrics):
+        self.metrics = metrics
+        super().__init__(("127.0.0.1", port), _MetricsHandler)
+
+
+def _write_metrics_forever(
+    metrics: Metrics, path: Path, stopped: threading.Event
+) -> None:
+    # textfile collectors read whatever is there, so each write replaces the file.
+    while not stopped.wait(METRICS_FILE_INTERVAL):
+        write_atomic(metrics.render(), path)
+
+
+def _claim_socket(socket_path: Path) -> None:
+    if not socket_path.exists():
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            # left behind by a daemon that didn't shut down cleanly.
+            socket_path.unlink()
+            return
+    click.secho(f"A daemon is already listening on {socket_path}.", fg="red")
+    raise Abort()
+
+
+def run_daemon(
+    sp_auth: Spotify,
+    socket_path: str,
+    port: Optional[int],
+    interval: float,
+    metrics_port: Optional[int] = None,
+    metrics_file: Optional[str] = None,
+) -> None:
+    """
+    Polls playback and streams state changes to subscribers as NDJSON events.
+
+    The shared access token is refreshed ahead of its expiry while the daemon runs,
+    so other invocations don't have to. Metrics about the daemon's API usage can be
+    served in the OpenMetrics format on a port or written to a file for a textfile
+    collector.
+    """
+
+    path = Path(socket_path)
+    _claim_socket(path)
+    metrics = start_metrics() if metrics_port or metrics_file else None
+    broadcaster = PlaybackBroadcaster(sp_auth, interval)
+    servers: list[socketserver.BaseServer] = [_NDJSONServer(str(path), broadcaster)]
+    if port:
+        servers.append(_SSEServer(port, broadcaster))
+    if metrics_port:
+        servers.append(_MetricsServer(metrics_port, metrics))  # type: ignore[arg-type]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    if isinstance(sp_auth.auth_manager, SpotiCLIOAuth):
+        threading.Thread(
+            target=keep_token_fresh,
+            args=(sp_auth.auth_manager, broadcaster.stopped),
+            daemon=True,
+        ).start()
+    if metrics_file:
+        threading.Thread(
+            target=_write_metrics_forever,
+            args=(metrics, Path(metrics_file), broadcaster.stopped),
+            daemon=True,
+        ).start()
+
+    click.secho(f"Serving playback events on {path}", fg="green")
+    if port:
+        click.secho(f"Serving SSE on http://127.0.0.1:{port}/events", fg="green")
+    if metrics_port:
+        click.secho(
+            f"Serving metrics on http://127.0.0.1:{metrics_port}/metrics", fg="green"
+        )
+    try:
+        broadcaster.poll_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broadcaster.close()
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        if metrics_file:
+            write_atomic(metrics.render(), Path(metrics_file))  # type: ignore[union-attr]
+        path.unlink(missing_ok=True)
+
+
+def subscribe(socket_path: str, text: bool) -> None:
+    """
+    Prints playback events from a running daemon as they arrive.
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError) as e:
+            click.secho(
+                "No daemon is running. Start one with 'spoticli daemon'.", fg="red"
+            )
+            raise Abort() from e
+        try:
+            for line in conn.makefile("r"):
+                click.echo(_format_event(line) if text else line.rstrip())
+        except KeyboardInterrupt:
+            pass
+
+
+def _format_event(line: str) -> str:
+    event = json.loads(line)
+    if event["event"] == "idle":
+        return "Nothing is playing."
+    playback = event["playback"]
+    state = "Playing" if event["is_playing"] else "Paused"
+    return f"{state}: {playback['track_name']} by {playback['artists']}"
@@ -2,12 +2,15 @@ import random
 
 import click
 from click import style
+from click.exceptions import Abort
 from spotipy.client import Spotify
 
+from spoticli.lib.async_client import AsyncSpotiCLIClient, run_async_iter
+from spoticli.lib.models import Album
+from spoticli.lib.output import is_machine_readable, row_writer, status
 from spoticli.lib.util import (
     Y_N_CHOICE_CASE_INSENSITIVE,
     add_album_to_queue,
-    get_artist_names,
     play_or_queue,
     truncate,
     wait_display_playback,
@@ -16,29 +19,43 @@ from spoticli.lib.util import (
 
 def get_random_saved_album(sp_auth: Spotify, device: str):
     """
-    Fetches all albums in user library and selects one randomly.
+    Selects an album from the user library randomly.
     """
 
-    saved_albums = _get_saved_albums(sp_auth)
+    if is_machine_readable():
+        # emit the library as it's retrieved instead of picking interactively.
+        with row_writer() as rows:
+            for album in _iter_saved_albums(sp_auth):
+                rows.write(
+                    {
+                        "album_uri": album.uri,
+                        "artists": album.artists,
+                        "album": album.name,
+                    }
+                )
+        return
 
-    # Pick a random index that corresponds to an album URI
-    initial_i = random.randint(0, len(saved_albums))
-    selected_i = _select_album(saved_albums, initial_i)
+    total = sp_auth.current_user_saved_albums(limit=1)["total"]
+    if not total:
+        click.secho("There are no albums in the user library.", fg="red")
+        raise Abort()
+    selected_album = _select_album(sp_auth, total)
 
     queue = play_or_queue()
     if queue == "q":
-        add_album_to_queue(sp_auth, saved_albums[selected_i]["album_uri"])
+        add_album_to_queue(sp_auth, selected_album.uri)
     else:
-        sp_auth.start_playback(
-            context_uri=saved_albums[selected_i]["album_uri"], device_id=device
-        )
+        sp_auth.start_playback(context_uri=selected_album.uri, device_id=device)
         wait_display_playback(sp_auth)
 
 
-def _select_album(saved_albums, rand_i):
+def _select_album(sp_auth, total):
     while True:
-        album = saved_albums[rand_i]["album"]
-        artists = truncate(saved_albums[rand_i]["artists"])
+        # only the album at a random position is fetched rather than the whole
+        # library, so picking one takes a single request however large it is.
+        saved_album = _get_saved_album(sp_auth, random.randrange(total))
+        album = saved_album.name
+        artists = truncate(saved_album.artists)
         click.echo(
             f"Selected album: {style(album, fg='blue')} by {style(artists, fg='green')}."
         )
@@ -47,37 +64,24 @@ def _select_album(saved_albums, rand_i):
             type=Y_N_CHOICE_CASE_INSENSITIVE,
             show_choices=True,
         )
-        if new_album == "n":
-            # Pick a random index that corresponds to an album URI
-            rand_i = random.randint(0, len(saved_albums))
-        else:
-            break
-    return rand_i
+        if new_album == "y":
+            return saved_album
 
 
-def _get_saved_albums(sp_auth):
-    saved_albums = []
-    offset = 0
-    # Only 50 albums can be retrieved at a time, so make as many requests as
-    # necessary to retrieve all in library.
-    while True:
-        albums_res = sp_auth.current_user_saved_albums(limit=50, offset=offset)
-        if offset == 0:
-            click.secho(
-                "Retrieving saved albums. This may take a few moments...",
-                fg="magenta",
-            )
-        albums = albums_res["items"]
-        saved_albums.extend(
-            {
-                "album_uri": album["album"]["uri"],
-                "artists": get_artist_names(album["album"]),
-                "album": album["album"]["name"],
-            }
-            for album in albums
-        )
-        if len(albums) < 50:
-            break
-        else:
-            offset += 50
-    return saved_albums
+def _get_saved_album(sp_auth, offset):
+    album = sp_auth.current_user_saved_albums(limit=1, offset=offset)["items"][0]
+    return Album.from_json(album["album"])
+
+
+def _iter_saved_albums(sp_auth):
+    status("Retrieving saved albums. This may take a few moments...")
+    return run_async_iter(_saved_albums(sp_auth))
+
+
+async def _saved_albums(sp_auth):
+    # Only 50 albums can be retrieved at a time, so every page after the first is
+    # requested at once.
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        async for albums_res in aio.pages(aio.current_user_saved_albums, 50):
+            for album in albums_res["items"]:
+                yield Album.from_json(album["album"])
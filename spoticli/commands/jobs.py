@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Any, Optional
+
+import click
+from spotipy.client import Spotify
+
+from spoticli.lib.jobs import Job, list_jobs, load_job, run_job
+from spoticli.lib.output import row_writer
+
+
+def show_jobs() -> None:
+    """
+    Lists the bulk jobs with their progress, throughput and expected time left.
+    """
+
+    jobs = list_jobs()
+    if not jobs:
+        click.secho("No bulk jobs have been started yet.", fg="red")
+        return
+    with row_writer() as rows:
+        for job in jobs:
+            rows.write(_job_row(job))
+
+
+def resume_job(sp_auth: Spotify, job_id: str, device: Optional[str]) -> None:
+    """
+    Continues a bulk job from the first batch Spotify hasn't acknowledged.
+    """
+
+    job = load_job(job_id)
+    if job.is_finished:
+        click.secho(f"Job {job.id} has already finished.", fg="green")
+        return
+    if job.is_running:
+        click.secho(f"Job {job.id} is still running.", fg="red")
+        return
+    if device and job.kind == "queue":
+        job.params["device"] = device
+    click.secho(
+        f"Resuming job {job.id} at item {job.done_items + 1} of {len(job.items)}...",
+        fg="magenta",
+    )
+    run_job(sp_auth, job)
+    click.secho(f"Job {job.id} finished successfully!", fg="green")
+
+
+def _job_row(job: Job) -> dict[str, Any]:
+    throughput = job.throughput()
+    eta = job.eta()
+    if job.is_finished:
+        state = "finished"
+    elif job.is_running:
+        state = "running"
+    else:
+        state = "stopped"
+    return {
+        "id": job.id,
+        "job": job.description,
+        "progress": f"{job.done_items}/{len(job.items)}",
+        "state": state,
+        "items/s": f"{throughput:.1f}" if throughput else "",
+        "eta": _format_duration(eta) if eta is not None else "",
+        "created": datetime.fromtimestamp(job.created).strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{seconds:02d}s"
@@ -13,9 +13,13 @@ from click.exceptions import Abort
 from spotipy import Spotify
 from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.client import SpotifyException
-from spotipy.oauth2 import SpotifyOAuth, SpotifyOauthError
+from spotipy.oauth2 import SpotifyOauthError
 
+from spoticli.lib.auth import LEGACY_TOKEN_CACHE, LockedCacheHandler, SpotiCLIOAuth
+from spoticli.lib.cassette import get_cassette
+from spoticli.lib.client import SpotiCLIClient
 from spoticli.lib.exceptions import NoDevicesFound
+from spoticli.lib.profiler import phase
 from spoticli.lib.util import display_table
 
 CACHED_TOKEN_INFO = os.environ.get("CACHED_TOKEN_INFO")
@@ -32,53 +36,76 @@ states = [
     "user-read-recently-played",
 ]
 STATE_STR = " ".join(states)
+# ctx.invoked_subcommand holds the command name, not the name of its function.
+NO_AUTH_REQUIRED = ("cfg", "trace")
 NO_DEVICE_REQUIRED = (
-    "create_playlist",
-    "now_playing",
-    "add_current_track_to_playlists",
-    "save_playlist_albums",
+    "cp",
+    "now",
+    "actp",
+    "spa",
+    "daemon",
+    "subscribe",
+    "jobs",
 )
 PAUSE_AFTER_PLAYBACK_TRANSFER = (
-    "get_random_saved_album",
-    "recently_played",
+    "rsa",
+    "recent",
     "search",
-    "add_to_queue",
+    "atq",
+    "queue-by",
 )
 CONFIG_DIR = Path(user_config_dir("spoticli", "joebonneau"))
 CONFIG_FILE = CONFIG_DIR / "spoticli.ini"
+DEFAULT_SETTINGS: dict[str, Any] = {"fast": False, "trace": False, "hedge": False}
 
 
 def setup_session(ctx: Context) -> tuple[Spotify, str, str]:
 
     sp_auth = None
+    device_id = None
     client_id = None
     client_secret = None
     redirect_uri = None
     user = None
     subcmd = ctx.invoked_subcommand
-    if subcmd != "cfg":
-        token_info = None
-        if CACHED_TOKEN_INFO:
-            token_info = json.loads(CACHED_TOKEN_INFO)
-        elif CONFIG_FILE.exists():
-            client_id, client_secret, redirect_uri, user = _parse_config()
+    if subcmd not in NO_AUTH_REQUIRED:
+        if _is_replaying():
+            # every response comes from the cassette, so no credentials are needed.
+            sp_auth = SpotiCLIClient(auth="replay")
         else:
-            click.secho("Authorization failed. Try running 'spoticli cfg'.", fg="red")
-            raise Abort()
-
-        cache_handler = (
-            MemoryCacheHandler(token_info=token_info) if token_info else None
-        )
-        sp_auth = _get_auth(client_id, client_secret, redirect_uri, cache_handler)
+            token_info = None
+            with phase("config"):
+                if CACHED_TOKEN_INFO:
+                    token_info = json.loads(CACHED_TOKEN_INFO)
+                elif CONFIG_FILE.exists():
+                    client_id, client_secret, redirect_uri, user = _parse_config()
+                else:
+                    click.secho(
+                        "Authorization failed. Try running 'spoticli cfg'.", fg="red"
+                    )
+                    raise Abort()
+
+            with phase("auth"):
+                cache_handler = (
+                    MemoryCacheHandler(token_info=token_info) if token_info else None
+                )
+                sp_auth = _get_auth(
+                    client_id, client_secret, redirect_uri, cache_handler
+                )
 
-        device_id = None
         if ctx.invoked_subcommand not in NO_DEVICE_REQUIRED:
-            devices_res = sp_auth.devices()
-            device_id = _get_device(subcmd, sp_auth, devices_res)
+            with phase("devices"):
+                devices_res = sp_auth.devices()
+                device_id = _get_device(subcmd, sp_auth, devices_res)
 
     return sp_auth, device_id, user
 
 
+def _is_replaying() -> bool:
+    cassette = get_cassette()
+    return cassette is not None and cassette.replaying
+
+
 def _parse_config():
     try:
         config = ConfigParser()
@@ -99,6 +126,22 @@ def _parse_config():
     return client_id, client_secret, redirect_uri, user
 
 
+def load_settings() -> dict[str, Any]:
+    """
+    Reads the optional [settings] section of the config file.
+    """
+
+    settings = dict(DEFAULT_SETTINGS)
+    if CONFIG_FILE.exists():
+        config = ConfigParser()
+        config.read(CONFIG_FILE)
+        if config.has_section("settings"):
+            section = config["settings"]
+            for name in DEFAULT_SETTINGS:
+                settings[name] = section.getboolean(name, fallback=settings[name])
+    return settings
+
+
 def _get_device(subcmd, sp_auth, devices_res):
     try:
         device_id, is_active = check_devices(devices_res)
@@ -119,13 +162,14 @@ def _get_device(subcmd, sp_auth, devices_res):
 
 def _get_auth(client_id, client_secret, redirect_uri, cache_handler):
     try:
-        sp_auth = Spotify(
-            auth_manager=SpotifyOAuth(
+        sp_auth = SpotiCLIClient(
+            auth_manager=SpotiCLIOAuth(
                 scope=STATE_STR,
                 client_id=client_id,
                 client_secret=client_secret,
                 redirect_uri=redirect_uri,
-                cache_handler=cache_handler,
+                cache_handler=cache_handler
+                or LockedCacheHandler(legacy_path=LEGACY_TOKEN_CACHE),
             )
         )
     except (SpotifyException, SpotifyOauthError) as e:
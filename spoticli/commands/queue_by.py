@@ -0,0 +1,262 @@
+from pathlib import Path
+from typing import Any, Optional
+
+import click
+from click.exceptions import Abort
+from spotipy.client import Spotify
+from tqdm import tqdm
+
+from spoticli.lib.paths import CACHE_DIR
+from spoticli.lib.util import display_table, get_artist_names, truncate
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional extra
+    np = None  # type: ignore[assignment]
+
+FEATURE_MATRIX = CACHE_DIR / "saved_track_features.npz"
+FEATURE_COLUMNS = (
+    "tempo",
+    "key",
+    "mode",
+    "energy",
+    "danceability",
+    "valence",
+    "acousticness",
+    "instrumentalness",
+    "loudness",
+)
+# Features compared when looking for tracks similar to the current one. Key and mode
+# are categorical, so they're left to the explicit filters.
+SIMILARITY_COLUMNS = (
+    "tempo",
+    "energy",
+    "danceability",
+    "valence",
+    "acousticness",
+    "instrumentalness",
+    "loudness",
+)
+PITCH_CLASSES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+FLATS = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+
+
+def parse_range(ctx, param, value: Optional[str]) -> Optional[tuple[float, float]]:
+    """
+    Parses a range option formatted as LOW-HIGH (or a single value).
+    """
+
+    if value is None:
+        return None
+    low, _, high = value.partition("-")
+    try:
+        bounds = (float(low), float(high or low))
+    except ValueError as e:
+        raise click.BadParameter("Ranges are formatted as LOW-HIGH.") from e
+    if bounds[0] > bounds[1]:
+        raise click.BadParameter("The low end of the range exceeds the high end.")
+    return bounds
+
+
+def parse_key(ctx, param, value: Optional[str]) -> Optional[int]:
+    """
+    Parses a pitch class given either as an integer (0-11) or a note name (C, F#, Bb).
+    """
+
+    if value is None:
+        return None
+    if value.isdigit() and int(value) < len(PITCH_CLASSES):
+        return int(value)
+    note = value[:1].upper() + value[1:]
+    note = FLATS.get(note, note)
+    if note not in PITCH_CLASSES:
+        raise click.BadParameter("Keys are a note name (C, F#, Bb) or 0-11.")
+    return PITCH_CLASSES.index(note)
+
+
+def load_feature_matrix(path: Path = FEATURE_MATRIX) -> tuple[Any, Any]:
+    if not path.exists():
+        return np.array([], dtype=str), np.empty((0, len(FEATURE_COLUMNS)))
+    with np.load(path, allow_pickle=False) as data:
+        return data["uris"], data["features"]
+
+
+def refresh_feature_matrix(
+    sp_auth: Spotify, full: bool = False, path: Path = FEATURE_MATRIX
+) -> tuple[Any, Any]:
+    """
+    Brings the cached feature matrix of saved tracks up to date.
+
+    Saved tracks are returned most recently added first, so an incremental refresh
+    stops at the first track already in the matrix and only fetches features for
+    the tracks saved since. A full refresh also drops tracks removed from the library.
+    """
+
+    uris, features = load_feature_matrix(path)
+    known = set() if full else set(uris.tolist())
+    new_uris = []
+    offset = 0
+    while True:
+        saved_res = sp_auth.current_user_saved_tracks(limit=50, offset=offset)
+        # local files have no Spotify ID, so there are no audio features for them.
+        page_uris = [
+            item["track"]["uri"]
+            for item in saved_res["items"]
+            if not item["track"].get("is_local")
+        ]
+        unseen = [uri for uri in page_uris if uri not in known]
+        new_uris.extend(unseen)
+        if len(unseen) < len(page_uris) or len(saved_res["items"]) < 50:
+            break
+        offset += 50
+
+    new_features = np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+    if new_uris:
+        click.secho(
+            f"Fetching audio features for {len(new_uris)} saved tracks...",
+            fg="magenta",
+        )
+        # the client fetches these in batches of 100 IDs.
+        new_features = np.array(
+            [
+                [_feature_value(item, column) for column in FEATURE_COLUMNS]
+                for item in sp_auth.audio_features(new_uris)
+            ],
+            dtype=np.float32,
+        )
+
+    if full:
+        uris, features = np.array(new_uris, dtype=str), new_features
+    else:
+        uris = np.concatenate((np.array(new_uris, dtype=str), uris))
+        features = np.concatenate((new_features, features.astype(np.float32)))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(f, uris=uris, features=features)
+    return uris, features
+
+
+def _feature_value(item: Optional[dict[str, Any]], column: str) -> float:
+    # tracks without analysis stay in the matrix as NaN rows, so they're known to
+    # incremental refreshes but never match a filter.
+    return np.nan if item is None else float(item[column])
+
+
+def _key_name(key: float) -> str:
+    # Spotify reports -1 when no key was detected.
+    return PITCH_CLASSES[int(key)] if key >= 0 else "-"
+
+
+def filter_tracks(
+    features: Any,
+    ranges: dict[str, tuple[float, float]],
+    key: Optional[int] = None,
+) -> Any:
+    """
+    Returns a boolean mask of the rows matching every range and the key, if given.
+    """
+
+    mask = np.ones(len(features), dtype=bool)
+    for column, (low, high) in ranges.items():
+        values = features[:, FEATURE_COLUMNS.index(column)]
+        mask &= (values >= low) & (values <= high)
+    if key is not None:
+        mask &= features[:, FEATURE_COLUMNS.index("key")] == key
+    return mask
+
+
+def nearest_tracks(features: Any, target: Any, mask: Any, limit: int) -> Any:
+    """
+    Returns the indices of the masked rows closest to the target feature vector,
+    nearest first, after standardizing each feature.
+    """
+
+    columns = [FEATURE_COLUMNS.index(column) for column in SIMILARITY_COLUMNS]
+    candidates = features[:, columns]
+    mean = np.nanmean(candidates, axis=0)
+    std = np.nanstd(candidates, axis=0)
+    std[std == 0] = 1
+    distances = np.linalg.norm(
+        (candidates - mean) / std - (target[columns] - mean) / std, axis=1
+    )
+    distances[~mask | np.isnan(distances)] = np.inf
+    limit = min(limit, int(np.isfinite(distances).sum()))
+    if not limit:
+        return np.array([], dtype=int)
+    nearest = np.argpartition(distances, limit - 1)[:limit]
+    return nearest[np.argsort(distances[nearest])]
+
+
+def queue_by(
+    sp_auth: Spotify,
+    device: str,
+    ranges: dict[str, Optional[tuple[float, float]]],
+    key: Optional[int],
+    similar: bool,
+    limit: int,
+    refresh: bool,
+) -> None:
+    """
+    Queues saved tracks matching the given audio feature ranges, or the ones most
+    similar to the current track.
+    """
+
+    if np is None:
+        click.secho(
+            "queue-by requires numpy. Install it with 'poetry install -E queue-by'.",
+            fg="red",
+        )
+        raise Abort()
+
+    uris, features = refresh_feature_matrix(sp_auth, full=refresh)
+    mask = filter_tracks(
+        features,
+        {column: bounds for column, bounds in ranges.items() if bounds},
+        key=key,
+    )
+    if similar:
+        playback = sp_auth.current_playback()
+        if not playback or not playback.get("item"):
+            click.secho("No current playback to compare against.", fg="red")
+            raise Abort()
+        if playback.get("currently_playing_type", "track") != "track":
+            click.secho("Only tracks can be compared against, not episodes.", fg="red")
+            raise Abort()
+        track_uri = playback["item"]["uri"]
+        target = np.array(
+            [
+                _feature_value(sp_auth.audio_features(track_uri)[0], column)
+                for column in FEATURE_COLUMNS
+            ],
+            dtype=np.float32,
+        )
+        mask &= uris != track_uri
+        selected = nearest_tracks(features, target, mask, limit)
+    else:
+        selected = np.flatnonzero(mask)
+        selected = np.random.permutation(selected)[:limit]
+
+    if not len(selected):
+        click.secho("No saved tracks match the given criteria.", fg="red")
+        return
+
+    tracks = sp_auth.tracks(uris[selected].tolist())["tracks"]
+    # tracks that are no longer available come back as None.
+    found = [(track, row) for track, row in zip(tracks, features[selected]) if track]
+    selected_uris = [track["uri"] for track, _ in found]
+    display_table(
+        [
+            {
+                "index": i,
+                "name": truncate(track["name"]),
+                "artist(s)": truncate(get_artist_names(track)),
+                "bpm": round(float(row[FEATURE_COLUMNS.index("tempo")])),
+                "key": _key_name(row[FEATURE_COLUMNS.index("key")]),
+                "energy": round(float(row[FEATURE_COLUMNS.index("energy")]), 2),
+            }
+            for i, (track, row) in enumerate(found)
+        ]
+    )
+    for uri in tqdm(selected_uris):
+        sp_auth.add_to_queue(uri, device_id=device)
+    click.secho(f"{len(selected_uris)} tracks added to queue!", fg="green")
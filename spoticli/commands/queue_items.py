@@ -0,0 +1,60 @@
+import asyncio
+from typing import Iterable, Optional
+
+import click
+from click.exceptions import Abort
+from spotipy.client import Spotify
+
+from spoticli.lib.async_client import AsyncSpotiCLIClient
+from spoticli.lib.jobs import Job, run_job
+from spoticli.lib.output import status
+from spoticli.lib.uris import abort_on_invalid, parse_uris
+
+
+def queue_items(sp_auth: Spotify, lines: Iterable[str], device: Optional[str]) -> None:
+    """
+    Adds every track, album and playlist listed to the queue, in order. Albums and
+    playlists are expanded into their tracks, and tracks that are listed twice or
+    already queued are left out.
+    """
+
+    uris, invalid = parse_uris(lines)
+    abort_on_invalid(invalid)
+    if not uris:
+        click.secho("No tracks, albums or playlists were given.", fg="red")
+        raise Abort()
+
+    status(f"Retrieving the tracks of {len(uris)} items...")
+    tracks, queued = asyncio.run(_resolve(sp_auth, uris))
+    unique = list(dict.fromkeys(tracks))
+    new = [uri for uri in unique if uri not in queued]
+    skipped = len(tracks) - len(new)
+    if not new:
+        click.secho("All of the tracks are already in the queue.", fg="green")
+        return
+
+    job = Job.create(
+        "queue", new, f"queue {len(uris)} listed items", {"device": device}
+    )
+    run_job(sp_auth, job)
+    click.secho(
+        f"{len(new)} tracks added to the queue"
+        + (f" ({skipped} duplicates or already queued left out)." if skipped else "."),
+        fg="green",
+    )
+
+
+async def _resolve(sp_auth: Spotify, uris: list[str]) -> tuple[list[str], set[str]]:
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        # albums and playlists listed more than once are only expanded once.
+        distinct = list(dict.fromkeys(uris))
+        queue, *expanded = await asyncio.gather(
+            aio.queue(), *(aio.track_uris(uri) for uri in distinct)
+        )
+    tracks_of = dict(zip(distinct, expanded))
+    tracks = [track for uri in uris for track in tracks_of[uri]]
+    queue = queue or {}
+    queued = {item["uri"] for item in queue.get("queue") or [] if item}
+    if queue.get("currently_playing"):
+        queued.add(queue["currently_playing"]["uri"])
+    return tracks, queued
@@ -4,10 +4,12 @@ import click
 from click import Choice, IntRange
 from spotipy.client import Spotify
 
+from spoticli.lib.jobs import Job, run_job
+from spoticli.lib.models import PlayEvent
+from spoticli.lib.output import is_machine_readable, row_writer
 from spoticli.lib.types import CommaSeparatedIndexRange
 from spoticli.lib.util import (
     add_album_to_queue,
-    display_table,
     get_index,
     play_or_queue,
     wait_display_playback,
@@ -20,111 +22,86 @@ def recently_played(sp_auth: Spotify, after: str, limit: int, device: str, user:
     """
     recent_playback = sp_auth.current_user_recently_played(limit=limit, after=after)
 
-    positions, recent_playback, track_uris = _parse_recent_playback(recent_playback)
+    events = _parse_recent_playback(recent_playback)
+    if is_machine_readable() or not events:
+        return
 
     task = play_or_queue(create_playlist=True)
     if task == "cp":
-        _create_playlist_from_recent_playback(sp_auth, user, positions, track_uris)
+        _create_playlist_from_recent_playback(sp_auth, user, events)
     else:
-        index = get_index(IntRange(min=0, max=len(positions) - 1))
+        index = get_index(IntRange(min=0, max=len(events) - 1))
         item_type = click.prompt(
             "Track or associated album?",
             type=Choice(("t", "a"), case_sensitive=False),
             show_choices=True,
         )
         handler = RP_FUNC_DICT[task]
-        handler(sp_auth, device, recent_playback, index, item_type)
+        handler(sp_auth, device, events[index].track, item_type)
 
 
-def _handle_queue(sp_auth, device, recent_dict, index, item_type):
+def _handle_queue(sp_auth, device, track, item_type):
     if item_type == "t":
-        sp_auth.add_to_queue(recent_dict["track_uri"][index], device_id=device)
+        sp_auth.add_to_queue(track.uri, device_id=device)
         click.secho("Track successfully added to the queue.", fg="green")
     else:
-        add_album_to_queue(sp_auth, recent_dict["album_uri"][index])
+        add_album_to_queue(sp_auth, track.album.uri)
 
 
-def _handle_play(sp_auth, device, recent_dict, index, item_type):
+def _handle_play(sp_auth, device, track, item_type):
     if item_type == "t":
-        sp_auth.start_playback(uris=[recent_dict["track_uri"][index]], device_id=device)
+        sp_auth.start_playback(uris=[track.uri], device_id=device)
     else:
-        sp_auth.start_playback(
-            context_uri=recent_dict["album_uri"][index],
-            device_id=device,
-        )
+        sp_auth.start_playback(context_uri=track.album.uri, device_id=device)
     wait_display_playback(sp_auth)
 
 
 RP_FUNC_DICT = {"q": _handle_queue, "p": _handle_play}
 
 
-def _create_playlist_from_recent_playback(sp_auth, user, positions, track_uris):
+def _create_playlist_from_recent_playback(sp_auth, user, events):
 
     indices = click.prompt(
         "Enter the indices of the tracks to add to the playlist separated by commas",
-        type=CommaSeparatedIndexRange([str(i) for i in positions]),
+        type=CommaSeparatedIndexRange([str(i) for i in range(len(events))]),
         show_choices=False,
     )
     playlist_name = click.prompt("Enter the playlist name")
 
-    sp_auth.user_playlist_create(user=user, name=playlist_name)
-    playlist_res = sp_auth.current_user_playlists(limit=1)
-    playlist_uri = playlist_res["items"][0]["uri"]
-    sp_auth.playlist_add_items(
-        playlist_uri,
-        track_uris[indices[0] : indices[1] + 1],
+    playlist = sp_auth.user_playlist_create(user=user, name=playlist_name)
+    uris = [event.track.uri for event in events[indices[0] : indices[1] + 1]]
+    job = Job.create(
+        "playlist", uris, f"playlist '{playlist_name}'", {"playlist_id": playlist["id"]}
     )
+    run_job(sp_auth, job)
     click.secho(
         f"Playlist '{playlist_name}' created successfully!",
         fg="green",
     )
 
 
-def _parse_recent_playback(
-    res: dict[str, Any]
-) -> tuple[list[int], dict[str, list], list[str]]:
+def _parse_recent_playback(res: dict[str, Any]) -> list[PlayEvent]:
     """
     Parses the response returned by Spotify.current_user_recently_played and displays a
-    table of information.
+    table of information (or emits each row as it's parsed in machine-readable output).
     """
 
-    positions = []
-    track_names = []
-    track_uris = []
-    album_names = []
-    album_uris = []
-    album_types = []
-    timestamps = []
-    playback_items = res["items"]
-    for i, item in enumerate(playback_items):
-        positions.append(i)
-        track_names.append(item["track"]["name"])
-        track_uris.append(item["track"]["uri"])
-        album_names.append(item["track"]["album"]["name"])
-        album_uris.append(item["track"]["album"]["uri"])
-        album_types.append(item["track"]["album"]["album_type"])
-        timestamps.append(item["played_at"])
-
-    recent_dict = {
-        "index": positions,
-        "track_name": track_names,
-        "track_uri": track_uris,
-        "album_name": album_names,
-        "album_uri": album_uris,
-        "album_type": album_types,
-        "timestamp": timestamps,
-    }
-    display_dict = {
-        k: recent_dict[k]
-        for k in (
-            "index",
-            "track_name",
-            "album_type",
-            "album_name",
-            "timestamp",
-        )
-    }
-
-    display_table(display_dict)
-
-    return positions, recent_dict, track_uris
+    events = []
+    with row_writer(stream=True) as rows:
+        for i, item in enumerate(res["items"]):
+            event = PlayEvent.from_json(item)
+            events.append(event)
+            album = event.track.album
+            rows.write(
+                {
+                    "index": i,
+                    "track_name": event.track.name,
+                    "album_type": album.album_type,  # type: ignore[union-attr]
+                    "album_name": album.name,  # type: ignore[union-attr]
+                    "timestamp": event.played_at,
+                },
+                track_uri=event.track.uri,
+                album_uri=album.uri,  # type: ignore[union-attr]
+            )
+
+    return events
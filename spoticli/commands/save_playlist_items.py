@@ -1,38 +1,63 @@
-from typing import Any, Tuple
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Iterator
 
 import click
 from spotipy.client import Spotify
 
+from spoticli.lib.async_client import AsyncSpotiCLIClient, run_async_iter
+from spoticli.lib.jobs import Job, run_job
+from spoticli.lib.models import Album
+from spoticli.lib.output import is_machine_readable, row_writer, status
+from spoticli.lib.projections import PLAYLIST_ALBUMS
 from spoticli.lib.types import CommaSeparatedIndices
-from spoticli.lib.util import (
-    Y_N_CHOICE_CASE_INSENSITIVE,
-    display_table,
-    get_artist_names,
-    truncate,
-)
+from spoticli.lib.util import Y_N_CHOICE_CASE_INSENSITIVE, truncate
 
-FIELDS = (
-    "items(track(album(album_type,artists(name),name,total_tracks,uri,release_date)))"
-)
+PAGE_SIZE = 100
+# Spotify checks and saves at most this many albums per request.
+ALBUM_BATCH_SIZE = 20
+COLUMN_WIDTHS = {
+    "index": 5,
+    "artists": 40,
+    "album": 40,
+    "album_type": 10,
+    "total_tracks": 12,
+    "release_date": 12,
+}
 
 
 def save_playlist_items(sp_auth: Spotify, url: str) -> None:
 
-    click.secho("Retrieving all albums and EPs from the playlist...", fg="magenta")
-    unsaved_items, uris = _parse_playlist_items(sp_auth, url)
-    display_table(unsaved_items)
-    _handle_prompts(sp_auth, uris)
+    status("Retrieving all albums and EPs from the playlist...")
+    uris: list[str] = []
+    with row_writer(stream=True, widths=COLUMN_WIDTHS) as rows:
+        for album in _parse_playlist_items(sp_auth, url):
+            rows.write(
+                {
+                    "index": len(uris),
+                    "artists": truncate(album.artists, 40),
+                    "album": truncate(album.name, 40),
+                    "album_type": "EP" if album.album_type == "single" else "album",
+                    "total_tracks": album.total_tracks,
+                    "release_date": album.release_date,
+                },
+                uri=album.uri,
+            )
+            uris.append(album.uri)
+    if is_machine_readable() or not uris:
+        return
+    _handle_prompts(sp_auth, url, uris)
     click.secho("Albums successfully added to user library!", fg="green")
 
 
-def _handle_prompts(sp_auth: Spotify, uris: list[str]) -> None:
+def _handle_prompts(sp_auth: Spotify, url: str, uris: list[str]) -> None:
     add_all_albums = click.prompt(
         "Add all albums to user library?",
         type=Y_N_CHOICE_CASE_INSENSITIVE,
         show_choices=True,
     )
     if add_all_albums == "y":
-        sp_auth.current_user_saved_albums_add(albums=uris)
+        album_sublist = uris
     else:
         album_selection = click.prompt(
             "Enter the indices of albums to add (separated by a comma)",
@@ -40,45 +65,59 @@ def _handle_prompts(sp_auth: Spotify, uris: list[str]) -> None:
             show_choices=False,
         )
         album_sublist = [uris[i] for i in album_selection]
-        sp_auth.current_user_saved_albums_add(albums=album_sublist)
-
-
-def _parse_playlist_items(
-    sp_auth: Spotify, url: str
-) -> Tuple[list[dict[str, Any]], list[str]]:
-    playlist_items = sp_auth.playlist_items(playlist_id=url, fields=FIELDS)
-    uris = []
-    album_items = []
-    for item in playlist_items["items"]:
-        item_album = item["track"]["album"]
-        if any(
-            (
-                all(
-                    (
-                        item_album["total_tracks"] > 1,
-                        item_album["album_type"] == "single",
-                    )
-                ),
-                item_album["album_type"] == "album",
-            )
+    job = Job.create("save_albums", album_sublist, f"save albums from {url}")
+    run_job(sp_auth, job)
+
+
+def _parse_playlist_items(sp_auth: Spotify, url: str) -> Iterator[Album]:
+    """
+    Yields the albums and EPs in the playlist that aren't in the user's library yet,
+    in playlist order. Pages of playlist items and library checks are all requested
+    concurrently, and albums are yielded as soon as their checks are done.
+    """
+
+    return run_async_iter(_playlist_albums(sp_auth, url))
+
+
+async def _playlist_albums(sp_auth: Spotify, url: str) -> AsyncIterator[Album]:
+    seen: set[str] = set()
+    checks: deque[tuple[list[Album], asyncio.Future]] = deque()
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        async for playlist_items in aio.pages(
+            aio.playlist_items, PAGE_SIZE, playlist_id=url, fields=PLAYLIST_ALBUMS
         ):
-            album_items.append(item_album)
-            uris.append(item_album["uri"])
-    is_item_saved = sp_auth.current_user_saved_albums_contains(albums=uris)
-    items_with_status = list(zip(album_items, is_item_saved))
-    uris_with_status = list(zip(uris, is_item_saved))
-    unsaved_uris = [uri for uri, status in uris_with_status if not status]
-    unsaved_items = [item for item, status in items_with_status if not status]
-    indices_items = list(enumerate(unsaved_items))
-
-    return [
-        {
-            "index": idx,
-            "artists": truncate(get_artist_names(item), 40),
-            "album": truncate(item["name"], 40),
-            "album_type": "EP" if item["album_type"] == "single" else "album",
-            "total_tracks": item["total_tracks"],
-            "release_date": item["release_date"],
-        }
-        for idx, item in indices_items
-    ], unsaved_uris
+            albums = _new_albums(playlist_items["items"], seen)
+            for i in range(0, len(albums), ALBUM_BATCH_SIZE):
+                batch = albums[i : i + ALBUM_BATCH_SIZE]
+                contains = aio.current_user_saved_albums_contains(
+                    albums=[album.uri for album in batch]
+                )
+                checks.append((batch, asyncio.ensure_future(contains)))
+            while checks and checks[0][1].done():
+                for album in _unsaved(*checks.popleft()):
+                    yield album
+        while checks:
+            batch, check = checks.popleft()
+            await check
+            for album in _unsaved(batch, check):
+                yield album
+
+
+def _new_albums(items: list[dict[str, Any]], seen: set[str]) -> list[Album]:
+    albums = []
+    for item in items:
+        # local files and removed tracks have no album to save.
+        item_album = (item.get("track") or {}).get("album")
+        if not item_album or not item_album.get("uri"):
+            continue
+        if item_album["uri"] in seen:
+            continue
+        album = Album.from_json(item_album)
+        if album.is_full_length:
+            seen.add(album.uri)
+            albums.append(album)
+    return albums
+
+
+def _unsaved(batch: list[Album], check: asyncio.Future) -> list[Album]:
+    return [album for album, saved in zip(batch, check.result()) if not saved]
@@ -1,10 +1,14 @@
+import asyncio
 from typing import Any, Optional
 
 import click
 from click import Choice, IntRange
 from spotipy.client import Spotify, SpotifyException
-from tqdm import tqdm
 
+from spoticli.lib.async_client import AsyncSpotiCLIClient
+from spoticli.lib.jobs import Job, run_job
+from spoticli.lib.output import is_machine_readable, row_writer
+from spoticli.lib.profiler import phase
 from spoticli.lib.util import (
     Y_N_CHOICE_CASE_INSENSITIVE,
     add_album_to_queue,
@@ -49,20 +53,15 @@ def parse_artist_albums(res: dict[str, Any]) -> tuple[list[str], IntRange]:
     albums = []
     uris = []
     for i, item in enumerate(res["items"]):
-        album_type = item["album_type"]
-        artists = truncate(get_artist_names(item))
-        album_name = item["name"]
-        release_date = item["release_date"]
-        total_tracks = item["total_tracks"]
         uris.append(item["uri"])
         albums.append(
             {
                 "index": i,
-                "artist(s)": artists,
-                "album name": album_name,
-                "album type": album_type,
-                "tracks": total_tracks,
-                "release date": release_date,
+                "artist(s)": truncate(get_artist_names(item)),
+                "album name": item["name"],
+                "album type": item["album_type"],
+                "tracks": item["total_tracks"],
+                "release date": item["release_date"],
             }
         )
 
@@ -88,36 +87,29 @@ def add_playlist_to_queue(sp_auth, uri: str, device: Optional[str] = None) -> No
     Adds all tracks from a playlist to the queue.
     """
 
-    offset = 0
     click.secho("Adding playlist tracks to queue...", fg="magenta")
-    while True:
-        playlists_res = sp_auth.playlist_items(
-            uri, limit=100, fields="items.track.uri", offset=offset
-        )
-        for item in tqdm(playlists_res["items"]):
-            sp_auth.add_to_queue(item["track"]["uri"], device_id=device)
-        if len(playlists_res) < 100:
-            break
+    uris = asyncio.run(_get_playlist_track_uris(sp_auth, uri))
+    job = Job.create("queue", uris, f"queue {uri}", {"device": device})
+    run_job(sp_auth, job)
+    click.secho("All playlist tracks added successfully!", fg="green")
 
-        offset += 100
 
-    click.secho("All playlist tracks added successfully!", fg="green")
+async def _get_playlist_track_uris(sp_auth, uri: str) -> list[str]:
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        return await aio.track_uris(uri)
 
 
 def parse_album_search(res: dict[str, Any]) -> tuple[list[dict[str, Any]], list[str]]:
 
-    items = res["albums"]["items"]
     uris = []
     results = []
-    for i, item in enumerate(items):
-        artists = get_artist_names(item)
-        name = item["name"]
+    for i, item in enumerate(res["albums"]["items"]):
         uris.append(item["uri"])
         results.append(
             {
                 "index": i,
-                "artist(s)": truncate(artists),
-                "album title": name,
+                "artist(s)": truncate(get_artist_names(item)),
+                "album title": item["name"],
                 "release date": item["release_date"],
             }
         )
@@ -166,10 +158,8 @@ def artist_search_process(
         show_choices=True,
     )
     if album_or_track == "a":
-        artist_albums_res = sp_auth.artist_albums(
-            uris[index], album_type="album,single"
-        )
-        uris, choices = parse_artist_albums(artist_albums_res)
+        albums = asyncio.run(_get_discography(sp_auth, uris[index]))
+        uris, choices = parse_artist_albums({"items": albums})
     else:
         artist_tracks_res = sp_auth.artist_top_tracks(uris[index])
         uris, choices = parse_artist_top_tracks(artist_tracks_res)
@@ -191,21 +181,30 @@ def artist_search_process(
         click.secho("Successfully added to queue!", fg="green")
 
 
+async def _get_discography(sp_auth: Spotify, artist: str) -> list[dict[str, Any]]:
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        return [
+            album
+            async for page in aio.pages(
+                aio.artist_albums, 50, artist_id=artist, album_type="album,single"
+            )
+            for album in page["items"]
+        ]
+
+
 def parse_playlist_search(
     res: dict[str, Any]
 ) -> tuple[list[dict[str, Any]], list[str]]:
-    items = res["playlists"]["items"]
     uris = []
     results = []
-    for i, item in enumerate(items):
-        desc = item["description"]
+    for i, item in enumerate(res["playlists"]["items"]):
         uris.append(item["uri"])
         results.append(
             {
                 "index": i,
                 "name": truncate(item["name"]),
                 "creator": item["owner"]["display_name"],
-                "description": truncate(desc),
+                "description": truncate(item["description"]),
                 "tracks": item["tracks"]["total"],
             }
         )
@@ -236,19 +235,16 @@ def playlist_search_process(
 
 
 def parse_track_search(res: dict[str, Any]) -> tuple[list[dict[str, Any]], list[str]]:
-    items = res["tracks"]["items"]
     uris = []
     results = []
-    for i, item in enumerate(items):
-        artists = get_artist_names(item)
-        name = item["name"]
+    for i, item in enumerate(res["tracks"]["items"]):
         uris.append(item["uri"])
         results.append(
             {
                 "index": i,
-                "name": name,
+                "name": item["name"],
                 "duration": convert_ms(item["duration_ms"]),
-                "artist(s)": truncate(artists),
+                "artist(s)": truncate(get_artist_names(item)),
                 "album title": item["album"]["name"],
                 "release date": item["album"]["release_date"],
             }
@@ -291,6 +287,10 @@ def search(sp_auth: Spotify, query: str, type_: str, device: str):
     except AttributeError:
         pass
     parse_func, process_func = SEARCH_FUNC_DICT[type_]
-    results, uris = parse_func(search_res)
-    display_table(results)
-    process_func(sp_auth, results, uris, device=device)
+    with phase("parse"):
+        results, uris = parse_func(search_res)
+    with row_writer() as rows:
+        for result, uri in zip(results, uris):
+            rows.write(result, uri=uri)
+    if not is_machine_readable():
+        process_func(sp_auth, results, uris, device=device)
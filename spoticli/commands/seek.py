@@ -1,6 +1,15 @@
+from typing import Any, Optional
+
 import click
+from click.exceptions import Abort
 from spotipy.client import Spotify
 
+from spoticli.lib.state import load_playback_snapshot
+
+# Seeking to the next section while within this much of a boundary skips past it,
+# otherwise repeated presses would land on the section just seeked to.
+SECTION_BOUNDARY_MS = 1000
+
 
 def convert_timestamp(timestamp: str) -> int:
     """
@@ -20,16 +29,99 @@ def convert_timestamp(timestamp: str) -> int:
     return total_ms
 
 
-def seek(sp_auth: Spotify, timestamp: str, device: str):
+def convert_offset(offset: str) -> int:
+    """
+    Converts a relative offset (+SS, -SS, +MM:SS or -MM:SS) to signed milliseconds.
     """
-    Seeks the track to the timestamp specified.
 
-    Timestamp format is MM:SS
+    sign = -1 if offset[0] == "-" else 1
+    amount = offset[1:]
+    offset_ms = convert_timestamp(amount) if ":" in amount else int(amount) * 1000
+    if offset_ms < 0:
+        raise ValueError("Invalid format. Proper format is +SS or -SS.")
+
+    return sign * offset_ms
+
+
+def seek(
+    sp_auth: Spotify,
+    timestamp: Optional[str],
+    device: str,
+    section: Optional[int] = None,
+    next_section: bool = False,
+):
     """
+    Seeks the track to the timestamp specified, by an offset relative to the current
+    position, or to the start of a section.
 
+    Timestamp format is MM:SS, offsets are +SS or -SS.
+    """
+
+    if not any((timestamp, section, next_section)):
+        click.secho("Provide a timestamp, --section or --next-section.", fg="red")
+        raise Abort()
+    if timestamp:
+        relative, target_ms = _parse_target(timestamp)
+        if not relative:
+            sp_auth.seek_track(target_ms, device_id=device)
+            return
+
+    playback = _get_playback_position(sp_auth)
+    if timestamp:
+        position_ms = playback["progress_ms"] + target_ms
+    else:
+        sections = sp_auth.track_sections(playback["track_uri"])
+        position_ms = _get_section_start(
+            sections, playback["progress_ms"], section, next_section
+        )
+    position_ms = min(max(position_ms, 0), playback["duration_ms"] - 1)
+    sp_auth.seek_track(position_ms, device_id=device)
+
+
+def _parse_target(timestamp: str) -> tuple[bool, int]:
     try:
-        timestamp_in_ms = convert_timestamp(timestamp)
-    except ValueError as e:
-        click.secho(str(e), fg="red")
+        if timestamp[0] in "+-":
+            return True, convert_offset(timestamp)
+        return False, convert_timestamp(timestamp)
+    except (ValueError, IndexError) as e:
+        click.secho("Invalid format. Proper format is MM:SS, +SS or -SS.", fg="red")
+        raise Abort() from e
+
+
+def _get_playback_position(sp_auth: Spotify) -> dict[str, Any]:
+    # the position of the last playback read can usually be extrapolated, which
+    # saves a round trip before every relative seek.
+    playback = load_playback_snapshot()
+    if playback is None:
+        res = sp_auth.current_playback()
+        if not res or not res.get("item"):
+            click.secho("No current playback to seek.", fg="red")
+            raise Abort()
+        playback = {
+            "track_uri": res["item"]["uri"],
+            "duration_ms": res["item"]["duration_ms"],
+            "progress_ms": res["progress_ms"],
+        }
+    return playback
+
 
-    sp_auth.seek_track(timestamp_in_ms, device_id=device)
+def _get_section_start(
+    sections: list[int],
+    progress_ms: int,
+    section: Optional[int],
+    next_section: bool,
+) -> int:
+    if next_section:
+        upcoming = [
+            start for start in sections if start > progress_ms + SECTION_BOUNDARY_MS
+        ]
+        if not upcoming:
+            click.secho("Playback is already in the last section.", fg="red")
+            raise Abort()
+        return upcoming[0]
+    if section is None or not 1 <= section <= len(sections):
+        click.secho(
+            f"Invalid section. This track has sections 1-{len(sections)}.", fg="red"
+        )
+        raise Abort()
+    return sections[section - 1]
@@ -0,0 +1,136 @@
+import shlex
+from typing import Any, Optional
+
+import click
+from click import Context
+
+from spoticli.commands.batch import NOT_BATCHABLE, run_and_report
+
+try:
+    import readline
+except ImportError:  # not available on Windows
+    readline = None  # type: ignore[assignment]
+
+PROMPT = "spoticli> "
+EXIT_COMMANDS = ("exit", "quit")
+
+
+class ShellCompleter:
+    """
+    Completes command names, options, device IDs and Spotify URLs from the playlists,
+    devices and search results the session already has in memory, without waiting on
+    a request.
+    """
+
+    def __init__(self, ctx: Context):
+        self.ctx = ctx
+        self.sp_auth = ctx.obj["sp_auth"]
+        self.matches: list[str] = []
+
+    def complete(self, text: str, state: int) -> Optional[str]:
+        if state == 0:
+            try:
+                tokens = shlex.split(readline.get_line_buffer(), posix=False)
+            except ValueError:
+                return None
+            if text:
+                tokens = tokens[:-1]
+            self.matches = sorted(
+                candidate
+                for candidate in self._candidates(tokens, text)
+                if candidate.startswith(text)
+            )
+        return self.matches[state] if state < len(self.matches) else None
+
+    def _candidates(self, tokens: list[str], text: str) -> list[str]:
+        if not tokens:
+            return self.command_names() + list(EXIT_COMMANDS)
+        cmd = self.ctx.command.get_command(  # type: ignore[attr-defined]
+            self.ctx, tokens[0]
+        )
+        if cmd is None:
+            return []
+        if tokens[-1] == "--device":
+            return self.device_ids()
+        if text.startswith("-"):
+            return [
+                opt
+                for param in cmd.get_params(self.ctx)
+                if isinstance(param, click.Option)
+                for opt in param.opts + param.secondary_opts
+            ]
+        return self.urls()
+
+    def command_names(self) -> list[str]:
+        return [
+            name
+            for name in self.ctx.command.list_commands(self.ctx)  # type: ignore
+            if name not in NOT_BATCHABLE
+        ]
+
+    def device_ids(self) -> list[str]:
+        devices_res = self.sp_auth.peek_session_cache("devices") or {"devices": []}
+        return [device["id"] for device in devices_res["devices"]]
+
+    def urls(self) -> list[str]:
+        playlists_res = self.sp_auth.peek_session_cache("playlists", 50, 0)
+        items = list((playlists_res or {"items": []})["items"])
+        for results in (self.sp_auth.last_search or {}).values():
+            items.extend(results["items"])
+        return [_url(item) for item in items if item]
+
+
+def _url(item: dict[str, Any]) -> str:
+    return item["external_urls"]["spotify"]
+
+
+def shell(ctx: Context) -> None:
+    """
+    Runs spoticli commands interactively against one long-lived session.
+    """
+
+    sp_auth = ctx.obj["sp_auth"]
+    sp_auth.enable_session_cache()
+    if readline:
+        # what completions are served from.
+        sp_auth.devices()
+        sp_auth.current_user_playlists(limit=50)
+        completer = ShellCompleter(ctx)
+        readline.set_completer(completer.complete)
+        # URLs and URIs contain characters readline treats as word breaks by default.
+        readline.set_completer_delims(" \t\n")
+        readline.parse_and_bind("tab: complete")
+
+    click.secho(
+        "Type 'help' to list commands, 'help COMMAND' for its usage and 'exit' to "
+        "quit.",
+        fg="magenta",
+    )
+    while True:
+        try:
+            line = input(PROMPT)
+        except EOFError:
+            click.echo()
+            break
+        except KeyboardInterrupt:
+            click.echo()
+            continue
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            click.secho(f"{e}.", fg="red")
+            continue
+        if not argv:
+            continue
+        if argv[0] in EXIT_COMMANDS:
+            break
+        if argv[0] == "help":
+            if len(argv) > 1:
+                run_and_report(ctx, [argv[1], "--help"])
+            else:
+                click.echo(", ".join(ShellCompleter(ctx).command_names()))
+            continue
+        try:
+            run_and_report(ctx, argv)
+        except KeyboardInterrupt:
+            click.echo()
@@ -3,6 +3,7 @@ from typing import Optional
 import click
 from spotipy import Spotify
 
+from spoticli.lib.playback import send_playback_command
 from spoticli.lib.util import (
     check_url_format,
     get_current_playback,
@@ -10,7 +11,9 @@ from spoticli.lib.util import (
 )
 
 
-def start_playback(sp_auth: Spotify, device: str, url: Optional[str]):
+def start_playback(
+    sp_auth: Spotify, device: str, url: Optional[str], fast: bool = False
+):
 
     if url:
         try:
@@ -21,9 +24,16 @@ def start_playback(sp_auth: Spotify, device: str, url: Optional[str]):
         context_uri = valid_url if "track" not in url else None
         sp_auth.start_playback(device_id=device, uris=uri, context_uri=context_uri)
     else:
-        current_playback = sp_auth.current_playback()
-        playback = get_current_playback(current_playback, display=False)
-        if not playback.get("resuming_disallowed"):
-            sp_auth.start_playback(device_id=device)
+        msg = "Playback is already active."
+        resuming_disallowed = False
+        if not fast:
+            current_playback = sp_auth.current_playback()
+            playback = get_current_playback(current_playback, display=False)
+            resuming_disallowed = playback.get("resuming_disallowed")
+        if resuming_disallowed:
+            click.echo(msg)
+        elif send_playback_command(
+            lambda: sp_auth.start_playback(device_id=device), msg
+        ):
             click.secho("Playback resumed.")
     wait_display_playback(sp_auth)
@@ -0,0 +1,70 @@
+import math
+import re
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+import click
+
+from spoticli.lib.output import row_writer
+from spoticli.lib.trace import read_spans
+
+PERCENTILES = (50, 90, 99)
+SINCE_UNITS = {"h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_since(ctx, param, value: Optional[str]) -> Optional[float]:
+    """
+    Parses a period such as 12h, 7d or 2w into the timestamp that long ago.
+    """
+
+    if value is None:
+        return None
+    match = re.fullmatch(r"(\d+)([hdw])", value.strip())
+    if not match:
+        raise click.BadParameter("Periods look like 12h, 7d or 2w.")
+    return time.time() - int(match.group(1)) * SINCE_UNITS[match.group(2)]
+
+
+def summarize_traces(since: Optional[float], daily: bool) -> None:
+    """
+    Reports latency percentiles per command and per endpoint from the trace log.
+
+    Command latencies exclude the time spent waiting on prompts.
+    """
+
+    groups: dict[tuple[str, ...], list[float]] = {}
+    for span in read_spans():
+        if span["kind"] not in ("command", "call") or not span["name"]:
+            continue
+        if since and span["start"] < since:
+            continue
+        key: tuple[str, ...] = (span["kind"], span["name"])
+        if daily:
+            key = (datetime.fromtimestamp(span["start"]).date().isoformat(), *key)
+        groups.setdefault(key, []).append(span["active_ms"])
+
+    if not groups:
+        click.secho("No traces have been recorded yet.", fg="red")
+        return
+    with row_writer() as rows:
+        for key in sorted(groups):
+            rows.write(_latency_row(key, groups[key], daily))
+
+
+def _latency_row(key: tuple[str, ...], latencies: list[float], daily: bool):
+    row: dict[str, Any] = {"date": key[0]} if daily else {}
+    kind, name = key[-2:]
+    row["kind"] = "command" if kind == "command" else "endpoint"
+    row["name"] = name
+    latencies.sort()
+    row["count"] = len(latencies)
+    for p in PERCENTILES:
+        row[f"p{p}_ms"] = round(_percentile(latencies, p), 1)
+    return row
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    # nearest-rank percentile.
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
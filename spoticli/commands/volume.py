@@ -1,28 +1,107 @@
+import re
+import time
+
 import click
+from click.exceptions import Abort
 
+from spoticli.lib.cassette import state_path
+from spoticli.lib.paths import CACHE_DIR
+from spoticli.lib.state import load_cached_volume, locked_state, record_volume
 from spoticli.lib.util import get_current_playback
 
+VOLUME_STATE = CACHE_DIR / "volume.json"
+# Relative changes made within this window of the first one in a burst (e.g. a media
+# key pressed repeatedly) are merged into a single volume request.
+COALESCE_WINDOW = 0.2
+# A burst older than this was abandoned by a process that exited before sending it.
+STALE_BURST = 5.0
+# Minimum time between writes while fading, to stay well clear of the rate limit.
+MIN_WRITE_INTERVAL = 0.5
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60}
+
 
 def increase_volume(amount, device, sp_auth):
-    previous_volume = _get_previous_volume(sp_auth)
-    new_volume = int(round(previous_volume + amount, 0))
-    new_volume = min(new_volume, 100)
-    _set_and_display(device, sp_auth, new_volume)
+    _change_volume(amount, device, sp_auth)
 
 
 def decrease_volume(amount, device, sp_auth):
-    previous_volume = _get_previous_volume(sp_auth)
-    new_volume = int(round(previous_volume - amount, 0))
-    new_volume = max(new_volume, 0)
-    _set_and_display(device, sp_auth, new_volume)
+    _change_volume(-amount, device, sp_auth)
+
+
+def _change_volume(amount, device, sp_auth):
+    """
+    Optimistically applies a relative volume change. The first change of a burst waits
+    briefly for more to arrive and then sends the combined volume in one request.
+    """
+
+    # read before taking the lock, as it may have to ask Spotify, and other changes
+    # shouldn't wait on that.
+    previous = _get_previous_volume(sp_auth)
+    with locked_state(state_path(VOLUME_STATE)) as state:
+        burst = state.get("burst")
+        now = time.monotonic()
+        is_first = not burst or not 0 <= now - burst["started"] <= STALE_BURST
+        if is_first:
+            burst = {"started": now, "previous": previous, "volume": previous}
+        burst["volume"] = _clamp(burst["volume"] + amount)
+        state["burst"] = burst
+    click.secho(f"New volume: {burst['volume']}")
+
+    if is_first:
+        time.sleep(COALESCE_WINDOW)
+        with locked_state(state_path(VOLUME_STATE)) as state:
+            burst = state.pop("burst", burst)
+            # recorded before the request is sent, so that a change made while it's
+            # in flight starts from this volume rather than the one before the burst.
+            recorded_at = record_volume(burst["volume"])
+        try:
+            sp_auth.volume(burst["volume"], device_id=device)
+        except Exception:
+            with locked_state(state_path(VOLUME_STATE)):
+                # unless another change has been recorded since.
+                record_volume(burst["previous"], decided_at=recorded_at)
+            raise
+
+
+def fade_volume(target, duration, device, sp_auth):
+    """
+    Fades the volume to the target over the duration given in seconds, using as few
+    writes as a smooth fade needs.
+    """
+
+    start = _get_previous_volume(sp_auth)
+    steps = min(abs(target - start), int(duration / MIN_WRITE_INTERVAL)) or 1
+    started = time.monotonic()
+    for step in range(1, steps + 1):
+        time.sleep(max(0, started + duration * step / steps - time.monotonic()))
+        sp_auth.volume(round(start + (target - start) * step / steps), device_id=device)
+    click.secho(f"New volume: {target}")
+
+
+def parse_duration(ctx, param, value: str) -> float:
+    """
+    Parses a duration such as 10s, 500ms or 2m into seconds.
+    """
+
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)(ms|s|m)?", value.strip())
+    if not match:
+        raise click.BadParameter("Durations look like 10s, 500ms or 2m.")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
 
 
-def _set_and_display(device, sp_auth, new_volume):
-    sp_auth.volume(new_volume, device_id=device)
-    click.secho(f"New volume: {new_volume}")
+def _clamp(volume):
+    return min(max(int(round(volume, 0)), 0), 100)
 
 
 def _get_previous_volume(sp_auth):
-    current_playback = sp_auth.current_playback()
-    playback = get_current_playback(res=current_playback, display=False)
-    return playback["volume"]
+    # the volume seen by the last playback read or volume write is kept up to date
+    # by the client, which saves a request before every change.
+    volume = load_cached_volume()
+    if volume is None:
+        current_playback = sp_auth.current_playback()
+        playback = get_current_playback(res=current_playback, display=False)
+        volume = playback.get("volume")
+    if volume is None:
+        click.secho("The active device doesn't support volume control.", fg="red")
+        raise Abort()
+    return volume
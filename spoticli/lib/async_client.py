@@ -0,0 +1,418 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import partial
+from queue import Queue
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from spotipy.client import Spotify, SpotifyException
+
+from spoticli.lib.client import metadata_kind
+from spoticli.lib.metrics import get_metrics
+from spoticli.lib.projections import MARKET, PLAYLIST_TRACK_URIS
+from spoticli.lib.transport import SpotiCLISession, decode_json
+
+T = TypeVar("T")
+
+# Requests in flight at once, which is also the most threads and connections used.
+MAX_CONCURRENCY = 16
+# Requests started per second on average, with bursts of up to a second's worth.
+REQUESTS_PER_SECOND = 50
+# Attempts at a request that's rate limited or meets a server error, as spotipy makes.
+MAX_ATTEMPTS = 4
+BACKOFF_FACTOR = 0.3
+RETRIED_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "PUT", "DELETE")
+# Items run_async_iter fetches ahead of the code consuming them.
+PREFETCH = 100
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every request of a client that also caps how many are in
+    flight. A 429 pauses all of them for as long as Spotify asks.
+    """
+
+    def __init__(
+        self, rate: float = REQUESTS_PER_SECOND, concurrency: int = MAX_CONCURRENCY
+    ):
+        self.rate = rate
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> None:
+        await self._slots.acquire()
+        try:
+            async with self._lock:
+                await self._take_token()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def __aexit__(self, *exc) -> None:
+        self._slots.release()
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._resume_at:
+                await asyncio.sleep(self._resume_at - now)
+                continue
+            self._tokens = min(
+                self._tokens + (now - self._updated) * self.rate, float(self.rate)
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncSpotiCLIClient:
+    """
+    Asyncio client for the endpoints bulk commands make hundreds of requests to,
+    sending them concurrently from a single thread under a RateLimiter.
+
+    Requests go through a SpotiCLISession of its own in worker threads, so they're
+    cached, recorded or replayed, reported and proxied like the Spotify object's,
+    whose prefix, token, timeout, proxies, HTTP cache and metadata cache it shares.
+    Retries are left to the client rather than the session's adapters, so that a 429
+    pauses every request.
+
+    Use it as an async context manager so that its threads and connections are
+    closed.
+    """
+
+    def __init__(self, sp: Spotify, limiter: Optional[RateLimiter] = None):
+        self.sp = sp
+        self.limiter = limiter or RateLimiter()
+        self._session = SpotiCLISession(
+            http_cache=getattr(sp._session, "http_cache", None)
+        )
+        adapter = HTTPAdapter(pool_maxsize=MAX_CONCURRENCY, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(
+            MAX_CONCURRENCY, thread_name_prefix="spoticli-request"
+        )
+
+    async def __aenter__(self) -> "AsyncSpotiCLIClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        # requests still in flight finish within the timeout.
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+    # endpoints
+
+    async def playlist_items(
+        self,
+        playlist_id: str,
+        fields: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        market: Optional[str] = MARKET,
+    ) -> dict[str, Any]:
+        plid = self.sp._get_id("playlist", playlist_id)
+        return await self._request(
+            "GET",
+            f"playlists/{plid}/tracks",
+            params={
+                "limit": limit,
+                "offset": offset,
+                "fields": fields,
+                "market": market,
+                "additional_types": "track,episode",
+            },
+        )
+
+    async def current_user_saved_albums(
+        self, limit: int = 50, offset: int = 0, market: Optional[str] = MARKET
+    ) -> dict[str, Any]:
+        return await self._request(
+            "GET",
+            "me/albums",
+            params={"limit": limit, "offset": offset, "market": market},
+        )
+
+    async def current_user_saved_albums_contains(self, albums: list[str]) -> list[bool]:
+        ids = [self.sp._get_id("album", album) for album in albums]
+        return await self._request(
+            "GET", "me/albums/contains", params={"ids": ",".join(ids)}
+        )
+
+    async def current_user_saved_albums_add(self, albums: list[str]) -> None:
+        ids = [self.sp._get_id("album", album) for album in albums]
+        await self._request("PUT", "me/albums", params={"ids": ",".join(ids)})
+
+    async def add_to_queue(self, uri: str, device_id: Optional[str] = None) -> None:
+        await self._request(
+            "POST",
+            "me/player/queue",
+            params={"uri": self.sp._get_uri("track", uri), "device_id": device_id},
+        )
+        metrics = get_metrics()
+        if metrics:
+            metrics.inc("spoticli_queue_items_added")
+
+    async def playlist_add_items(
+        self, playlist_id: str, items: list[str], position: Optional[int] = None
+    ) -> dict[str, Any]:
+        plid = self.sp._get_id("playlist", playlist_id)
+        uris = [self.sp._get_uri("track", item) for item in items]
+        return await self._request(
+            "POST",
+            f"playlists/{plid}/tracks",
+            params={"position": position},
+            payload={"uris": uris},
+        )
+
+    async def playlist_replace_items(
+        self, playlist_id: str, items: list[str]
+    ) -> dict[str, Any]:
+        plid = self.sp._get_id("playlist", playlist_id)
+        uris = [self.sp._get_uri("track", item) for item in items]
+        return await self._request(
+            "PUT", f"playlists/{plid}/tracks", payload={"uris": uris}
+        )
+
+    async def album_tracks(
+        self,
+        album_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        market: Optional[str] = MARKET,
+    ) -> dict[str, Any]:
+        # album tracks are immutable, so they're shared with SpotiCLIClient's cache.
+        metadata_cache = getattr(self.sp, "metadata_cache", None)
+        uri = self.sp._get_uri("album", album_id)
+        kind = metadata_kind(f"album_tracks:{offset}:{limit}", market)
+        page = metadata_cache.get(kind, uri) if metadata_cache else None
+        if page is None:
+            page = await self._request(
+                "GET",
+                f"albums/{self.sp._get_id('album', album_id)}/tracks",
+                params={"limit": limit, "offset": offset, "market": market},
+            )
+            if metadata_cache:
+                metadata_cache.put(kind, uri, page)
+        return page
+
+    async def queue(self) -> Optional[dict[str, Any]]:
+        return await self._request("GET", "me/player/queue")
+
+    async def artist_albums(
+        self,
+        artist_id: str,
+        album_type: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> dict[str, Any]:
+        trid = self.sp._get_id("artist", artist_id)
+        return await self._request(
+            "GET",
+            f"artists/{trid}/albums",
+            params={"album_type": album_type, "limit": limit, "offset": offset},
+        )
+
+    async def pages(
+        self, fetch: Callable[..., Awaitable[dict[str, Any]]], limit: int, **kwargs
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yields every page of a paged endpoint in order. Once the first page gives the
+        total, all of the others are requested at once.
+        """
+
+        first = await fetch(limit=limit, offset=0, **kwargs)
+        yield first
+        rest = [
+            asyncio.ensure_future(fetch(limit=limit, offset=offset, **kwargs))
+            for offset in range(limit, first["total"], limit)
+        ]
+        try:
+            for task in rest:
+                yield await task
+        finally:
+            for task in rest:
+                task.cancel()
+
+    async def track_uris(self, uri: str) -> list[str]:
+        """
+        Returns the URIs of a track, or of every track of an album or playlist.
+        """
+
+        kind = uri.split(":")[1]
+        if kind == "track":
+            return [uri]
+        if kind == "album":
+            return [
+                track["uri"]
+                async for page in self.pages(self.album_tracks, 50, album_id=uri)
+                for track in page["items"]
+            ]
+        return [
+            item["track"]["uri"]
+            async for page in self.pages(
+                self.playlist_items, 100, playlist_id=uri, fields=PLAYLIST_TRACK_URIS
+            )
+            for item in page["items"]
+            # local files and removed tracks have no URI to use.
+            if item.get("track") and item["track"].get("uri")
+        ]
+
+    # transport
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict[str, Any]] = None,
+        payload: Optional[Any] = None,
+    ) -> Any:
+        url = self.sp.prefix + path
+        params = {
+            name: value for name, value in (params or {}).items() if value is not None
+        }
+        for attempt in range(MAX_ATTEMPTS):
+            response = await self._send(method, url, params, payload)
+            status = response.status_code
+            # a POST may have been applied before a server error, so it's only sent
+            # again when it was rate limited.
+            retried = status == 429 or (
+                status in RETRIED_STATUSES and method in IDEMPOTENT_METHODS
+            )
+            if not retried or attempt == MAX_ATTEMPTS - 1:
+                break
+            backoff = BACKOFF_FACTOR * 2**attempt
+            metrics = get_metrics()
+            if status == 429:
+                if metrics:
+                    metrics.inc("spoticli_api_rate_limited")
+                retry_after = response.headers.get("Retry-After")
+                # without a Retry-After, back off as from a server error rather than
+                # trying again straight away.
+                self.limiter.pause(float(retry_after) if retry_after else backoff)
+            else:
+                if metrics:
+                    metrics.inc("spoticli_api_backoff_seconds", backoff)
+                await asyncio.sleep(backoff)
+        if response.status_code >= 400:
+            raise _spotify_exception(
+                url, response.status_code, response.content, dict(response.headers)
+            )
+        return response.json() if response.content else None
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any],
+        payload: Optional[Any],
+    ) -> requests.Response:
+        async with self.limiter:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                partial(self._send_blocking, method, url, params, payload),
+            )
+
+    def _send_blocking(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any],
+        payload: Optional[Any],
+    ) -> requests.Response:
+        # the token is refreshed here when it's due, which may block.
+        headers = {**self.sp._auth_headers(), "Content-Type": "application/json"}
+        return self._session.request(
+            method,
+            url,
+            headers=headers,
+            params=params,
+            json=payload,
+            proxies=self.sp.proxies,
+            timeout=self.sp.requests_timeout,
+        )
+
+
+def _spotify_exception(
+    url: str, status: int, content: bytes, headers: Optional[dict[str, str]] = None
+) -> SpotifyException:
+    try:
+        message = decode_json(content)["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        message = "error"
+    return SpotifyException(status, -1, f"{url}:\n {message}", headers=headers)
+
+
+def run_async_iter(items: AsyncIterator[T], prefetch: int = PREFETCH) -> Iterator[T]:
+    """
+    Runs an async iterator on an event loop in a thread of its own, yielding its
+    items as they arrive so that callers can keep streaming them.
+
+    It runs at most prefetch items ahead of the caller, and is cancelled when the
+    caller stops early.
+    """
+
+    # room for the prefetched items and the end of the iterator, so puts never block.
+    queue: Queue = Queue(maxsize=prefetch + 1)
+    done = object()
+    loop = asyncio.new_event_loop()
+    slots = loop.run_until_complete(_semaphore(prefetch))
+
+    async def pump():
+        async for item in items:
+            await slots.acquire()
+            queue.put((item, None))
+
+    task = loop.create_task(pump())
+
+    def call_soon(callback: Callable[[], Any]) -> None:
+        with suppress(RuntimeError):  # the loop has already finished
+            loop.call_soon_threadsafe(callback)
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+            queue.put((done, None))
+        except asyncio.CancelledError:
+            pass
+        except BaseException as e:  # raised again in the caller's thread
+            queue.put((done, e))
+        finally:
+            # closes the iterator, and the client it may be using.
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    # a daemon thread, so a caller that stops early doesn't hold up the exit.
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while True:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            call_soon(slots.release)
+            yield item
+    finally:
+        call_soon(task.cancel)
+
+
+async def _semaphore(value: int) -> asyncio.Semaphore:
+    # made on the loop that uses it, which Python 3.9 binds it to.
+    return asyncio.Semaphore(value)
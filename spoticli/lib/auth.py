@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Optional
+
+from requests.exceptions import RequestException
+from spotipy.cache_handler import CacheFileHandler, CacheHandler
+from spotipy.oauth2 import SpotifyOAuth, SpotifyOauthError
+
+from spoticli.lib.paths import CACHE_DIR
+from spoticli.lib.state import file_lock, read_state, write_state
+
+TOKEN_CACHE = CACHE_DIR / "token.json"
+# Where the token was kept before: spotipy's default cache file, in the working
+# directory.
+LEGACY_TOKEN_CACHE = Path(CacheFileHandler().cache_path)
+# Tokens are refreshed this long before they expire. Until they actually expire,
+# they keep being used while the refresh happens in the background.
+REFRESH_MARGIN = 5 * 60
+# A background refresh gives up after waiting this long on another process's, so
+# that it never holds up a command from exiting.
+BACKGROUND_LOCK_TIMEOUT = 2.0
+
+
+class LockedCacheHandler(CacheHandler):
+    """
+    Token cache file shared by every spoticli process. It's replaced atomically, and
+    the token is kept in memory instead of being read for every request until it's
+    due for a refresh.
+
+    If there's no token yet, the one in legacy_path is moved over, so that upgrading
+    doesn't require authorizing again.
+    """
+
+    def __init__(self, path: Path = TOKEN_CACHE, legacy_path: Optional[Path] = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._token_info: Optional[dict[str, Any]] = None
+
+    def get_cached_token(self) -> Optional[dict[str, Any]]:
+        if self._token_info and not is_due(self._token_info):
+            return self._token_info
+        # another process may have refreshed it since it was last read.
+        self._token_info = read_state(self.path) or None
+        if self._token_info is None and self.legacy_path:
+            # the legacy file is left in place for older versions still installed.
+            legacy_token_info = read_state(self.legacy_path) or None
+            if legacy_token_info:
+                self.save_token_to_cache(legacy_token_info)
+        return self._token_info
+
+    def save_token_to_cache(self, token_info: dict[str, Any]) -> None:
+        write_state(token_info, self.path)
+        self._token_info = token_info
+
+
+class SpotiCLIOAuth(SpotifyOAuth):
+    """
+    OAuth manager that refreshes tokens before they expire, at most one process at a
+    time: whichever takes the lock on the token cache refreshes it, and the others
+    pick up the new token from the file.
+
+    A token that's due but still valid is refreshed in the background, so requests
+    only wait on a refresh when the token has already expired.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refreshing = threading.Lock()
+
+    def validate_token(self, token_info):
+        if not isinstance(self.cache_handler, LockedCacheHandler):
+            return super().validate_token(token_info)
+        if token_info is None:
+            return None
+        # if scopes don't match, then bail
+        if "scope" not in token_info or not self._is_scope_subset(
+            self.scope, token_info["scope"]
+        ):
+            return None
+        if not is_due(token_info):
+            return token_info
+        if self.is_token_expired(token_info):
+            return self.refresh_locked()
+        if self._refreshing.acquire(blocking=False):
+            # not a daemon thread, so a refresh isn't cut off when the command ends.
+            threading.Thread(target=self._refresh_in_background).start()
+        return token_info
+
+    def refresh_locked(
+        self, timeout: Optional[float] = None
+    ) -> Optional[dict[str, Any]]:
+        """
+        Refreshes the cached token unless another process already has.
+
+        Raises TimeoutError if another process is still refreshing it after timeout
+        seconds. A token that isn't cached in a file is refreshed without a lock.
+        """
+
+        lock = (
+            file_lock(self.cache_handler.path, timeout=timeout)
+            if isinstance(self.cache_handler, LockedCacheHandler)
+            else nullcontext()
+        )
+        with lock:
+            # read again now that no other process can be refreshing it.
+            token_info = self.cache_handler.get_cached_token()
+            if token_info is None or not is_due(token_info):
+                return token_info
+            return self.refresh_access_token(token_info["refresh_token"])
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh_locked(timeout=BACKGROUND_LOCK_TIMEOUT)
+        except (RequestException, SpotifyOauthError, TimeoutError):
+            # the token is still valid, and the next request will try again.
+            pass
+        finally:
+            self._refreshing.release()
+
+
+def is_due(token_info: dict[str, Any]) -> bool:
+    return token_info["expires_at"] - time.time() < REFRESH_MARGIN
+
+
+def keep_token_fresh(auth_manager: SpotiCLIOAuth, stopped: threading.Event) -> None:
+    """
+    Refreshes the shared token as it comes due, for as long as a daemon runs, so
+    that other invocations find a fresh token in the cache.
+    """
+
+    while not stopped.is_set():
+        token_info = auth_manager.cache_handler.get_cached_token()
+        if token_info is None:
+            return
+        wait = token_info["expires_at"] - REFRESH_MARGIN - time.time()
+        if stopped.wait(max(wait, 0)):
+            return
+        try:
+            auth_manager.refresh_locked()
+        except (RequestException, SpotifyOauthError):
+            stopped.wait(60)
@@ -0,0 +1,192 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from spoticli.lib.metrics import get_metrics
+from spoticli.lib.paths import CACHE_DIR
+
+METADATA_DB = CACHE_DIR / "metadata.sqlite3"
+HTTP_DB = CACHE_DIR / "http.sqlite3"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Eviction frees space down to this fraction of the cap so that every subsequent
+# write doesn't trigger another eviction pass.
+EVICTION_TARGET = 0.9
+# SQLite limits the number of bound parameters in a single statement.
+_MAX_PARAMS = 500
+
+
+class MetadataCache:
+    """
+    Size-capped LRU store for immutable catalog objects, keyed by Spotify URI and the
+    kind of object stored (track, album, audio_features, ...).
+    """
+
+    def __init__(self, path: Path = METADATA_DB, max_bytes: int = DEFAULT_MAX_BYTES):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "uri TEXT NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL, "
+                "PRIMARY KEY (uri, kind))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)"
+            )
+
+    def get(self, kind: str, uri: str) -> Optional[Any]:
+        return self.get_many(kind, [uri]).get(uri)
+
+    def get_many(self, kind: str, uris: Iterable[str]) -> dict[str, Any]:
+        unique_uris = list(dict.fromkeys(uris))
+        found: dict[str, Any] = {}
+        with self._lock, self._db:
+            for i in range(0, len(unique_uris), _MAX_PARAMS):
+                chunk = unique_uris[i : i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT uri, payload FROM metadata WHERE kind = ? "
+                    f"AND uri IN ({placeholders})",
+                    (kind, *chunk),
+                )
+                found.update((uri, json.loads(payload)) for uri, payload in rows)
+            _record_lookups(kind, len(found), len(unique_uris) - len(found))
+            if found:
+                self._db.executemany(
+                    "UPDATE metadata SET accessed = ? WHERE kind = ? AND uri = ?",
+                    ((time.time(), kind, uri) for uri in found),
+                )
+        return found
+
+    def put(self, kind: str, uri: str, value: Any) -> None:
+        self.put_many(kind, {uri: value})
+
+    def put_many(self, kind: str, items: dict[str, Any]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for uri, value in items.items():
+            payload = json.dumps(value, separators=(",", ":"))
+            rows.append((uri, kind, payload, len(payload), now))
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM metadata")
+
+    def _evict(self) -> None:
+        _evict(self._db, "metadata", self.max_bytes)
+
+
+@dataclass
+class CachedResponse:
+    __slots__ = ("etag", "expires", "headers", "body")
+
+    etag: Optional[str]
+    # wall clock time until which the response can be used without revalidating it.
+    expires: float
+    headers: dict[str, str]
+    body: bytes
+
+
+class HTTPCache:
+    """
+    Size-capped LRU store for GET responses and their validators, keyed by URL.
+    """
+
+    def __init__(self, path: Path = HTTP_DB, max_bytes: int = DEFAULT_MAX_BYTES):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, etag TEXT, expires REAL NOT NULL, "
+                "headers TEXT NOT NULL, body BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT etag, expires, headers, body FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url)
+            )
+        etag, expires, headers, body = row
+        return CachedResponse(etag, expires, json.loads(headers), body)
+
+    def put(self, url: str, response: CachedResponse) -> None:
+        headers = json.dumps(response.headers)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.etag,
+                    response.expires,
+                    headers,
+                    response.body,
+                    len(response.body) + len(headers),
+                    time.time(),
+                ),
+            )
+            _evict(self._db, "responses", self.max_bytes)
+
+    def refresh(self, url: str, expires: float) -> None:
+        """
+        Extends the freshness of a response that revalidated as unchanged.
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE responses SET expires = ? WHERE url = ?", (expires, url)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+
+def _record_lookups(kind: str, hits: int, misses: int) -> None:
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    # page offsets and markets are left out to keep the number of series small.
+    kind = kind.split(":")[0].split("@")[0]
+    metrics.inc("spoticli_metadata_cache_lookups", hits, kind=kind, result="hit")
+    metrics.inc("spoticli_metadata_cache_lookups", misses, kind=kind, result="miss")
+
+
+def _evict(db: sqlite3.Connection, table: str, max_bytes: int) -> None:
+    (total,) = db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()
+    if total <= max_bytes:
+        return
+    to_free = total - max_bytes * EVICTION_TARGET
+    evicted = []
+    for rowid, size in db.execute(f"SELECT rowid, size FROM {table} ORDER BY accessed"):
+        evicted.append((rowid,))
+        to_free -= size
+        if to_free <= 0:
+            break
+    db.executemany(f"DELETE FROM {table} WHERE rowid = ?", evicted)
@@ -0,0 +1,132 @@
+import json
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import click
+import requests
+from click.exceptions import Abort
+from requests.structures import CaseInsensitiveDict
+
+RECORDED_HEADERS = ("Content-Type", "Retry-After")
+
+_cassette: Optional["Cassette"] = None
+
+
+class Cassette:
+    """
+    A file of recorded API responses, one JSON line per request.
+
+    When recording, every response is appended as it arrives. When replaying,
+    requests are answered from the file by method, path and query, in the order
+    they were recorded; once the responses to a request run out, the last one is
+    repeated.
+
+    Local state that steers which requests are made, like the playback snapshot and
+    job journals, is kept in a temporary directory of its own for as long as the
+    cassette is active.
+    """
+
+    def __init__(self, path: Path, replaying: bool):
+        self.path = path
+        self.replaying = replaying
+        self._state_dir = tempfile.TemporaryDirectory(prefix="spoticli-cassette-")
+        self.state_dir = Path(self._state_dir.name)
+        self._lock = threading.Lock()
+        self._responses: dict[str, list[dict[str, Any]]] = {}
+        self._played: dict[str, int] = {}
+        if replaying:
+            with open(path, "rb") as f:
+                for line in f:
+                    interaction = json.loads(line)
+                    self._responses.setdefault(interaction["key"], []).append(
+                        interaction
+                    )
+        else:
+            path.write_bytes(b"")
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        params: Optional[dict[str, Any]],
+        response: requests.Response,
+    ) -> None:
+        interaction = {
+            "key": request_key(method, url, params),
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in RECORDED_HEADERS
+                if name in response.headers
+            },
+            "body": response.content.decode("utf-8"),
+        }
+        line = json.dumps(interaction, separators=(",", ":")) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+    def play(
+        self, method: str, url: str, params: Optional[dict[str, Any]]
+    ) -> requests.Response:
+        key = request_key(method, url, params)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                click.secho(
+                    f"No response to '{key}' was recorded in {self.path}.", fg="red"
+                )
+                raise Abort()
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+        interaction = responses[min(played, len(responses) - 1)]
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.url = url
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response._content = interaction["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+
+def request_key(method: str, url: str, params: Optional[dict[str, Any]]) -> str:
+    """
+    Identifies a request by its method, its path below the API prefix and its query
+    parameters in sorted order, so recordings replay against any prefix.
+    """
+
+    parsed = urlparse(url)
+    path = parsed.path.split("/v1/", 1)[-1].strip("/")
+    query = parse_qsl(parsed.query) + [
+        (name, str(value)) for name, value in (params or {}).items()
+    ]
+    return f"{method} {path}?{urlencode(sorted(query))}".rstrip("?")
+
+
+def start_recording(path: str) -> Cassette:
+    global _cassette
+    _cassette = Cassette(Path(path), replaying=False)
+    return _cassette
+
+
+def start_replay(path: str) -> Cassette:
+    global _cassette
+    _cassette = Cassette(Path(path), replaying=True)
+    return _cassette
+
+
+def get_cassette() -> Optional[Cassette]:
+    return _cassette
+
+
+def state_path(path: Path) -> Path:
+    """
+    Returns where a local state file or directory is used: in the active cassette's
+    temporary directory while there is one, so that a recording or a replay neither
+    reads nor overwrites the user's.
+    """
+
+    return _cassette.state_dir / path.name if _cassette else path
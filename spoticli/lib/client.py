@@ -0,0 +1,296 @@
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from spotipy.client import Spotify
+
+from spoticli.lib.cache import HTTPCache, MetadataCache
+from spoticli.lib.cassette import get_cassette
+from spoticli.lib.metrics import get_metrics
+from spoticli.lib.profiler import phase
+from spoticli.lib.projections import MARKET
+from spoticli.lib.state import (
+    forget_track,
+    record_play_state,
+    record_playback,
+    record_position,
+    record_volume,
+)
+from spoticli.lib.transport import MeteredRetry, SpotiCLISession
+
+# Maximum number of IDs accepted by each of the multi-ID endpoints.
+AUDIO_FEATURES_BATCH = 100
+TRACKS_BATCH = 50
+ALBUMS_BATCH = 20
+# How long long-lived sessions keep playlists and devices in memory.
+SESSION_CACHE_TTL = 300
+
+
+class SpotiCLIClient(Spotify):
+    """
+    Spotify client that serves immutable catalog metadata (tracks, albums, album
+    tracks, audio features and sections) from the on-disk cache, fetching misses in
+    batches through the multi-ID endpoints.
+
+    Every endpoint that takes a market is asked for the user's own, which leaves the
+    available_markets lists out of the response.
+
+    Every playback read is also recorded so that later invocations can extrapolate the
+    playback position instead of asking for it again.
+    """
+
+    def __init__(self, *args, metadata_cache: Optional[MetadataCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # e.g. a local stand-in for the Web API (see benchmarks/fake_spotify.py).
+        self.prefix: str = os.environ.get("SPOTICLI_API_PREFIX") or self.prefix
+        if metadata_cache is None and get_cassette():
+            # a cassette has to hold every response a command needs, so nothing is
+            # served from what earlier invocations cached.
+            metadata_cache = MetadataCache(Path(":memory:"))
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.session_cache: Optional[dict[tuple, tuple[float, Any]]] = None
+        self.last_search: Optional[dict[str, Any]] = None
+        self._authorization: Optional[str] = None
+
+    def _build_session(self):
+        # keep the retry adapters spotipy configures, on a session of our own.
+        super()._build_session()
+        session = SpotiCLISession(http_cache=None if get_cassette() else HTTPCache())
+        for prefix, adapter in self._session.adapters.items():
+            # Retry.new() keeps the class, so every retry of a request is metered.
+            adapter.max_retries.__class__ = MeteredRetry
+            session.mount(prefix, adapter)
+        self._session = session
+
+    def _auth_headers(self):
+        # the token is fetched or refreshed here on the first call that needs it.
+        with phase("token"):
+            headers = super()._auth_headers()
+        metrics = get_metrics()
+        # the first token of the session isn't a refresh.
+        if metrics and self._authorization not in (None, headers.get("Authorization")):
+            metrics.inc("spoticli_token_refreshes")
+        self._authorization = headers.get("Authorization")
+        return headers
+
+    def enable_session_cache(self) -> None:
+        """
+        Keeps the user's playlists and devices in memory, for sessions that outlive a
+        single command.
+        """
+
+        self.session_cache = {}
+
+    def peek_session_cache(self, *key: Any) -> Any:
+        """
+        Returns what the session cache holds for a key, however old, without making a
+        request. None if there's nothing cached.
+        """
+
+        return (self.session_cache or {}).get(key, (0.0, None))[1]
+
+    def current_user_playlists(self, limit=50, offset=0):
+        fetch = super().current_user_playlists
+        return self._get_session_cached(
+            ("playlists", limit, offset), lambda: fetch(limit=limit, offset=offset)
+        )
+
+    def user_playlist_create(self, *args, **kwargs):
+        self._invalidate_session_cache("playlists")
+        return super().user_playlist_create(*args, **kwargs)
+
+    def playlist_add_items(self, *args, **kwargs):
+        self._invalidate_session_cache("playlists")
+        return super().playlist_add_items(*args, **kwargs)
+
+    def devices(self):
+        return self._get_session_cached(("devices",), super().devices)
+
+    def transfer_playback(self, *args, **kwargs):
+        self._invalidate_session_cache("devices")
+        return super().transfer_playback(*args, **kwargs)
+
+    def search(self, q, limit=10, offset=0, type="track", market=MARKET):
+        self.last_search = super().search(
+            q, limit=limit, offset=offset, type=type, market=market
+        )
+        return self.last_search
+
+    def playlist_items(self, *args, **kwargs):
+        kwargs.setdefault("market", MARKET)
+        return super().playlist_items(*args, **kwargs)
+
+    def current_user_saved_albums(self, limit=20, offset=0, market=MARKET):
+        return super().current_user_saved_albums(
+            limit=limit, offset=offset, market=market
+        )
+
+    def current_user_saved_tracks(self, limit=20, offset=0, market=MARKET):
+        return super().current_user_saved_tracks(
+            limit=limit, offset=offset, market=market
+        )
+
+    def add_to_queue(self, uri, device_id=None):
+        res = super().add_to_queue(uri, device_id=device_id)
+        metrics = get_metrics()
+        if metrics:
+            metrics.inc("spoticli_queue_items_added")
+        return res
+
+    def audio_features(self, tracks=[]):
+        if isinstance(tracks, str):
+            tracks = [tracks]
+        uris = [self._get_uri("track", track) for track in tracks]
+        return self._get_cached_batch(
+            "audio_features", uris, AUDIO_FEATURES_BATCH, super().audio_features
+        )
+
+    def track(self, track_id, market=MARKET):
+        return self.tracks([track_id], market=market)["tracks"][0]
+
+    def tracks(self, tracks, market=MARKET):
+        uris = [self._get_uri("track", track) for track in tracks]
+        fetch = super().tracks
+        items = self._get_cached_batch(
+            metadata_kind("track", market),
+            uris,
+            TRACKS_BATCH,
+            lambda chunk: fetch(chunk, market=market)["tracks"],
+        )
+        return {"tracks": items}
+
+    def album(self, album_id, market=MARKET):
+        return self.albums([album_id], market=market)["albums"][0]
+
+    def albums(self, albums, market=MARKET):
+        uris = [self._get_uri("album", album) for album in albums]
+        items = self._get_cached_batch(
+            metadata_kind("album", market),
+            uris,
+            ALBUMS_BATCH,
+            lambda chunk: self._get_albums(chunk, market),
+        )
+        return {"albums": items}
+
+    def _get_albums(self, uris: list[str], market: Optional[str]) -> list[Any]:
+        # Spotify.albums() only takes a market from spotipy 2.20 on.
+        ids = ",".join(self._get_id("album", uri) for uri in uris)
+        return self._get("albums/?ids=" + ids, market=market)["albums"]
+
+    def album_tracks(self, album_id, limit=50, offset=0, market=MARKET):
+        uri = self._get_uri("album", album_id)
+        kind = metadata_kind(f"album_tracks:{offset}:{limit}", market)
+        page = self.metadata_cache.get(kind, uri)
+        if page is None:
+            page = super().album_tracks(
+                album_id, limit=limit, offset=offset, market=market
+            )
+            self.metadata_cache.put(kind, uri, page)
+        return page
+
+    def track_sections(self, track_id) -> list[int]:
+        """
+        Returns the start of each section of a track in milliseconds.
+
+        Audio analysis payloads are large, so only the section boundaries are cached.
+        """
+
+        uri = self._get_uri("track", track_id)
+        sections = self.metadata_cache.get("sections", uri)
+        if sections is None:
+            analysis = self.audio_analysis(uri)
+            sections = [
+                round(section["start"] * 1000) for section in analysis["sections"]
+            ]
+            self.metadata_cache.put("sections", uri, sections)
+        return sections
+
+    def current_playback(self, market=MARKET, additional_types=None):
+        res = super().current_playback(market=market, additional_types=additional_types)
+        record_playback(res)
+        return res
+
+    def seek_track(self, position_ms, device_id=None):
+        res = super().seek_track(position_ms, device_id=device_id)
+        record_position(position_ms)
+        return res
+
+    def pause_playback(self, device_id=None):
+        res = super().pause_playback(device_id=device_id)
+        record_play_state(False)
+        return res
+
+    def start_playback(
+        self, device_id=None, context_uri=None, uris=None, offset=None, position_ms=None
+    ):
+        res = super().start_playback(
+            device_id=device_id,
+            context_uri=context_uri,
+            uris=uris,
+            offset=offset,
+            position_ms=position_ms,
+        )
+        if context_uri or uris:
+            forget_track()
+        else:
+            record_play_state(True)
+            if position_ms is not None:
+                record_position(position_ms)
+        return res
+
+    def next_track(self, device_id=None):
+        res = super().next_track(device_id=device_id)
+        forget_track()
+        return res
+
+    def previous_track(self, device_id=None):
+        res = super().previous_track(device_id=device_id)
+        # this restarts the track or goes back one, depending on the position.
+        forget_track()
+        return res
+
+    def volume(self, volume_percent, device_id=None):
+        decided_at = time.monotonic()
+        res = super().volume(volume_percent, device_id=device_id)
+        record_volume(volume_percent, decided_at=decided_at)
+        return res
+
+    def _get_session_cached(self, key: tuple, fetch: Callable[[], Any]) -> Any:
+        if self.session_cache is None:
+            return fetch()
+        cached_at, value = self.session_cache.get(key, (0.0, None))
+        if time.monotonic() - cached_at > SESSION_CACHE_TTL:
+            value = fetch()
+            self.session_cache[key] = (time.monotonic(), value)
+        return value
+
+    def _invalidate_session_cache(self, kind: str) -> None:
+        if self.session_cache:
+            for key in [key for key in self.session_cache if key[0] == kind]:
+                del self.session_cache[key]
+
+    def _get_cached_batch(
+        self,
+        kind: str,
+        uris: list[str],
+        batch_size: int,
+        fetch: Callable[[list[str]], list[Optional[dict[str, Any]]]],
+    ) -> list[Optional[dict[str, Any]]]:
+        cached = self.metadata_cache.get_many(kind, uris)
+        missing = [uri for uri in dict.fromkeys(uris) if uri not in cached]
+        for i in range(0, len(missing), batch_size):
+            chunk = missing[i : i + batch_size]
+            # unknown IDs come back as null and aren't worth caching.
+            fetched = {
+                uri: item for uri, item in zip(chunk, fetch(chunk)) if item is not None
+            }
+            self.metadata_cache.put_many(kind, fetched)
+            cached.update(fetched)
+        return [cached.get(uri) for uri in uris]
+
+
+def metadata_kind(kind: str, market: Optional[str]) -> str:
+    # playability and track relinking depend on the market, so each market gets its
+    # own entries.
+    return kind if market is None else f"{kind}@{market}"
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+import click
+from click.exceptions import Abort
+from spotipy.client import Spotify, SpotifyException
+from tqdm import tqdm
+
+from spoticli.lib.async_client import AsyncSpotiCLIClient
+from spoticli.lib.cassette import state_path
+from spoticli.lib.paths import CACHE_DIR
+
+JOBS_DIR = CACHE_DIR / "jobs"
+# Items sent per request by each kind of job.
+BATCH_SIZES = {"queue": 1, "save_albums": 20, "playlist": 100}
+# Finished jobs are deleted once they're this old.
+MAX_FINISHED_AGE = 7 * 86400
+
+
+class Job:
+    """
+    A bulk operation that can be picked up where it stopped.
+
+    Its journal is a JSONL file: the first line describes the job and lists every
+    item, and a line is appended whenever a batch of items is acknowledged by Spotify
+    or the job is started again.
+    """
+
+    def __init__(self, path: Path, header: dict[str, Any], lines: list[dict[str, Any]]):
+        self.path = path
+        self.id: str = header["id"]
+        self.kind: str = header["kind"]
+        self.description: str = header["description"]
+        self.created: float = header["created"]
+        self.params: dict[str, Any] = header["params"]
+        self.items: list[str] = header["items"]
+        self.batch_size: int = header["batch_size"]
+        self.acked: set[int] = {line["ack"] for line in lines if "ack" in line}
+        self.runs = [line for line in lines if "run" in line]
+        self._acks = [line for line in lines if "ack" in line]
+        self.on_ack: Optional[Callable[[int], None]] = None
+
+    @classmethod
+    def create(
+        cls,
+        kind: str,
+        items: list[str],
+        description: str,
+        params: Optional[dict[str, Any]] = None,
+        jobs_dir: Optional[Path] = None,
+    ) -> "Job":
+        jobs_dir = jobs_dir or state_path(JOBS_DIR)
+        _delete_finished(jobs_dir)
+        header = {
+            "id": secrets.token_hex(4),
+            "kind": kind,
+            "description": description,
+            "created": time.time(),
+            "params": params or {},
+            "batch_size": BATCH_SIZES[kind],
+            "items": items,
+        }
+        path = jobs_dir / f"{header['id']}.jsonl"
+        jobs_dir.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        return cls(path, header, [])
+
+    @classmethod
+    def load(cls, path: Path) -> "Job":
+        with open(path) as f:
+            header = json.loads(f.readline())
+            lines = []
+            for line in f:
+                try:
+                    lines.append(json.loads(line))
+                except ValueError:
+                    # the last line may have been cut off when the job stopped.
+                    continue
+        return cls(path, header, lines)
+
+    @property
+    def batch_count(self) -> int:
+        return -(-len(self.items) // self.batch_size)
+
+    def batch(self, index: int) -> list[str]:
+        return self.items[index * self.batch_size : (index + 1) * self.batch_size]
+
+    def pending(self) -> list[tuple[int, list[str]]]:
+        return [
+            (index, self.batch(index))
+            for index in range(self.batch_count)
+            if index not in self.acked
+        ]
+
+    @property
+    def done_items(self) -> int:
+        return sum(len(self.batch(index)) for index in self.acked)
+
+    @property
+    def is_finished(self) -> bool:
+        return len(self.acked) == self.batch_count
+
+    @property
+    def is_running(self) -> bool:
+        if self.is_finished or not self.runs:
+            return False
+        try:
+            os.kill(self.runs[-1]["pid"], 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def start(self) -> None:
+        self._append({"run": time.time(), "pid": os.getpid()})
+
+    def acknowledge(self, index: int) -> None:
+        line = {"ack": index, "t": time.time()}
+        self._append(line)
+        self.acked.add(index)
+        self._acks.append(line)
+        if self.on_ack:
+            self.on_ack(index)
+
+    def throughput(self) -> Optional[float]:
+        """
+        Items acknowledged per second while the job was running.
+        """
+
+        active = 0.0
+        runs = [run["run"] for run in self.runs]
+        for started, ended in zip(runs, runs[1:] + [float("inf")]):
+            acks = [ack["t"] for ack in self._acks if started <= ack["t"] < ended]
+            if acks:
+                active += max(acks) - started
+        if not active or not self.acked:
+            return None
+        return self.done_items / active
+
+    def eta(self) -> Optional[float]:
+        throughput = self.throughput()
+        if self.is_finished or not throughput:
+            return None
+        return (len(self.items) - self.done_items) / throughput
+
+    def _append(self, line: dict[str, Any]) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(line, separators=(",", ":")) + "\n")
+        if "run" in line:
+            self.runs.append(line)
+
+
+def list_jobs(jobs_dir: Optional[Path] = None) -> list[Job]:
+    jobs = [
+        Job.load(path) for path in (jobs_dir or state_path(JOBS_DIR)).glob("*.jsonl")
+    ]
+    return sorted(jobs, key=lambda job: job.created)
+
+
+def load_job(job_id: str, jobs_dir: Optional[Path] = None) -> Job:
+    path = (jobs_dir or state_path(JOBS_DIR)) / f"{job_id}.jsonl"
+    if not path.exists():
+        click.secho(f"There's no job '{job_id}'.", fg="red")
+        raise Abort()
+    return Job.load(path)
+
+
+def run_job(sp_auth: Spotify, job: Job) -> None:
+    """
+    Sends the batches of a job that haven't been acknowledged yet. If it stops
+    partway through, the job is left to be resumed with 'spoticli jobs resume'.
+    """
+
+    job.start()
+    with tqdm(total=len(job.items), initial=job.done_items) as progress:
+        job.on_ack = lambda index: progress.update(len(job.batch(index)))
+        try:
+            asyncio.run(_run(sp_auth, job))
+        except (
+            KeyboardInterrupt,
+            SpotifyException,
+            OSError,
+            asyncio.TimeoutError,
+        ) as e:
+            progress.close()
+            click.secho(
+                f"The job stopped after {job.done_items} of {len(job.items)} items. "
+                f"Continue it with 'spoticli jobs resume {job.id}'.",
+                fg="red",
+            )
+            raise Abort() from e
+
+
+async def _run(sp_auth: Spotify, job: Job) -> None:
+    async with AsyncSpotiCLIClient(sp_auth) as aio:
+        await RUNNERS[job.kind](aio, job)
+
+
+async def _run_queue(aio: AsyncSpotiCLIClient, job: Job) -> None:
+    # one at a time, since tracks are queued in the order they're added.
+    for index, batch in job.pending():
+        for uri in batch:
+            await aio.add_to_queue(uri, device_id=job.params.get("device"))
+        job.acknowledge(index)
+
+
+async def _run_save_albums(aio: AsyncSpotiCLIClient, job: Job) -> None:
+    async def save(index, batch):
+        await aio.current_user_saved_albums_add(batch)
+        job.acknowledge(index)
+
+    await asyncio.gather(*(save(index, batch) for index, batch in job.pending()))
+
+
+async def _run_playlist(aio: AsyncSpotiCLIClient, job: Job) -> None:
+    # in order, so that the playlist lists the tracks in the order they were given.
+    for index, batch in job.pending():
+        if index == 0 and job.params.get("replace"):
+            await aio.playlist_replace_items(job.params["playlist_id"], batch)
+        else:
+            await aio.playlist_add_items(job.params["playlist_id"], batch)
+        job.acknowledge(index)
+
+
+RUNNERS: dict[str, Callable[[AsyncSpotiCLIClient, Job], Awaitable[None]]] = {
+    "queue": _run_queue,
+    "save_albums": _run_save_albums,
+    "playlist": _run_playlist,
+}
+
+
+def _delete_finished(jobs_dir: Path) -> None:
+    if not jobs_dir.exists():
+        return
+    for job in list_jobs(jobs_dir):
+        if job.is_finished and time.time() - job.created > MAX_FINISHED_AGE:
+            job.path.unlink()
@@ -0,0 +1,102 @@
+import atexit
+import math
+import threading
+from pathlib import Path
+from typing import Optional
+
+from requests.exceptions import Timeout
+
+from spoticli.lib.paths import CACHE_DIR
+from spoticli.lib.state import locked_state, read_state
+
+LATENCY_STATS = CACHE_DIR / "latency.json"
+# Requests to the player endpoints give up after this many seconds instead of
+# leaving an interactive command hanging on a slow response.
+TIMEOUT_BUDGETS = {
+    "GET me/player": 3.0,
+    "GET me/player/devices": 3.0,
+    "POST me/player/next": 2.0,
+    "POST me/player/previous": 2.0,
+    "PUT me/player/pause": 2.0,
+    "PUT me/player/play": 3.0,
+    "PUT me/player/seek": 2.0,
+    "PUT me/player/volume": 2.0,
+}
+# Idempotent reads that may be sent a second time when the first attempt is slow.
+HEDGED_ENDPOINTS = ("GET me/player", "GET me/player/devices")
+# The latest latencies kept per endpoint, and how many are needed before the hedge
+# delay is taken from them rather than the default.
+MAX_SAMPLES = 200
+MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_DELAY = 0.5
+MIN_HEDGE_DELAY = 0.05
+
+_stats: Optional["LatencyStats"] = None
+_hedging = False
+
+
+class BudgetExceeded(Timeout):
+    """
+    A player request that took longer than its budget in TIMEOUT_BUDGETS.
+    """
+
+    def __init__(self, key: str, budget: float):
+        super().__init__(f"Spotify didn't answer '{key}' within {budget}s.")
+        self.key = key
+        self.budget = budget
+
+
+class LatencyStats:
+    """
+    Recent latencies of the hedged endpoints, kept across invocations to decide how
+    long to wait before hedging a request.
+    """
+
+    def __init__(self, path: Path = LATENCY_STATS):
+        self.path = path
+        self._samples: dict[str, list[float]] = read_state(path)
+        self._new: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._new.setdefault(key, []).append(seconds)
+
+    def hedge_delay(self, key: str) -> float:
+        with self._lock:
+            samples = self._samples.get(key, []) + self._new.get(key, [])
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        recent = sorted(samples[-MAX_SAMPLES:])
+        # nearest-rank percentile.
+        delay = recent[math.ceil(HEDGE_PERCENTILE / 100 * len(recent)) - 1]
+        return max(delay, MIN_HEDGE_DELAY)
+
+    def save(self) -> None:
+        with self._lock:
+            new, self._new = self._new, {}
+        if not new:
+            return
+        # merged under the lock with what other invocations recorded meanwhile.
+        with locked_state(self.path) as state:
+            for key, samples in new.items():
+                state[key] = (state.get(key, []) + samples)[-MAX_SAMPLES:]
+            self._samples = dict(state)
+
+
+def get_latency_stats() -> LatencyStats:
+    global _stats
+    if _stats is None:
+        _stats = LatencyStats()
+        atexit.register(_stats.save)
+    return _stats
+
+
+def enable_hedging() -> None:
+    global _hedging
+    _hedging = True
+
+
+def is_hedging() -> bool:
+    return _hedging
@@ -0,0 +1,115 @@
+import threading
+from bisect import bisect_left
+from typing import Optional
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# name: (type, help) for every metric, counters named without their _total suffix.
+METRICS = {
+    "spoticli_api_request_duration_seconds": (
+        "histogram",
+        "Latency of Spotify API requests, retries included.",
+    ),
+    "spoticli_api_requests": ("counter", "Spotify API requests by response status."),
+    "spoticli_api_rate_limited": ("counter", "429 responses received from Spotify."),
+    "spoticli_api_backoff_seconds": (
+        "counter",
+        "Time spent waiting before retrying requests.",
+    ),
+    "spoticli_api_hedged_requests": (
+        "counter",
+        "Second attempts sent for slow idempotent reads.",
+    ),
+    "spoticli_http_cache_lookups": (
+        "counter",
+        "HTTP cache lookups by result (hit, revalidated or miss).",
+    ),
+    "spoticli_metadata_cache_lookups": (
+        "counter",
+        "Metadata cache lookups by kind and result (hit or miss).",
+    ),
+    "spoticli_queue_items_added": ("counter", "Items added to the playback queue."),
+    "spoticli_token_refreshes": (
+        "counter",
+        "Access tokens refreshed during a session.",
+    ),
+}
+
+_metrics: Optional["Metrics"] = None
+
+
+class Metrics:
+    """
+    In-process counters and histograms, rendered in the OpenMetrics text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        # (name, labels): [bucket counts..., sum, count]
+        self._histograms: dict[tuple, list[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, [0.0] * (len(LATENCY_BUCKETS) + 3)
+            )
+            histogram[bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+
+        lines = []
+        for name, (type_, help_) in METRICS.items():
+            lines.append(f"# TYPE {name} {type_}")
+            lines.append(f"# HELP {name} {help_}")
+            if type_ == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}_total{_labels(labels)} {value}")
+                continue
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0.0
+                bounds = [*map(str, LATENCY_BUCKETS), "+Inf"]
+                for bound, count in zip(bounds, histogram):
+                    cumulative += count
+                    bucket_labels = _labels((*labels, ("le", bound)))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram[-2]}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram[-1]}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def start_metrics() -> Metrics:
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def get_metrics() -> Optional[Metrics]:
+    return _metrics
@@ -0,0 +1,84 @@
+import sys
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from spoticli.lib.util import get_artist_names
+
+# Records for the items commands list, built straight from API responses. They're
+# slotted since library-sized listings hold thousands of them, and URIs are interned
+# because the same album or track URI turns up many times over.
+
+
+@dataclass
+class Album:
+    __slots__ = (
+        "uri",
+        "name",
+        "artists",
+        "album_type",
+        "total_tracks",
+        "release_date",
+    )
+
+    uri: str
+    name: str
+    artists: str
+    album_type: Optional[str]
+    total_tracks: Optional[int]
+    release_date: Optional[str]
+
+    @classmethod
+    def from_json(cls, item: dict[str, Any]) -> "Album":
+        return cls(
+            sys.intern(item["uri"]),
+            item["name"],
+            get_artist_names(item),
+            item.get("album_type"),
+            item.get("total_tracks"),
+            item.get("release_date"),
+        )
+
+    @property
+    def is_full_length(self) -> bool:
+        """
+        Whether this is an album or an EP, i.e. a single of more than one track.
+        """
+
+        return self.album_type == "album" or (
+            self.album_type == "single" and (self.total_tracks or 0) > 1
+        )
+
+
+@dataclass
+class Track:
+    __slots__ = ("uri", "name", "artists", "duration_ms", "popularity", "album")
+
+    uri: str
+    name: str
+    artists: str
+    duration_ms: Optional[int]
+    popularity: Optional[int]
+    album: Optional[Album]
+
+    @classmethod
+    def from_json(cls, item: dict[str, Any]) -> "Track":
+        return cls(
+            sys.intern(item["uri"]),
+            item["name"],
+            get_artist_names(item),
+            item.get("duration_ms"),
+            item.get("popularity"),
+            Album.from_json(item["album"]) if item.get("album") else None,
+        )
+
+
+@dataclass
+class PlayEvent:
+    __slots__ = ("track", "played_at")
+
+    track: Track
+    played_at: str
+
+    @classmethod
+    def from_json(cls, item: dict[str, Any]) -> "PlayEvent":
+        return cls(Track.from_json(item["track"]), item["played_at"])
@@ -0,0 +1,232 @@
+import json
+import os
+import shlex
+import subprocess
+import sys
+from contextlib import contextmanager
+from typing import IO, Any, Iterator, Optional
+
+import click
+
+from spoticli.lib.profiler import phase
+from spoticli.lib.util import display_table
+
+OUTPUT_FORMATS = ("table", "json", "ndjson", "tsv")
+# Streamed tables size their columns from this many rows when no widths are given.
+SAMPLE_ROWS = 50
+COLUMN_GAP = "  "
+
+_output_format = "table"
+
+
+def set_output_format(output_format: str) -> None:
+    global _output_format
+    _output_format = output_format
+
+
+def is_machine_readable() -> bool:
+    return _output_format != "table"
+
+
+def status(msg: str) -> None:
+    """
+    Shows a progress message, keeping it out of machine-readable output.
+    """
+
+    click.secho(msg, fg="magenta", err=is_machine_readable())
+
+
+class RowWriter:
+    """
+    Buffers rows and renders them as a table once all have been written.
+    """
+
+    def __init__(self):
+        self.rows: list[dict[str, Any]] = []
+
+    def write(self, row: dict[str, Any], **fields: Any) -> None:
+        """
+        Writes a row. Extra fields (URIs and the like) are only included in
+        machine-readable output.
+        """
+
+        self.rows.append(row)
+
+    def close(self) -> None:
+        if self.rows:
+            display_table(self.rows)
+
+
+class StreamingTableWriter(RowWriter):
+    """
+    Renders a table as rows arrive instead of once all are known, paging it when
+    writing to a terminal.
+
+    Column widths come from the widths given or from the first rows written; cells
+    that don't fit in later rows are truncated.
+    """
+
+    def __init__(self, widths: Optional[dict[str, int]] = None):
+        self.widths = widths
+        self.pending: list[dict[str, Any]] = []
+        self.pager: Optional[Pager] = None
+
+    def write(self, row: dict[str, Any], **fields: Any) -> None:
+        self.pending.append(row)
+        if self.pager or self.widths or len(self.pending) >= SAMPLE_ROWS:
+            self._flush()
+
+    def close(self) -> None:
+        if self.pending:
+            self._flush()
+        if self.pager:
+            self.pager.close()
+
+    def _flush(self) -> None:
+        if self.pager is None:
+            if self.widths is None:
+                self.widths = {
+                    column: max(
+                        len(str(row.get(column, ""))) for row in [{}, *self.pending]
+                    )
+                    for column in self.pending[0]
+                }
+            self.widths = {
+                column: max(width, len(column)) for column, width in self.widths.items()
+            }
+            self.pager = Pager()
+            self.pager.write(self._format(dict(zip(self.widths, self.widths))))
+            self.pager.write(COLUMN_GAP.join("-" * w for w in self.widths.values()))
+        for row in self.pending:
+            self.pager.write(self._format(row))
+        self.pager.flush()
+        self.pending.clear()
+
+    def _format(self, row: dict[str, Any]) -> str:
+        cells = []
+        for column, width in self.widths.items():  # type: ignore[union-attr]
+            value = str(row.get(column, ""))
+            if len(value) > width:
+                value = value[: max(width - 3, 0)] + "..."
+            cells.append(value.ljust(width))
+        return COLUMN_GAP.join(cells).rstrip()
+
+
+class Pager:
+    """
+    Writes lines to $PAGER (less by default) when stdout is a terminal, or straight to
+    stdout otherwise.
+    """
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self.stream: IO[str] = sys.stdout
+        if not sys.stdout.isatty():
+            return
+        env = dict(os.environ)
+        # quit straight away if everything fits on one screen and keep colors.
+        env.setdefault("LESS", "FRX")
+        try:
+            self.process = subprocess.Popen(
+                shlex.split(os.environ.get("PAGER", "less")),
+                stdin=subprocess.PIPE,
+                env=env,
+                text=True,
+            )
+        except OSError:
+            return
+        self.stream = self.process.stdin  # type: ignore[assignment]
+
+    def write(self, line: str) -> None:
+        try:
+            self.stream.write(line + "\n")
+        except BrokenPipeError:
+            # the pager was quit before the output ended.
+            pass
+
+    def flush(self) -> None:
+        try:
+            self.stream.flush()
+        except BrokenPipeError:
+            pass
+
+    def close(self) -> None:
+        if self.process:
+            try:
+                self.stream.close()
+            except BrokenPipeError:
+                pass
+            self.process.wait()
+
+
+class NDJSONWriter(RowWriter):
+    def write(self, row: dict[str, Any], **fields: Any) -> None:
+        click.echo(json.dumps({**row, **fields}, ensure_ascii=False))
+
+    def close(self) -> None:
+        pass
+
+
+class JSONWriter(RowWriter):
+    """
+    Streams rows as the elements of a JSON array.
+    """
+
+    def __init__(self):
+        self.separator = "["
+
+    def write(self, row: dict[str, Any], **fields: Any) -> None:
+        click.echo(self.separator, nl=False)
+        click.echo(json.dumps({**row, **fields}, ensure_ascii=False), nl=False)
+        self.separator = ",\n"
+
+    def close(self) -> None:
+        click.echo("[]" if self.separator == "[" else "]")
+
+
+class TSVWriter(RowWriter):
+    def __init__(self):
+        self.header_written = False
+
+    def write(self, row: dict[str, Any], **fields: Any) -> None:
+        row = {**row, **fields}
+        if not self.header_written:
+            click.echo("\t".join(row))
+            self.header_written = True
+        click.echo("\t".join(_tsv_value(value) for value in row.values()))
+
+    def close(self) -> None:
+        pass
+
+
+def _tsv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+WRITERS = {
+    "table": RowWriter,
+    "json": JSONWriter,
+    "ndjson": NDJSONWriter,
+    "tsv": TSVWriter,
+}
+
+
+@contextmanager
+def row_writer(
+    stream: bool = False, widths: Optional[dict[str, int]] = None
+) -> Iterator[RowWriter]:
+    """
+    Provides a writer for rows in the selected output format. Machine-readable formats
+    are emitted as each row is written rather than once all rows are known, as are
+    tables when streaming is requested.
+    """
+
+    if stream and _output_format == "table":
+        writer: RowWriter = StreamingTableWriter(widths)
+    else:
+        writer = WRITERS[_output_format]()
+    with phase("render"):
+        yield writer
+        writer.close()
@@ -0,0 +1,6 @@
+from pathlib import Path
+
+from appdirs import user_cache_dir
+
+CACHE_DIR = Path(user_cache_dir("spoticli", "joebonneau"))
+DAEMON_SOCKET = CACHE_DIR / "daemon.sock"
@@ -0,0 +1,31 @@
+from typing import Any, Callable
+
+import click
+from spotipy.client import SpotifyException
+
+
+def is_restriction_violation(e: SpotifyException) -> bool:
+    """
+    Whether Spotify refused a player command because it isn't currently allowed, e.g.
+    pausing when nothing is playing.
+    """
+
+    return e.http_status == 403 and "restriction" in str(e.msg).lower()
+
+
+def send_playback_command(command: Callable[[], Any], restricted_msg: str) -> bool:
+    """
+    Sends a player command without checking whether it's allowed first. If Spotify
+    refuses it, the message given is shown instead of the error.
+
+    Returns whether the command was accepted.
+    """
+
+    try:
+        command()
+    except SpotifyException as e:
+        if not is_restriction_violation(e):
+            raise
+        click.echo(restricted_msg)
+        return False
+    return True
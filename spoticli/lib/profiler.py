@@ -0,0 +1,211 @@
+import json
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from urllib.parse import urlparse
+
+import click
+import requests
+from click import termui
+from tabulate import tabulate
+
+# Spotify IDs and user names in URL paths are replaced so that calls group by
+# endpoint rather than by resource.
+_ID_SEGMENT = re.compile(r"(?<=/)[0-9A-Za-z]{22}(?=/|$)")
+_USER_SEGMENT = re.compile(r"(?<=/users/)[^/]+")
+
+_profiler: Optional["Profiler"] = None
+
+
+class Profiler:
+    """
+    Records the API calls made and the phases gone through during an invocation.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.trace_id = uuid.uuid4().hex
+        self.root_id = _span_id()
+        self.calls: list[dict[str, Any]] = []
+        self.phases: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # the phases open in each thread, innermost last.
+        self._open = threading.local()
+
+    def record_call(
+        self,
+        method: str,
+        url: str,
+        response: Optional[requests.Response],
+        started: float,
+    ) -> None:
+        from_cache = getattr(response, "from_cache", False)
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        call = {
+            "span_id": _span_id(),
+            "parent_id": self.current_span(),
+            "method": method,
+            "endpoint": endpoint(url),
+            # no status means the request failed before a response arrived.
+            "status": response.status_code if response is not None else None,
+            "start_ms": self._ms(started),
+            "latency_ms": self._ms(time.perf_counter()) - self._ms(started),
+            "bytes": 0 if from_cache or response is None else len(response.content),
+            "retries": len(retries.history) if retries else 0,
+            "from_cache": from_cache,
+        }
+        with self._lock:
+            self.calls.append(call)
+
+    def current_span(self) -> str:
+        stack = getattr(self._open, "stack", None)
+        return stack[-1] if stack else self.root_id
+
+    def open_phase(self) -> tuple[str, str]:
+        parent_id = self.current_span()
+        span_id = _span_id()
+        self._open.__dict__.setdefault("stack", []).append(span_id)
+        return span_id, parent_id
+
+    def record_phase(
+        self,
+        name: str,
+        started: float,
+        span_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+    ) -> None:
+        if span_id and self._open.stack[-1:] == [span_id]:
+            self._open.stack.pop()
+        phase = {
+            "span_id": span_id or _span_id(),
+            "parent_id": parent_id or self.current_span(),
+            "name": name,
+            "start_ms": self._ms(started),
+            "duration_ms": self._ms(time.perf_counter()) - self._ms(started),
+        }
+        with self._lock:
+            self.phases.append(phase)
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Aggregates calls by endpoint and phases by name. The API time of a phase is
+        the latency of the calls started during it.
+        """
+
+        endpoints: dict[str, dict[str, Any]] = {}
+        for call in self.calls:
+            key = f"{call['method']} {call['endpoint']}"
+            stats = endpoints.setdefault(
+                key,
+                {"endpoint": key, "calls": 0, "errors": 0, "cache_hits": 0},
+            )
+            stats["calls"] += 1
+            stats["errors"] += not call["status"] or call["status"] >= 400
+            stats["cache_hits"] += call["from_cache"]
+            for field in ("retries", "bytes", "latency_ms"):
+                stats[field] = stats.get(field, 0) + call[field]
+            stats["max_ms"] = max(stats.get("max_ms", 0), call["latency_ms"])
+
+        phases: dict[str, dict[str, Any]] = {}
+        for phase in self.phases:
+            end_ms = phase["start_ms"] + phase["duration_ms"]
+            stats = phases.setdefault(
+                phase["name"],
+                {"phase": phase["name"], "count": 0, "duration_ms": 0, "api_ms": 0},
+            )
+            stats["count"] += 1
+            stats["duration_ms"] += phase["duration_ms"]
+            stats["api_ms"] += sum(
+                call["latency_ms"]
+                for call in self.calls
+                if phase["start_ms"] <= call["start_ms"] < end_ms
+            )
+
+        return {
+            "total_ms": self.elapsed_ms(),
+            "endpoints": sorted(endpoints.values(), key=lambda s: -s["latency_ms"]),
+            "phases": list(phases.values()),
+            "calls": self.calls,
+        }
+
+    def report(self, path: Optional[str] = None) -> None:
+        """
+        Prints a summary to stderr, or writes it as JSON to the file given.
+        """
+
+        summary = self.summary()
+        if path:
+            Path(path).write_text(json.dumps(summary, indent=2))
+            return
+        click.echo(err=True)
+        for table in ("endpoints", "phases"):
+            if summary[table]:
+                click.echo(
+                    tabulate(summary[table], headers="keys", floatfmt=".1f"), err=True
+                )
+                click.echo(err=True)
+        api_ms = sum(call["latency_ms"] for call in self.calls)
+        click.echo(
+            f"{len(self.calls)} API calls took {api_ms:.1f} ms of "
+            f"{summary['total_ms']:.1f} ms in total.",
+            err=True,
+        )
+
+    def elapsed_ms(self) -> float:
+        return self._ms(time.perf_counter())
+
+    def _ms(self, perf_counter: float) -> float:
+        return (perf_counter - self.started) * 1000
+
+
+def endpoint(url: str) -> str:
+    path = _ID_SEGMENT.sub("{id}", urlparse(url).path)
+    path = _USER_SEGMENT.sub("{user_id}", path)
+    return path.split("/v1/", 1)[-1]
+
+
+def start_profiling() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    # time spent waiting on the user is its own phase rather than part of another.
+    for name in ("visible_prompt_func", "hidden_prompt_func"):
+        setattr(termui, name, _as_phase("prompt", getattr(termui, name)))
+    return _profiler
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Times the enclosed block as a phase of the invocation when profiling.
+    """
+
+    if _profiler is None:
+        yield
+        return
+    started = time.perf_counter()
+    span_id, parent_id = _profiler.open_phase()
+    try:
+        yield
+    finally:
+        _profiler.record_phase(name, started, span_id, parent_id)
+
+
+def _span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _as_phase(name, func):
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return func(*args, **kwargs)
+
+    return wrapper
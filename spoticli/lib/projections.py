@@ -0,0 +1,57 @@
+from typing import Any
+
+# The market the client asks for wherever an endpoint takes one. Given a market,
+# Spotify leaves out the available_markets lists that make up most of every track
+# and album object.
+MARKET = "from_token"
+
+
+def fields(*spec: Any) -> str:
+    """
+    Builds a fields filter from field names and {field: subfields} mappings, where
+    subfields are a name, a list or another mapping.
+
+    For example, fields("next", {"items": {"track": "uri"}}) gives
+    "next,items(track(uri))".
+    """
+
+    parts: list[str] = []
+    for field in spec:
+        if isinstance(field, dict):
+            parts.extend(
+                f"{name}({fields(*_as_list(subfields))})"
+                for name, subfields in field.items()
+            )
+        else:
+            parts.append(field)
+    return ",".join(parts)
+
+
+def _as_list(subfields: Any) -> list[Any]:
+    return subfields if isinstance(subfields, list) else [subfields]
+
+
+# Projections of the endpoints that take a fields filter (a playlist and its items),
+# one for each way commands read them. "total" is kept wherever results are paged, so
+# that every page can be requested at once.
+
+# spa: the albums and EPs in a playlist.
+PLAYLIST_ALBUMS = fields(
+    "total",
+    {
+        "items": {
+            "track": {
+                "album": [
+                    "album_type",
+                    {"artists": "name"},
+                    "name",
+                    "total_tracks",
+                    "uri",
+                    "release_date",
+                ]
+            }
+        }
+    },
+)
+# search: queueing all the tracks of a playlist.
+PLAYLIST_TRACK_URIS = fields("total", {"items": {"track": "uri"}})
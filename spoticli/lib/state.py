@@ -0,0 +1,241 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+from spoticli.lib.cassette import state_path
+from spoticli.lib.paths import CACHE_DIR
+
+PLAYBACK_STATE = CACHE_DIR / "playback.json"
+# Snapshots older than this are too likely to be out of date (tracks skipped or
+# paused from another device, etc.) to extrapolate from. Long enough to cover a few
+# seeks in a row.
+MAX_SNAPSHOT_AGE = 20
+# The cached volume is only trusted for this long without being corrected by a
+# playback read, as it can be changed from other devices.
+MAX_VOLUME_AGE = 5 * 60
+# Allowed disagreement between the wall and monotonic clocks before a snapshot is
+# considered to predate a reboot or a clock change.
+CLOCK_SKEW_TOLERANCE = 2.0
+# How often a lock held by another process is tried again, when waiting on it is
+# bounded.
+LOCK_POLL_INTERVAL = 0.05
+# Keys of a playback snapshot describing the track, as opposed to the volume.
+TRACK_KEYS = ("track_uri", "duration_ms", "progress_ms", "is_playing")
+
+
+def write_state(data: dict[str, Any], path: Path) -> None:
+    """
+    Atomically replaces a JSON state file so concurrent readers never see a partial
+    write.
+    """
+
+    write_atomic(json.dumps(data), path)
+
+
+def write_atomic(text: str, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_state(path: Path) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None) -> Iterator[None]:
+    """
+    Holds an exclusive lock on a file across processes, through a lock file next to
+    it.
+
+    Raises TimeoutError if another process still holds it after timeout seconds.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "w") as lock_file:
+        if fcntl and timeout is not None:
+            _lock_within(lock_file, timeout, path)
+        elif fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _lock_within(lock_file: IO, timeout: float, path: Path) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{path} is locked by another process.")
+            time.sleep(LOCK_POLL_INTERVAL)
+
+
+@contextmanager
+def locked_state(path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Holds an exclusive lock on a JSON state file across processes while it's read,
+    modified in place and written back.
+    """
+
+    with file_lock(path):
+        state = read_state(path)
+        yield state
+        write_state(state, path)
+
+
+def _timestamp() -> dict[str, float]:
+    return {"monotonic": time.monotonic(), "wall": time.time()}
+
+
+def _is_fresh(snapshot: dict[str, Any], max_age: float) -> bool:
+    # monotonic clocks restart on reboot, so the wall clock must agree on how much
+    # time has passed.
+    elapsed = time.monotonic() - snapshot["monotonic"]
+    wall_elapsed = time.time() - snapshot["wall"]
+    return 0 <= elapsed <= max_age and (
+        abs(elapsed - wall_elapsed) <= CLOCK_SKEW_TOLERANCE
+    )
+
+
+def record_playback(res: Optional[dict[str, Any]], path: Optional[Path] = None) -> None:
+    """
+    Saves the parts of a Spotify.current_playback response needed to extrapolate the
+    playback position later without another request.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    with locked_state(path) as snapshot:
+        snapshot.update(_timestamp())
+        if res and res.get("item"):
+            snapshot.update(
+                track_uri=res["item"]["uri"],
+                duration_ms=res["item"]["duration_ms"],
+                progress_ms=res["progress_ms"],
+                is_playing=res["is_playing"],
+            )
+        else:
+            _drop_track(snapshot)
+        # a response without a device leaves the recorded volume as it was.
+        volume = ((res or {}).get("device") or {}).get("volume_percent")
+        if volume is not None:
+            snapshot["volume"] = {"level": volume, **_timestamp()}
+
+
+def record_position(progress_ms: int, path: Optional[Path] = None) -> None:
+    """
+    Moves the recorded playback position, e.g. after a seek.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    with locked_state(path) as snapshot:
+        if snapshot.get("track_uri"):
+            snapshot.update(progress_ms=progress_ms, **_timestamp())
+
+
+def record_play_state(is_playing: bool, path: Optional[Path] = None) -> None:
+    """
+    Records that playback was paused or resumed, keeping the position reached.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    with locked_state(path) as snapshot:
+        current = _extrapolate(snapshot)
+        if current is None:
+            _drop_track(snapshot)
+        else:
+            snapshot.update(
+                progress_ms=current["progress_ms"],
+                is_playing=is_playing,
+                **_timestamp(),
+            )
+
+
+def forget_track(path: Optional[Path] = None) -> None:
+    """
+    Drops the recorded track and position, e.g. after skipping to another track,
+    keeping the recorded volume.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    with locked_state(path) as snapshot:
+        _drop_track(snapshot)
+
+
+def _drop_track(snapshot: dict[str, Any]) -> None:
+    for key in TRACK_KEYS:
+        snapshot.pop(key, None)
+
+
+def load_playback_snapshot(path: Optional[Path] = None) -> Optional[dict[str, Any]]:
+    """
+    Returns the last recorded playback with progress_ms extrapolated to now, or None
+    if there's no snapshot recent enough to trust.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    return _extrapolate(read_state(path))
+
+
+def _extrapolate(snapshot: dict[str, Any]) -> Optional[dict[str, Any]]:
+    if not snapshot.get("track_uri") or not _is_fresh(snapshot, MAX_SNAPSHOT_AGE):
+        return None
+    snapshot = dict(snapshot)
+    if snapshot["is_playing"]:
+        elapsed = time.monotonic() - snapshot["monotonic"]
+        snapshot["progress_ms"] += int(elapsed * 1000)
+    if snapshot["progress_ms"] >= snapshot["duration_ms"]:
+        # the track has ended since, so whatever is playing now is unknown.
+        return None
+    return snapshot
+
+
+def record_volume(
+    volume: int, path: Optional[Path] = None, decided_at: Optional[float] = None
+) -> float:
+    """
+    Updates the recorded volume, returning the monotonic time it was recorded at.
+
+    Volume requests can complete out of order, so a change decided at decided_at is
+    dropped if another one has been recorded since.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    with locked_state(path) as snapshot:
+        recorded = snapshot.get("volume")
+        if decided_at is None or not recorded or recorded["monotonic"] <= decided_at:
+            recorded = snapshot["volume"] = {"level": volume, **_timestamp()}
+    return recorded["monotonic"]
+
+
+def load_cached_volume(path: Optional[Path] = None) -> Optional[int]:
+    """
+    Returns the volume of the last playback read or write, or None if it's too old to
+    trust.
+    """
+
+    path = path or state_path(PLAYBACK_STATE)
+    volume = read_state(path).get("volume")
+    if volume is None or not _is_fresh(volume, MAX_VOLUME_AGE):
+        return None
+    return volume["level"]
@@ -0,0 +1,97 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from spoticli.lib.paths import CACHE_DIR
+from spoticli.lib.profiler import Profiler
+from spoticli.lib.state import file_lock
+
+TRACE_LOG = CACHE_DIR / "trace.jsonl"
+# The log is rotated once it passes this size, keeping this many older files
+# (trace.jsonl.1 being the newest of them).
+MAX_TRACE_BYTES = 4 * 1024 * 1024
+TRACE_BACKUPS = 3
+
+
+def build_spans(profiler: Profiler, command: Optional[str]) -> list[dict[str, Any]]:
+    """
+    Turns what the profiler recorded into a tree of spans rooted at the command.
+
+    Each span's active time excludes the time spent waiting on prompts within it.
+    """
+
+    spans = [
+        {
+            "kind": "command",
+            "span_id": profiler.root_id,
+            "parent_id": None,
+            "name": command,
+            "start_ms": 0.0,
+            "duration_ms": profiler.elapsed_ms(),
+        }
+    ]
+    spans.extend({"kind": "phase", **phase} for phase in profiler.phases)
+    spans.extend(
+        {
+            "kind": "call",
+            "name": f"{call['method']} {call['endpoint']}",
+            "duration_ms": call["latency_ms"],
+            **call,
+        }
+        for call in profiler.calls
+    )
+
+    children: dict[str, list[dict[str, Any]]] = {}
+    for span in spans:
+        if span["parent_id"]:
+            children.setdefault(span["parent_id"], []).append(span)
+
+    def prompt_ms(span):
+        return sum(
+            child["duration_ms"] if child["name"] == "prompt" else prompt_ms(child)
+            for child in children.get(span["span_id"], ())
+        )
+
+    for span in spans:
+        span["trace_id"] = profiler.trace_id
+        span["start"] = profiler.started_wall + span["start_ms"] / 1000
+        span["active_ms"] = span["duration_ms"] - prompt_ms(span)
+    return spans
+
+
+def write_trace(spans: list[dict[str, Any]], path: Path = TRACE_LOG) -> None:
+    """
+    Appends an invocation's spans to the trace log, rotating it when it's full.
+    """
+
+    lines = "".join(json.dumps(span, separators=(",", ":")) + "\n" for span in spans)
+    with file_lock(path):
+        if path.exists() and path.stat().st_size > MAX_TRACE_BYTES:
+            for i in range(TRACE_BACKUPS, 0, -1):
+                older = _backup(path, i - 1) if i > 1 else path
+                if older.exists():
+                    os.replace(older, _backup(path, i))
+        with open(path, "a") as f:
+            f.write(lines)
+
+
+def read_spans(path: Path = TRACE_LOG) -> Iterator[dict[str, Any]]:
+    """
+    Yields the spans in the trace log and its rotated files, oldest first.
+    """
+
+    for log in [_backup(path, i) for i in range(TRACE_BACKUPS, 0, -1)] + [path]:
+        if not log.exists():
+            continue
+        with open(log) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # a line cut short by a crash or a full disk.
+                    continue
+
+
+def _backup(path: Path, i: int) -> Path:
+    return path.with_name(f"{path.name}.{i}")
@@ -0,0 +1,355 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from queue import Empty, Queue
+from typing import Any, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from spoticli.lib.cache import CachedResponse, HTTPCache
+from spoticli.lib.cassette import get_cassette
+from spoticli.lib.latency import (
+    HEDGED_ENDPOINTS,
+    TIMEOUT_BUDGETS,
+    BudgetExceeded,
+    get_latency_stats,
+    is_hedging,
+)
+from spoticli.lib.metrics import get_metrics
+from spoticli.lib.profiler import endpoint, get_profiler
+
+try:
+    import orjson
+except ImportError:  # the stdlib decoder is used instead
+    orjson = None  # type: ignore[assignment]
+
+# Keys dropped from every response before it's decoded. None of the commands use
+# them, and on track and album objects they make up most of the payload.
+PRUNED_KEYS = ("available_markets",)
+# Playback state changes from one moment to the next, so it's never served from the
+# HTTP cache whatever its headers say.
+UNCACHED_PATHS = ("/me/player",)
+# Responses under it depend on whose token fetched them, so it's part of their key.
+USER_PATH = "/me/"
+STORED_HEADERS = ("Content-Type", "ETag", "Cache-Control")
+# Values of the pruned keys are lists of country codes, so they never contain ']'.
+# The pattern starts with the key so that finding candidates is a plain search.
+_PRUNED_MEMBER = re.compile(
+    rb'"(?:%s)"\s*:\s*\[[^\]]*\]\s*(,?)' % "|".join(PRUNED_KEYS).encode()
+)
+
+
+def decode_json(content: bytes) -> Any:
+    """
+    Decodes a JSON document with orjson when it's installed.
+    """
+
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def prune(content: bytes) -> bytes:
+    """
+    Cuts the members listed in PRUNED_KEYS out of a JSON document before it's
+    decoded, which is much cheaper than decoding them and throwing them away.
+    """
+
+    if not any(key.encode() in content for key in PRUNED_KEYS):
+        return content
+    pieces = []
+    last = 0
+    for match in _PRUNED_MEMBER.finditer(content):
+        if content[match.start() - 1 : match.start()] == b"\\":
+            # the key is quoted inside a string value.
+            continue
+        piece = content[last : match.start()]
+        if not match.group(1):
+            # the last member of its object, so the comma before it goes instead.
+            piece = piece.rstrip()
+            if piece.endswith(b","):
+                piece = piece[:-1]
+        pieces.append(piece)
+        last = match.end()
+    pieces.append(content[last:])
+    return b"".join(pieces)
+
+
+class DecodedResponse(requests.Response):
+    def json(self, **kwargs) -> Any:
+        try:
+            return decode_json(prune(self.content))
+        except ValueError:
+            # decode the document as it came in case pruning broke it somehow.
+            return decode_json(self.content)
+
+
+class SpotiCLISession(requests.Session):
+    """
+    Session that all API requests go through. Responses decode through
+    decode_json with the pruned keys left out.
+
+    GET responses that carry an ETag or a max-age are kept in the HTTP cache: fresh
+    ones are served without a request, and stale ones are revalidated with
+    If-None-Match so that an unchanged resource isn't downloaded again.
+
+    While a cassette is recording, every response is written to it; while one is
+    replaying, requests are answered from it instead of the network.
+
+    Player requests are held to the timeouts in TIMEOUT_BUDGETS. When hedging is
+    enabled, a second attempt of a hedged read is sent once the first has taken
+    longer than its usual 95th percentile, and whichever answers first is used.
+    """
+
+    def __init__(self, http_cache: Optional[HTTPCache] = None):
+        super().__init__()
+        self.http_cache = http_cache
+
+    def request(self, method, url, *args, **kwargs):
+        cassette = get_cassette()
+        key = f"{method} {endpoint(url)}"
+        budget = TIMEOUT_BUDGETS.get(key)
+        if budget:
+            kwargs["timeout"] = min(kwargs.get("timeout") or budget, budget)
+        started = time.perf_counter()
+        response = None
+        try:
+            if cassette and cassette.replaying:
+                response = cassette.play(method, url, kwargs.get("params"))
+            elif method == "GET" and self.http_cache and _is_cacheable(url):
+                response = self._cached_get(url, *args, **kwargs)
+            else:
+                if key in HEDGED_ENDPOINTS:
+                    response = self._hedged_request(key, method, url, *args, **kwargs)
+                else:
+                    response = super().request(method, url, *args, **kwargs)
+                if cassette:
+                    cassette.record(method, url, kwargs.get("params"), response)
+        except requests.Timeout as e:
+            if not budget:
+                raise
+            raise BudgetExceeded(key, budget) from e
+        finally:
+            record_call(method, url, response, started)
+        response.__class__ = DecodedResponse
+        return response
+
+    def _hedged_request(self, key, method, url, *args, **kwargs):
+        stats = get_latency_stats()
+        send = super().request
+        if not is_hedging():
+            started = time.perf_counter()
+            response = send(method, url, *args, **kwargs)
+            stats.record(key, time.perf_counter() - started)
+            return response
+
+        outcomes: Queue = Queue()
+
+        def attempt():
+            started = time.perf_counter()
+            try:
+                response = send(method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                outcomes.put((None, e))
+                return
+            # each attempt's own latency, so that hedging doesn't skew the stats.
+            stats.record(key, time.perf_counter() - started)
+            outcomes.put((response, None))
+
+        # daemon threads, so a lost attempt doesn't hold up the end of the command.
+        threading.Thread(target=attempt, daemon=True).start()
+        try:
+            response, error = outcomes.get(timeout=stats.hedge_delay(key))
+        except Empty:
+            threading.Thread(target=attempt, daemon=True).start()
+            _record_hedge(key)
+            response, error = outcomes.get()
+            if error is not None:
+                # the other attempt may still succeed.
+                response, error = outcomes.get()
+        if error is not None:
+            raise error
+        return response
+
+    def _cached_get(self, url, *args, **kwargs):
+        authorization = (kwargs.get("headers") or {}).get("Authorization")
+        key = _cache_key(url, kwargs.get("params"), authorization)
+        cached, fresh = _lookup_cached(self.http_cache, key)
+        if fresh is not None:
+            return fresh
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(_revalidation_headers(cached))
+        response = super().request("GET", url, *args, headers=headers, **kwargs)
+        return _update_cached(self.http_cache, key, cached, response)
+
+
+class MeteredRetry(Retry):
+    """
+    Retry policy that counts rate limited responses and the time spent backing off
+    when metrics are being collected.
+    """
+
+    def increment(self, method=None, url=None, response=None, *args, **kwargs):
+        metrics = get_metrics()
+        if metrics and response is not None and response.status == 429:
+            metrics.inc("spoticli_api_rate_limited")
+        return super().increment(method, url, response, *args, **kwargs)
+
+    def sleep(self, response=None):
+        started = time.perf_counter()
+        super().sleep(response)
+        metrics = get_metrics()
+        if metrics:
+            metrics.inc("spoticli_api_backoff_seconds", time.perf_counter() - started)
+
+
+def record_call(
+    method: str, url: str, response: Optional[requests.Response], started: float
+) -> None:
+    """
+    Reports an API request to the profiler and metrics when they're enabled.
+    """
+
+    profiler = get_profiler()
+    if profiler:
+        profiler.record_call(method, url, response, started)
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    name = endpoint(url)
+    metrics.observe(
+        "spoticli_api_request_duration_seconds",
+        time.perf_counter() - started,
+        method=method,
+        endpoint=name,
+    )
+    status = str(response.status_code) if response is not None else "error"
+    metrics.inc("spoticli_api_requests", method=method, endpoint=name, status=status)
+
+
+def _cache_key(
+    url: str,
+    params: Optional[dict[str, Any]] = None,
+    authorization: Optional[str] = None,
+) -> str:
+    key = requests.Request("GET", url, params=params).prepare().url or url
+    if authorization and USER_PATH in url:
+        # the current user's library is only served to the token it was fetched for.
+        key += " " + hashlib.sha256(authorization.encode()).hexdigest()[:16]
+    return key
+
+
+def _is_cacheable(url: str) -> bool:
+    return not any(path in url for path in UNCACHED_PATHS)
+
+
+def _lookup_cached(
+    http_cache: HTTPCache, key: str
+) -> tuple[Optional[CachedResponse], Optional[requests.Response]]:
+    """
+    Looks a GET up in the HTTP cache, returning the cached entry and, while it's
+    still fresh, a response to use without making a request.
+    """
+
+    cached = http_cache.get(key)
+    if cached and cached.expires > time.time():
+        _record_cache_lookup("hit")
+        return cached, _from_cache(key, cached)
+    return cached, None
+
+
+def _revalidation_headers(cached: Optional[CachedResponse]) -> dict[str, str]:
+    return {"If-None-Match": cached.etag} if cached and cached.etag else {}
+
+
+def _update_cached(
+    http_cache: HTTPCache,
+    key: str,
+    cached: Optional[CachedResponse],
+    response: requests.Response,
+) -> requests.Response:
+    """
+    Answers a 304 from the cached entry, or stores a 200 that may be cached, and
+    returns the response to use.
+    """
+
+    if response.status_code == 304 and cached:
+        http_cache.refresh(key, _expires(response.headers))
+        response.status_code = 200
+        response._content = cached.body
+        response.from_cache = True  # type: ignore[attr-defined]
+        _record_cache_lookup("revalidated")
+        return response
+    _record_cache_lookup("miss")
+    if response.status_code == 200 and _is_storable(response.headers):
+        http_cache.put(
+            key,
+            CachedResponse(
+                response.headers.get("ETag"),
+                _expires(response.headers),
+                {
+                    name: response.headers[name]
+                    for name in STORED_HEADERS
+                    if name in response.headers
+                },
+                response.content,
+            ),
+        )
+    return response
+
+
+def _record_hedge(key: str) -> None:
+    metrics = get_metrics()
+    if metrics:
+        method, name = key.split(" ", 1)
+        metrics.inc("spoticli_api_hedged_requests", method=method, endpoint=name)
+
+
+def _record_cache_lookup(result: str) -> None:
+    metrics = get_metrics()
+    if metrics:
+        metrics.inc("spoticli_http_cache_lookups", result=result)
+
+
+def _cache_directives(headers) -> dict[str, str]:
+    directives = {}
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value
+    return directives
+
+
+def _is_storable(headers) -> bool:
+    directives = _cache_directives(headers)
+    if "no-store" in directives:
+        return False
+    return bool(headers.get("ETag")) or _max_age(directives) > 0
+
+
+def _max_age(directives: dict[str, str]) -> int:
+    if "no-cache" in directives:
+        return 0
+    try:
+        return int(directives.get("max-age", 0))
+    except ValueError:
+        return 0
+
+
+def _expires(headers) -> float:
+    return time.time() + _max_age(_cache_directives(headers))
+
+
+def _from_cache(url: str, cached: CachedResponse) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(cached.headers)
+    response._content = cached.body
+    response.encoding = "utf-8"
+    response.from_cache = True  # type: ignore[attr-defined]
+    return response
@@ -0,0 +1,62 @@
+import re
+from typing import Iterable
+
+import click
+from click.exceptions import Abort
+
+# Tracks, albums and playlists as open.spotify.com URLs (with or without a locale
+# segment and query string) or as spotify: URIs.
+_ITEM = re.compile(
+    r"(?:https?://open\.spotify\.com/(?:intl-[a-z]{2}(?:-[A-Za-z]{2})?/)?"
+    r"(?P<url_kind>track|album|playlist)/"
+    r"|spotify:(?P<uri_kind>track|album|playlist):)"
+    r"(?P<id>[0-9A-Za-z]{22})"
+    r"(?:[?#]\S*)?"
+)
+_SEPARATOR = re.compile(r"[\s,]+")
+# Invalid entries reported before giving up on the rest.
+MAX_REPORTED = 10
+
+
+def parse_uris(lines: Iterable[str]) -> tuple[list[str], list[tuple[int, str]]]:
+    """
+    Parses Spotify URLs and URIs, any number per line separated by spaces or commas,
+    into spotify: URIs in the order they appear.
+
+    Blank lines and lines starting with '#' are skipped. Anything else that isn't a
+    track, album or playlist is returned with its line number instead.
+    """
+
+    uris = []
+    invalid = []
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for token in _SEPARATOR.split(line):
+            if not token:
+                continue
+            match = _ITEM.fullmatch(token)
+            if match:
+                kind = match.group("url_kind") or match.group("uri_kind")
+                uris.append(f"spotify:{kind}:{match.group('id')}")
+            else:
+                invalid.append((line_no, token))
+    return uris, invalid
+
+
+def abort_on_invalid(invalid: list[tuple[int, str]]) -> None:
+    """
+    Reports the entries parse_uris couldn't parse, if there are any, and aborts.
+    """
+
+    if not invalid:
+        return
+    for line_no, token in invalid[:MAX_REPORTED]:
+        click.secho(
+            f"Line {line_no}: '{token}' isn't a Spotify track, album or playlist.",
+            fg="red",
+        )
+    if len(invalid) > MAX_REPORTED:
+        click.secho(f"...and {len(invalid) - MAX_REPORTED} more.", fg="red")
+    raise Abort()
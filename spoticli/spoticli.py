@@ -1,10 +1,27 @@
-from typing import Any, Optional
+import sys
+from typing import Any, Optional, TextIO
 
 import click
+from click import Context
 from click.exceptions import Abort
 from click.termui import style
 
 import spoticli.commands as commands
+from spoticli.commands.queue_by import parse_key, parse_range
+from spoticli.commands.trace import parse_since
+from spoticli.commands.volume import parse_duration
+from spoticli.lib.cassette import start_recording, start_replay
+from spoticli.lib.latency import BudgetExceeded, enable_hedging
+from spoticli.lib.output import (
+    OUTPUT_FORMATS,
+    is_machine_readable,
+    row_writer,
+    set_output_format,
+)
+from spoticli.lib.paths import DAEMON_SOCKET
+from spoticli.lib.playback import send_playback_command
+from spoticli.lib.profiler import start_profiling
+from spoticli.lib.trace import build_spans, write_trace
 from spoticli.lib.util import (
     add_album_to_queue,
     check_url_format,
@@ -15,12 +32,97 @@ from spoticli.lib.util import (
 )
 
 
-@click.group()
+class SpotiCLIGroup(click.Group):
+    def invoke(self, ctx):
+        try:
+            return super().invoke(ctx)
+        except BudgetExceeded as e:
+            click.secho(str(e), fg="red")
+            raise Abort() from e
+
+
+@click.group(cls=SpotiCLIGroup)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="table",
+    help="output format for listings",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="report the API calls made and time spent on exit",
+)
+@click.option(
+    "--profile-json",
+    type=click.Path(dir_okay=False, writable=True),
+    help="write the profile report to a JSON file instead",
+)
+@click.option(
+    "--trace",
+    is_flag=True,
+    help="append the command's spans to the local trace log",
+)
+@click.option(
+    "--hedge",
+    is_flag=True,
+    help="resend slow playback reads and use whichever answer comes first",
+)
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False, writable=True),
+    help="record the API responses to a cassette file",
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, dir_okay=False),
+    help="answer API requests from a recorded cassette file",
+)
 @click.pass_context
-def main(ctx):
+def main(
+    ctx,
+    output: str,
+    profile: bool,
+    profile_json: Optional[str],
+    trace: bool,
+    hedge: bool,
+    record: Optional[str],
+    replay: Optional[str],
+):
 
+    set_output_format(output)
+    if record and replay:
+        click.secho("Only one of --record and --replay can be given.", fg="red")
+        raise Abort()
+    if record:
+        start_recording(record)
+    elif replay:
+        start_replay(replay)
+    settings = commands.load_settings()
+    trace = trace or settings["trace"]
+    if hedge or settings["hedge"]:
+        enable_hedging()
+    if profile or profile_json or trace:
+        profiler = start_profiling()
+        if profile or profile_json:
+            ctx.call_on_close(lambda: profiler.report(profile_json))
+        if trace:
+            ctx.call_on_close(
+                lambda: write_trace(build_spans(profiler, ctx.invoked_subcommand))
+            )
     sp_auth, device_id, user = commands.setup_session(ctx)
-    ctx.obj = {"sp_auth": sp_auth, "device_id": device_id, "user": user}
+    ctx.obj = {
+        "sp_auth": sp_auth,
+        "device_id": device_id,
+        "user": user,
+        "settings": settings,
+    }
+
+
+def _is_fast(ctx: dict[str, Any], fast: Optional[bool]) -> bool:
+    # the command line flag wins over the config file default.
+    return ctx["settings"]["fast"] if fast is None else fast
 
 
 @main.command("cfg")
@@ -33,19 +135,22 @@ def cfg():
 
 @main.command("prev")
 @click.option("--device")
+@click.option("--fast/--checked", default=None, help="skip the playback check")
 @click.pass_obj
-def previous_track(ctx: dict[str, Any], device: Optional[str]):
+def previous_track(ctx: dict[str, Any], device: Optional[str], fast: Optional[bool]):
     """
     Skips playback to the track played previous to the current track.
     """
     device, sp_auth = get_auth_and_device(ctx, device)
 
-    playback_res = sp_auth.current_playback()
-    playback = get_current_playback(playback_res, display=False)
-    if playback.get("skip_prev_disallowed"):
-        click.echo("No previous tracks are available to skip to.")
-    else:
-        sp_auth.previous_track(device_id=device)
+    msg = "No previous tracks are available to skip to."
+    if not _is_fast(ctx, fast):
+        playback_res = sp_auth.current_playback()
+        playback = get_current_playback(playback_res, display=False)
+        if playback.get("skip_prev_disallowed"):
+            click.echo(msg)
+            return
+    if send_playback_command(lambda: sp_auth.previous_track(device_id=device), msg):
         wait_display_playback(sp_auth)
 
 
@@ -63,32 +168,38 @@ def next_track(ctx: dict[str, Any], device: Optional[str]):
 
 @main.command("pause")
 @click.option("--device")
+@click.option("--fast/--checked", default=None, help="skip the playback check")
 @click.pass_obj
-def pause_playback(ctx: dict[str, Any], device: Optional[str]):
+def pause_playback(ctx: dict[str, Any], device: Optional[str], fast: Optional[bool]):
     """
     Pauses playback.
     """
     device, sp_auth = get_auth_and_device(ctx, device)
 
-    current_playback = sp_auth.current_playback()
-    playback = get_current_playback(current_playback, display=False)
-    if playback.get("pausing_disallowed"):
-        click.echo("No current playback to pause.")
-    else:
-        sp_auth.pause_playback(device_id=device)
+    msg = "No current playback to pause."
+    if not _is_fast(ctx, fast):
+        current_playback = sp_auth.current_playback()
+        playback = get_current_playback(current_playback, display=False)
+        if playback.get("pausing_disallowed"):
+            click.echo(msg)
+            return
+    if send_playback_command(lambda: sp_auth.pause_playback(device_id=device), msg):
         click.echo("Playback paused.")
 
 
 @main.command("play")
 @click.option("--device")
+@click.option("--fast/--checked", default=None, help="skip the playback check")
 @click.argument("url", required=False)
 @click.pass_obj
-def start_playback(ctx: dict[str, Any], device: Optional[str], url: Optional[str]):
+def start_playback(
+    ctx: dict[str, Any], device: Optional[str], fast: Optional[bool], url: Optional[str]
+):
     """
     Resumes playback on the active track.
     """
     device, sp_auth = get_auth_and_device(ctx, device)
-    commands.start_playback(sp_auth, device, url)
+    commands.start_playback(sp_auth, device, url, fast=_is_fast(ctx, fast))
 
 
 @main.command("cp")
@@ -99,17 +210,61 @@ def start_playback(ctx: dict[str, Any], device: Optional[str], url: Optional[str
     help="collaborative or non-collaborative",
 )
 @click.option("-d", type=str, default="", help="playlist description")
+@click.option(
+    "--from",
+    "source",
+    type=click.File("r"),
+    help="file of URLs and URIs to add (- for stdin)",
+)
+@click.option(
+    "--append",
+    "mode",
+    flag_value="append",
+    help="add to the playlist with this name if there is one",
+)
+@click.option(
+    "--replace",
+    "mode",
+    flag_value="replace",
+    help="replace the tracks of the playlist with this name if there is one",
+)
 @click.argument("name", required=True)
 @click.pass_obj
-def create_playlist(ctx: dict[str, Any], pub: bool, c: bool, d: str, name: str):
+def create_playlist(
+    ctx: dict[str, Any],
+    pub: bool,
+    c: bool,
+    d: str,
+    source: Optional[TextIO],
+    mode: Optional[str],
+    name: str,
+):
     """
     Creates a new playlist.
+
+    With --from, it's filled with every track, album and playlist URL or URI read from
+    the file (or - for stdin), in order.
     """
     _, sp_auth = get_auth_and_device(ctx, device=None)
 
     if all((pub, c)):
         click.secho(style("Collaborative playlists can only be private.", fg="red"))
         raise Abort()
+    if mode and source is None:
+        click.secho(f"--{mode} needs a list of tracks given with --from.", fg="red")
+        raise Abort()
+    if source is not None:
+        commands.build_playlist(
+            sp_auth,
+            ctx["user"],
+            name,
+            source,
+            mode,
+            public=pub,
+            collaborative=c,
+            description=d,
+        )
+        return
     sp_auth.user_playlist_create(
         user=ctx["user"],
         name=name,
@@ -120,18 +275,30 @@ def create_playlist(ctx: dict[str, Any], pub: bool, c: bool, d: str, name: str):
     click.secho(style(f"Playlist '{name}' created successfully!", fg="green"))
 
 
-@main.command("seek")
+@main.command("seek", context_settings={"ignore_unknown_options": True})
 @click.option("--device")
-@click.argument("timestamp", required=True)
+@click.option("-s", "--section", type=int, help="section to seek to (1 is the first)")
+@click.option("-n", "--next-section", is_flag=True, help="seek to the next section")
+@click.argument("timestamp", required=False)
 @click.pass_obj
-def seek(ctx: dict[str, Any], timestamp: str, device: str):
+def seek(
+    ctx: dict[str, Any],
+    timestamp: Optional[str],
+    device: str,
+    section: Optional[int],
+    next_section: bool,
+):
     """
     Seeks the track to the timestamp specified.
 
-    Timestamp format is MM:SS
+    Timestamp format is MM:SS. Use +SS or -SS to seek relative to the current position.
     """
+    if timestamp and (section or next_section):
+        raise click.UsageError(
+            "A timestamp can't be combined with --section or --next-section."
+        )
     device, sp_auth = get_auth_and_device(ctx, device)
-    commands.seek(sp_auth, timestamp, device)
+    commands.seek(sp_auth, timestamp, device, section, next_section)
 
 
 @main.command("volup")
@@ -158,6 +325,19 @@ def decrease_volume(ctx: dict[str, Any], amount: int, device: str):
     commands.decrease_volume(amount, device, sp_auth)
 
 
+@main.command("vol")
+@click.option("--device")
+@click.option("--fade-to", type=click.IntRange(0, 100), required=True)
+@click.option("--over", default="0s", callback=parse_duration, help="e.g. 10s, 2m")
+@click.pass_obj
+def fade_volume(ctx: dict[str, Any], fade_to: int, over: float, device: str):
+    """
+    Fades the volume to the level specified over a duration.
+    """
+    device, sp_auth = get_auth_and_device(ctx, device)
+    commands.fade_volume(fade_to, over, device, sp_auth)
+
+
 @main.command("now")
 @click.option("-v", "--verbose", is_flag=True, help="displays additional info")
 @click.option("-u", "--url", default="t", help="displays current playback url")
@@ -169,6 +349,10 @@ def now_playing(ctx: dict[str, Any], verbose: bool, url: str):
     _, sp_auth = get_auth_and_device(ctx, device=None)
 
     current_playback = sp_auth.current_playback()
+    if is_machine_readable():
+        with row_writer() as rows:
+            rows.write(get_current_playback(res=current_playback, display=False))
+        return
     playback = get_current_playback(res=current_playback, display=True)
     track_uri = playback.get("track_uri")
     if track_uri and verbose:
@@ -254,19 +438,38 @@ def search(ctx: dict[str, Any], query: str, type_: str, device: str):
 
 @main.command("atq")
 @click.option("--device")
-@click.argument("url", required=True)
+@click.option(
+    "--from",
+    "source",
+    type=click.File("r"),
+    help="file of URLs and URIs to queue (- for stdin)",
+)
+@click.argument("url", required=False)
 @click.pass_obj
-def add_to_queue(ctx: dict[str, Any], url: str, device: str):
+def add_to_queue(
+    ctx: dict[str, Any], url: Optional[str], device: str, source: Optional[TextIO]
+):
     """
     Adds a track or album to the queue from a Spotify URL.
+
+    With - (or --from FILE), every track, album and playlist URL or URI read from stdin
+    (or the file) is queued in order.
     """
+    if url == "-":
+        source = sys.stdin
+    if source is None and url is None:
+        click.secho("Give a Spotify URL, or - to read them from stdin.", fg="red")
+        raise Abort()
     device, sp_auth = get_auth_and_device(ctx, device)
 
+    if source is not None:
+        commands.queue_items(sp_auth, source, device)
+        return
     try:
         valid_url = check_url_format(url)
     except ValueError:
         click.secho("An invalid URL was provided.", fg="red")
-    if "album" in url:
+    if "album" in url:  # type: ignore[operator]
         add_album_to_queue(sp_auth, valid_url, device)
     else:
         sp_auth.add_to_queue(valid_url, device)
@@ -287,3 +490,156 @@ def save_playlist_albums(
     check_url_format(url)
     _, sp_auth = get_auth_and_device(ctx, device=None)
     commands.save_playlist_items(sp_auth, url)
+
+
+@main.command("daemon")
+@click.option(
+    "-s", "--socket", "socket_path", default=str(DAEMON_SOCKET), help="socket path"
+)
+@click.option("-p", "--port", type=int, default=None, help="also serve SSE on port")
+@click.option("-i", "--interval", default=1.0, help="seconds between playback polls")
+@click.option(
+    "--metrics-port", type=int, default=None, help="serve OpenMetrics on port"
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="write OpenMetrics to a file for a textfile collector",
+)
+@click.pass_obj
+def daemon(
+    ctx: dict[str, Any],
+    socket_path: str,
+    port: Optional[int],
+    interval: float,
+    metrics_port: Optional[int],
+    metrics_file: Optional[str],
+):
+    """
+    Polls playback and streams state changes to subscribers.
+    """
+    _, sp_auth = get_auth_and_device(ctx, device=None)
+    commands.run_daemon(
+        sp_auth, socket_path, port, interval, metrics_port, metrics_file
+    )
+
+
+@main.command("subscribe")
+@click.option(
+    "-s", "--socket", "socket_path", default=str(DAEMON_SOCKET), help="socket path"
+)
+@click.option("-t", "--text", is_flag=True, help="human-readable output")
+@click.pass_obj
+def subscribe(ctx: dict[str, Any], socket_path: str, text: bool):
+    """
+    Prints playback events from a running daemon as NDJSON.
+    """
+    commands.subscribe(socket_path, text)
+
+
+@main.command("queue-by")
+@click.option("--device")
+@click.option("--tempo", callback=parse_range, help="BPM range, e.g. 120-128")
+@click.option("--key", callback=parse_key, help="note name (C, F#, Bb) or 0-11")
+@click.option("--energy", callback=parse_range, help="range within 0-1")
+@click.option("--danceability", callback=parse_range, help="range within 0-1")
+@click.option("-s", "--similar", is_flag=True, help="similar to the current track")
+@click.option("-l", "--limit", default=20, help="Tracks to queue")
+@click.option("--refresh", is_flag=True, help="rebuild the saved track features")
+@click.pass_obj
+def queue_by(
+    ctx: dict[str, Any],
+    device: Optional[str],
+    tempo: Optional[tuple[float, float]],
+    key: Optional[int],
+    energy: Optional[tuple[float, float]],
+    danceability: Optional[tuple[float, float]],
+    similar: bool,
+    limit: int,
+    refresh: bool,
+):
+    """
+    Queues saved tracks by tempo, key, energy or danceability.
+    """
+    device, sp_auth = get_auth_and_device(ctx, device)
+    commands.queue_by(
+        sp_auth,
+        device,
+        ranges={"tempo": tempo, "energy": energy, "danceability": danceability},
+        key=key,
+        similar=similar,
+        limit=limit,
+        refresh=refresh,
+    )
+
+
+@main.command("batch")
+@click.option("-k", "--keep-going", is_flag=True, help="continue after failed lines")
+@click.argument("script", type=click.File("r"))
+@click.pass_context
+def batch(ctx: Context, script: TextIO, keep_going: bool):
+    """
+    Runs spoticli commands from a file (or - for stdin), one per line, in one session.
+
+    Lines ending in '&' run alongside the following lines, up to the next line without
+    '&'.
+    """
+    commands.batch(ctx.find_root(), script, keep_going)
+
+
+@main.command("shell")
+@click.pass_context
+def shell(ctx: Context):
+    """
+    Starts an interactive prompt that runs commands in one session.
+    """
+    commands.shell(ctx.find_root())
+
+
+@main.group("trace")
+def trace_log():
+    """
+    Inspects the local trace log written with --trace.
+    """
+
+
+@trace_log.command("summarize")
+@click.option(
+    "--since",
+    callback=parse_since,
+    help="only include traces from the last period, e.g. 12h, 7d or 2w",
+)
+@click.option("--daily", is_flag=True, help="report each day separately")
+def summarize_traces(since: Optional[float], daily: bool):
+    """
+    Reports latency percentiles per command and per API endpoint.
+    """
+    commands.summarize_traces(since, daily)
+
+
+@main.group("jobs")
+def jobs():
+    """
+    Inspects and resumes bulk jobs (queueing, saving albums, building playlists).
+    """
+
+
+@jobs.command("list")
+def list_jobs():
+    """
+    Lists bulk jobs with their progress, throughput and ETA.
+    """
+    commands.show_jobs()
+
+
+@jobs.command("resume")
+@click.option("--device")
+@click.argument("job_id", required=True)
+@click.pass_obj
+def resume_job(ctx: dict[str, Any], job_id: str, device: Optional[str]):
+    """
+    Continues a bulk job from where it stopped.
+    """
+    _, sp_auth = get_auth_and_device(ctx, device=None)
+    commands.resume_job(sp_auth, job_id, device)
@@ -0,0 +1,31 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def serve():
+    """
+    Starts local stand-ins for the Web API, each answering every request through a
+    function given the BaseHTTPRequestHandler, and returns their API prefix.
+    """
+
+    servers = []
+
+    def start(respond):
+        class Handler(BaseHTTPRequestHandler):
+            do_GET = do_POST = do_PUT = do_DELETE = respond
+
+            def log_message(self, *args):
+                pass
+
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_port}/v1/"
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
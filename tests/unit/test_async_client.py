@@ -0,0 +1,310 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from spotipy.client import SpotifyException
+
+from benchmarks.fake_spotify import (
+    ALBUMS_PER_ARTIST,
+    ITEMS_PER_ALBUM,
+    PLAYLIST_ID,
+    TRACKS_PER_ALBUM,
+    FakeSpotify,
+)
+from spoticli.commands.save_playlist_items import _parse_playlist_items
+from spoticli.lib import async_client, client
+from spoticli.lib.async_client import AsyncSpotiCLIClient, RateLimiter, run_async_iter
+from spoticli.lib.cache import HTTPCache, MetadataCache
+from spoticli.lib.projections import MARKET, PLAYLIST_TRACK_URIS
+
+
+@pytest.fixture
+def sp(tmp_path, monkeypatch):
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    with FakeSpotify(items=1000, latency_ms=50) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        yield api, client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+
+
+def test_pages(sp):
+
+    api, sp_auth = sp
+
+    async def fetch():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            return [
+                item["track"]["uri"]
+                async for page in aio.pages(
+                    aio.playlist_items,
+                    100,
+                    playlist_id=PLAYLIST_ID,
+                    fields=PLAYLIST_TRACK_URIS,
+                )
+                for item in page["items"]
+            ]
+
+    started = time.perf_counter()
+    uris = asyncio.run(fetch())
+
+    # ten pages of 50 ms each, nine of them requested at once.
+    assert time.perf_counter() - started < 0.3
+    assert len(uris) == 1000
+    assert uris == [
+        f"spotify:track:{i // ITEMS_PER_ALBUM * TRACKS_PER_ALBUM + i % 3:022d}"
+        for i in range(1000)
+    ]
+    assert api.requests["GET playlists/{id}/tracks"] == 10
+
+
+def test_endpoints(sp):
+
+    api, sp_auth = sp
+
+    async def run():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            albums = await aio.artist_albums("spotify:artist:" + "0" * 22, limit=50)
+            contains = await aio.current_user_saved_albums_contains(
+                [album["uri"] for album in albums["items"][:3]]
+            )
+            await aio.current_user_saved_albums_add([albums["items"][1]["uri"]])
+            for i in range(3):
+                await aio.add_to_queue(f"spotify:track:{i:022d}")
+            return albums, contains
+
+    albums, contains = asyncio.run(run())
+
+    assert albums["total"] == ALBUMS_PER_ARTIST
+    assert len(albums["items"]) == 50
+    assert contains == [True, False, False]
+    assert api.queue == [f"spotify:track:{i:022d}" for i in range(3)]
+    assert api.requests["PUT me/albums"] == 1
+
+
+def test_rate_limited(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    monkeypatch.setattr(async_client, "BACKOFF_FACTOR", 0)
+    with FakeSpotify(items=500, rate_limit=0.3, seed=1) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        sp_auth = client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+
+        async def fetch():
+            async with AsyncSpotiCLIClient(sp_auth) as aio:
+                return [
+                    page["offset"]
+                    async for page in aio.pages(aio.current_user_saved_albums, 50)
+                ]
+
+        offsets = asyncio.run(fetch())
+
+    assert api.rate_limited
+    assert offsets == list(range(0, 500, 50))
+
+
+def test_album_tracks_metadata_cache(sp):
+
+    api, sp_auth = sp
+    album = "spotify:album:" + "0" * 22
+
+    async def run():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            return [await aio.album_tracks(album) for _ in range(2)]
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert api.requests["GET albums/{id}/tracks"] == 1
+    assert sp_auth.album_tracks(album) == first
+    assert api.requests["GET albums/{id}/tracks"] == 1
+
+
+@pytest.fixture
+def etag_server(serve):
+    requests_seen = []
+
+    def respond(handler):
+        requests_seen.append(handler.headers.get("If-None-Match"))
+        if handler.headers.get("If-None-Match") == '"v1"':
+            handler.send_response(304)
+            handler.send_header("ETag", '"v1"')
+            handler.end_headers()
+            return
+        body = b'{"items": []}'
+        handler.send_response(200)
+        handler.send_header("ETag", '"v1"')
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    return serve(respond), requests_seen
+
+
+def test_http_cache(etag_server, tmp_path, monkeypatch):
+
+    prefix, requests_seen = etag_server
+    monkeypatch.setattr(client, "HTTPCache", lambda: HTTPCache(tmp_path / "http.db"))
+    sp_auth = client.SpotiCLIClient(
+        auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+    )
+    sp_auth.prefix = prefix
+
+    async def run():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            return [await aio.current_user_saved_albums() for _ in range(2)]
+
+    assert asyncio.run(run()) == [{"items": []}] * 2
+    assert sp_auth.current_user_saved_albums(50, market=MARKET) == {"items": []}
+    # the first response is stored, then revalidated by both clients.
+    assert requests_seen == [None, '"v1"', '"v1"']
+
+
+def test_rate_limited_without_retry_after(serve, tmp_path, monkeypatch):
+    responses = [429, 200]
+
+    def respond(handler):
+        handler.send_response(responses.pop(0))
+        handler.send_header("Content-Length", "2")
+        handler.end_headers()
+        handler.wfile.write(b"{}")
+
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    sp_auth = client.SpotiCLIClient(
+        auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+    )
+    sp_auth.prefix = serve(respond)
+    pauses = []
+
+    async def run():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            monkeypatch.setattr(aio.limiter, "pause", pauses.append)
+            return await aio.current_user_saved_albums()
+
+    assert asyncio.run(run()) == {}
+    assert pauses == [async_client.BACKOFF_FACTOR]
+
+
+def test_server_errors_retry_idempotent_requests_only(serve, tmp_path, monkeypatch):
+    requests_seen = []
+
+    def respond(handler):
+        requests_seen.append(handler.command)
+        handler.send_response(500 if len(requests_seen) % 2 else 200)
+        handler.send_header("Content-Length", "2")
+        handler.end_headers()
+        handler.wfile.write(b"{}")
+
+    monkeypatch.setattr(async_client, "BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    sp_auth = client.SpotiCLIClient(
+        auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+    )
+    sp_auth.prefix = serve(respond)
+
+    async def run():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            await aio.current_user_saved_albums()
+            with pytest.raises(SpotifyException):
+                await aio.add_to_queue("spotify:track:" + "0" * 22)
+
+    asyncio.run(run())
+
+    assert requests_seen == ["GET", "GET", "POST"]
+
+
+def test_proxies(serve, tmp_path, monkeypatch):
+    paths = []
+
+    def respond(handler):
+        paths.append(handler.path)
+        handler.send_response(200)
+        handler.send_header("Content-Length", "2")
+        handler.end_headers()
+        handler.wfile.write(b"{}")
+
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    sp_auth = client.SpotiCLIClient(
+        auth="token",
+        metadata_cache=MetadataCache(tmp_path / "metadata.db"),
+        proxies={"http": serve(respond).removesuffix("v1/")},
+    )
+    sp_auth.prefix = "http://api.invalid/v1/"
+
+    async def run():
+        async with AsyncSpotiCLIClient(sp_auth) as aio:
+            return await aio.current_user_saved_albums()
+
+    assert asyncio.run(run()) == {}
+    assert paths[0].startswith("http://api.invalid/v1/me/albums")
+
+
+def test_rate_limiter():
+    async def run():
+        limiter = RateLimiter(rate=100, concurrency=4)
+
+        async def request():
+            async with limiter:
+                await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(150)))
+        return time.perf_counter() - started
+
+    # a second's worth straight away, then 100 a second.
+    assert 0.4 < asyncio.run(run()) < 1
+
+
+def test_run_async_iter():
+    async def numbers():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield i
+
+    async def failing():
+        yield 1
+        raise ValueError("failed")
+
+    assert list(run_async_iter(numbers())) == [0, 1, 2]
+    with pytest.raises(ValueError):
+        list(run_async_iter(failing()))
+
+
+def test_parse_playlist_items(sp):
+
+    api, sp_auth = sp
+
+    albums = list(_parse_playlist_items(sp_auth, PLAYLIST_ID))
+
+    # every album is shared by four items, and every third one is saved already.
+    uris = [album.uri for album in albums]
+    assert len(uris) == len(set(uris))
+    assert uris == sorted(uris)
+    assert all(int(uri.rsplit(":", 1)[-1]) % 3 for uri in uris)
+
+
+def test_run_async_iter_stops_with_caller():
+    produced = []
+    closed = threading.Event()
+
+    async def numbers():
+        try:
+            for i in range(1000):
+                await asyncio.sleep(0)
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    items = run_async_iter(numbers(), prefetch=2)
+    assert next(items) == 0
+    time.sleep(0.1)
+    # the first item, two prefetched ones, and one waiting for room.
+    assert len(produced) <= 4
+
+    items.close()
+    assert closed.wait(5)
+    assert len(produced) <= 4
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from spoticli.lib import auth
+from spoticli.lib.state import file_lock, write_state
+
+SCOPE = "user-read-playback-state"
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    calls = []
+
+    def refresh_access_token(self, refresh_token):
+        calls.append(refresh_token)
+        # long enough for other processes to be waiting on the lock.
+        time.sleep(0.05)
+        token_info = _token(f"access-{len(calls)}", expires_in=3600)
+        self.cache_handler.save_token_to_cache(token_info)
+        return token_info
+
+    monkeypatch.setattr(
+        auth.SpotiCLIOAuth, "refresh_access_token", refresh_access_token
+    )
+    return calls
+
+
+def _token(access_token, expires_in):
+    return {
+        "access_token": access_token,
+        "expires_at": int(time.time()) + expires_in,
+        "refresh_token": "refresh",
+        "scope": SCOPE,
+        "token_type": "Bearer",
+    }
+
+
+def _oauth(path):
+    return auth.SpotiCLIOAuth(
+        client_id="id",
+        client_secret="secret",
+        redirect_uri="http://127.0.0.1:8080",
+        scope=SCOPE,
+        cache_handler=auth.LockedCacheHandler(path),
+    )
+
+
+def test_concurrent_refresh(tmp_path, refreshes):
+
+    path = tmp_path / "token.json"
+    auth.LockedCacheHandler(path).save_token_to_cache(_token("expired", 0))
+    tokens = []
+
+    # each manager stands in for a separate spoticli process.
+    managers = [_oauth(path) for _ in range(5)]
+    threads = [
+        threading.Thread(
+            target=lambda m: tokens.append(m.get_access_token(as_dict=False)),
+            args=(manager,),
+        )
+        for manager in managers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refreshes == ["refresh"]
+    assert tokens == ["access-1"] * 5
+
+
+def test_background_refresh(tmp_path, refreshes):
+
+    path = tmp_path / "token.json"
+    auth.LockedCacheHandler(path).save_token_to_cache(_token("due", 120))
+    manager = _oauth(path)
+
+    # the token is due but still valid, so it's used while a new one is fetched.
+    assert manager.get_access_token(as_dict=False) == "due"
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and not thread.daemon:
+            thread.join()
+
+    assert refreshes == ["refresh"]
+    assert manager.get_access_token(as_dict=False) == "access-1"
+    assert _oauth(path).get_access_token(as_dict=False) == "access-1"
+
+
+def test_keep_token_fresh(tmp_path, refreshes, monkeypatch):
+
+    path = tmp_path / "token.json"
+    auth.LockedCacheHandler(path).save_token_to_cache(_token("due", 120))
+    stopped = threading.Event()
+    monkeypatch.setattr(auth, "REFRESH_MARGIN", 3600 - 0.1)
+
+    thread = threading.Thread(
+        target=auth.keep_token_fresh, args=(_oauth(path), stopped)
+    )
+    thread.start()
+    time.sleep(0.5)
+    stopped.set()
+    thread.join()
+
+    # refreshed straight away, then again whenever the new token came due.
+    assert len(refreshes) >= 2
+
+
+def test_background_refresh_gives_up_on_lock(tmp_path, refreshes, monkeypatch):
+
+    path = tmp_path / "token.json"
+    auth.LockedCacheHandler(path).save_token_to_cache(_token("due", 120))
+    monkeypatch.setattr(auth, "BACKGROUND_LOCK_TIMEOUT", 0.1)
+    manager = _oauth(path)
+
+    # another process is refreshing it and doesn't finish.
+    with file_lock(path):
+        assert manager.get_access_token(as_dict=False) == "due"
+        started = time.monotonic()
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and not thread.daemon:
+                thread.join(timeout=5)
+        assert time.monotonic() - started < 1
+
+    assert refreshes == []
+
+
+def test_legacy_token_is_migrated(tmp_path):
+
+    legacy_path = tmp_path / ".cache"
+    write_state(_token("legacy", 3600), legacy_path)
+    path = tmp_path / "spoticli" / "token.json"
+
+    handler = auth.LockedCacheHandler(path, legacy_path=legacy_path)
+
+    assert handler.get_cached_token()["access_token"] == "legacy"
+    assert auth.LockedCacheHandler(path).get_cached_token()["access_token"] == "legacy"
+    assert legacy_path.exists()
@@ -0,0 +1,78 @@
+import io
+import time
+
+import click
+import pytest
+from click.exceptions import Abort, Exit
+
+from spoticli.commands.batch import batch
+
+
+@click.group(invoke_without_command=True)
+def main():
+    pass
+
+
+@main.command("say")
+@click.argument("words")
+@click.pass_obj
+def say(obj, words):
+    obj.append(words)
+
+
+@main.command("slow")
+@click.argument("words")
+@click.pass_obj
+def slow(obj, words):
+    time.sleep(0.2)
+    obj.append(words)
+
+
+@main.command("fail")
+def fail():
+    raise Abort()
+
+
+def _run(script, keep_going=False):
+    ran = []
+    with main.make_context("spoticli", [], obj=ran) as ctx:
+        try:
+            batch(ctx, io.StringIO(script), keep_going)
+        except Exit as e:
+            return ran, e.exit_code
+    return ran, 0
+
+
+def test_parses_lines():
+
+    ran, exit_code = _run("# warm up\n\nsay 'a b'  # quoted\nsay c\n")
+
+    assert ran == ["a b", "c"]
+    assert exit_code == 0
+
+
+def test_background_lines():
+
+    started = time.monotonic()
+    ran, exit_code = _run("slow a &\nslow b &\nsay c\nsay d\n")
+
+    assert time.monotonic() - started < 0.35
+    assert sorted(ran[:2]) == ["a", "b"]
+    assert ran[2:] == ["c", "d"]
+    assert exit_code == 0
+
+
+@pytest.mark.parametrize(
+    "keep_going, expected", [(False, ["a"]), (True, ["a", "b", "c"])]
+)
+def test_failed_line(capsys, keep_going, expected):
+
+    ran, exit_code = _run("say a\nfail\nsay b\nshell\nsay 'c\nsay c\n", keep_going)
+
+    assert ran == expected
+    assert exit_code == 1
+    errors = capsys.readouterr().err
+    assert "Line 2: Aborted." in errors
+    if keep_going:
+        assert "Line 4: 'shell' can't be run here." in errors
+        assert "Line 5: No closing quotation." in errors
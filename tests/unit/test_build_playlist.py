@@ -0,0 +1,47 @@
+import io
+
+import pytest
+
+from benchmarks.fake_spotify import PLAYLIST_ID, USER_ID, FakeSpotify
+from spoticli.commands.build_playlist import build_playlist
+from spoticli.lib import client, jobs
+from spoticli.lib.cache import MetadataCache
+
+TRACKS = [f"spotify:track:{i:022d}" for i in range(250)]
+
+
+@pytest.fixture
+def sp(tmp_path, monkeypatch):
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    monkeypatch.setattr(jobs, "JOBS_DIR", tmp_path / "jobs")
+    with FakeSpotify() as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        yield api, client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+
+
+def test_build_playlist(sp):
+
+    api, sp_auth = sp
+
+    build_playlist(sp_auth, USER_ID, "Bench", io.StringIO("\n".join(TRACKS)))
+
+    # a new playlist, even though one with the same name exists.
+    (playlist_id,) = api.playlists
+    assert playlist_id != PLAYLIST_ID
+    assert api.playlists[playlist_id] == TRACKS
+    assert api.requests["POST playlists/{id}/tracks"] == 3
+
+
+@pytest.mark.parametrize("mode", ["append", "replace"])
+def test_existing_playlist(sp, mode):
+
+    api, sp_auth = sp
+    api.playlists[PLAYLIST_ID] = ["spotify:track:" + "9" * 22]
+
+    build_playlist(sp_auth, USER_ID, "Bench", io.StringIO("\n".join(TRACKS)), mode)
+
+    kept = api.playlists[PLAYLIST_ID][:1] if mode == "append" else []
+    assert api.playlists == {PLAYLIST_ID: kept + TRACKS}
+    assert api.requests["PUT playlists/{id}/tracks"] == (mode == "replace")
@@ -0,0 +1,77 @@
+import pytest
+
+from spoticli.lib.cache import MetadataCache
+from spoticli.lib.client import SpotiCLIClient
+
+
+@pytest.fixture
+def metadata_cache(tmp_path):
+    return MetadataCache(tmp_path / "metadata.sqlite3")
+
+
+def test_metadata_cache_roundtrip(metadata_cache):
+
+    metadata_cache.put("track", "spotify:track:a", {"name": "a"})
+
+    assert metadata_cache.get("track", "spotify:track:a") == {"name": "a"}
+    assert metadata_cache.get("album", "spotify:track:a") is None
+    assert metadata_cache.get_many("track", ["spotify:track:a", "spotify:track:b"]) == {
+        "spotify:track:a": {"name": "a"}
+    }
+
+
+def test_metadata_cache_evicts_least_recently_used(tmp_path):
+
+    metadata_cache = MetadataCache(tmp_path / "metadata.sqlite3", max_bytes=100)
+    metadata_cache.put("track", "spotify:track:old", {"name": "x" * 30})
+    metadata_cache.put("track", "spotify:track:new", {"name": "y" * 30})
+    metadata_cache.get("track", "spotify:track:old")
+    metadata_cache.put("track", "spotify:track:newest", {"name": "z" * 30})
+
+    assert metadata_cache.get("track", "spotify:track:new") is None
+    assert metadata_cache.get("track", "spotify:track:old") is not None
+    assert metadata_cache.get("track", "spotify:track:newest") is not None
+
+
+def test_client_fetches_misses_in_batches(metadata_cache, monkeypatch):
+
+    requests = []
+
+    def fake_get(self, url, args=None, payload=None, **kwargs):
+        ids = url.split("ids=")[1].split(",")
+        requests.append(ids)
+        return {"audio_features": [{"id": i, "tempo": 120.0} for i in ids]}
+
+    monkeypatch.setattr(SpotiCLIClient, "_get", fake_get)
+    sp_auth = SpotiCLIClient(auth="token", metadata_cache=metadata_cache)
+    uris = [f"spotify:track:{i:022d}" for i in range(150)]
+
+    features = sp_auth.audio_features(uris)
+    assert [len(ids) for ids in requests] == [100, 50]
+    assert features[0]["tempo"] == 120.0
+
+    sp_auth.audio_features(uris[0])
+    assert len(requests) == 2
+
+
+def test_client_fetches_albums_for_market(metadata_cache, monkeypatch):
+
+    requests = []
+
+    def fake_get(self, url, args=None, payload=None, **kwargs):
+        ids = url.split("ids=")[1].split(",")
+        requests.append((ids, kwargs))
+        return {"albums": [{"id": i} for i in ids]}
+
+    monkeypatch.setattr(SpotiCLIClient, "_get", fake_get)
+    sp_auth = SpotiCLIClient(auth="token", metadata_cache=metadata_cache)
+    uris = [f"spotify:album:{i:022d}" for i in range(25)]
+
+    albums = sp_auth.albums(uris)
+    assert [(len(ids), kwargs) for ids, kwargs in requests] == [
+        (20, {"market": "from_token"}),
+        (5, {"market": "from_token"}),
+    ]
+    assert albums["albums"][24] == {"id": f"{24:022d}"}
+    assert sp_auth.album(uris[3]) == {"id": f"{3:022d}"}
+    assert len(requests) == 2
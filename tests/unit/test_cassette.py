@@ -0,0 +1,68 @@
+import pytest
+from click.exceptions import Abort
+
+from benchmarks.fake_spotify import PLAYLIST_ID, FakeSpotify
+from spoticli.lib import cassette, client, jobs, state
+
+
+def test_request_key():
+
+    assert (
+        cassette.request_key(
+            "GET",
+            "https://api.spotify.com/v1/me/albums/?offset=0&limit=1",
+            {"market": "from_token"},
+        )
+        == "GET me/albums?limit=1&market=from_token&offset=0"
+    )
+    assert cassette.request_key("POST", "http://localhost/v1/me/player/next", None) == (
+        "POST me/player/next"
+    )
+
+
+def test_record_and_replay(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(cassette, "_cassette", None)
+    path = tmp_path / "spa.cassette"
+
+    def read_playlist():
+        sp_auth = client.SpotiCLIClient(auth="token")
+        page = sp_auth.playlist_items(PLAYLIST_ID, limit=100)
+        items = page["items"]
+        while page["next"]:
+            page = sp_auth.next(page)
+            items.extend(page["items"])
+        playback = [sp_auth.current_playback() for _ in range(3)]
+        return items, playback
+
+    with FakeSpotify(items=150) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        cassette.start_recording(str(path))
+        recorded = read_playlist()
+
+    # nothing listens on the prefix any more.
+    cassette.start_replay(str(path))
+    assert read_playlist() == recorded
+    assert len(path.read_text().splitlines()) == 5
+
+    with pytest.raises(Abort):
+        client.SpotiCLIClient(auth="token").devices()
+
+
+def test_state_is_kept_apart(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(cassette, "_cassette", None)
+    monkeypatch.setattr(state, "PLAYBACK_STATE", tmp_path / "playback.json")
+    state.record_volume(40)
+
+    path = tmp_path / "vol.cassette"
+    path.write_text("")
+    replay = cassette.start_replay(str(path))
+    # the user's snapshot neither steers the replay nor is overwritten by it.
+    assert state.load_cached_volume() is None
+    state.record_volume(70)
+    assert state.load_cached_volume() == 70
+    assert cassette.state_path(jobs.JOBS_DIR).parent == replay.state_dir
+
+    monkeypatch.setattr(cassette, "_cassette", None)
+    assert state.load_cached_volume() == 40
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from spotipy.cache_handler import MemoryCacheHandler
+
+from spoticli.commands.daemon import PlaybackBroadcaster, build_playback_event
+from spoticli.lib.auth import SpotiCLIOAuth, keep_token_fresh
+from spoticli.lib.latency import BudgetExceeded
+
+
+@pytest.fixture(scope="module")
+def example_response_data():
+    path = Path("tests/unit/artifacts/current_playback_res.json")
+    with open(path) as f:
+        res = json.load(f)
+
+    return res
+
+
+def test_build_playback_event(example_response_data):
+
+    event = build_playback_event(example_response_data)
+
+    assert event["event"] == "playback"
+    assert event["progress_ms"] == example_response_data["progress_ms"]
+    assert event["playback"]["track_name"] == "Love Will Work It Out"
+    assert build_playback_event(None)["event"] == "idle"
+
+
+def test_broadcaster_publishes_changes_only(example_response_data):
+
+    broadcaster = PlaybackBroadcaster(sp_auth=None, interval=1)
+    first = broadcaster.subscribe()
+    event = build_playback_event(example_response_data)
+
+    assert broadcaster._has_changed(event)
+    broadcaster.publish(event)
+    assert not broadcaster._has_changed(dict(event))
+    assert broadcaster._has_changed(build_playback_event(None))
+
+    # late subscribers receive the latest state immediately
+    second = broadcaster.subscribe()
+    assert first.get_nowait() == second.get_nowait()
+
+
+def test_polling_survives_timeouts(example_response_data):
+    class SlowPlayer:
+        polls = 0
+
+        def current_playback(self):
+            self.polls += 1
+            if self.polls == 1:
+                raise BudgetExceeded("GET me/player", 3.0)
+            return example_response_data
+
+    broadcaster = PlaybackBroadcaster(sp_auth=SlowPlayer(), interval=0.01)
+    subscriber = broadcaster.subscribe()
+    poller = threading.Thread(target=broadcaster.poll_forever)
+    poller.start()
+
+    line = subscriber.get(timeout=5)
+    broadcaster.close()
+    poller.join()
+
+    assert json.loads(line)["event"] == "playback"
+    assert broadcaster.sp_auth.polls >= 2
+
+
+def test_keeps_token_fresh_without_token_file(monkeypatch):
+
+    stopped = threading.Event()
+    handler = MemoryCacheHandler(
+        {
+            "access_token": "old",
+            "expires_at": int(time.time()),
+            "refresh_token": "refresh",
+            "scope": "user-read-playback-state",
+            "token_type": "Bearer",
+        }
+    )
+
+    def refresh_access_token(self, refresh_token):
+        token_info = {**handler.get_cached_token(), "access_token": "new"}
+        token_info["expires_at"] = int(time.time()) + 3600
+        handler.save_token_to_cache(token_info)
+        stopped.set()
+        return token_info
+
+    monkeypatch.setattr(SpotiCLIOAuth, "refresh_access_token", refresh_access_token)
+    auth_manager = SpotiCLIOAuth(
+        client_id="id",
+        client_secret="secret",
+        redirect_uri="http://127.0.0.1:8080",
+        scope="user-read-playback-state",
+        cache_handler=handler,
+    )
+
+    keep_token_fresh(auth_manager, stopped)
+
+    assert handler.get_cached_token()["access_token"] == "new"
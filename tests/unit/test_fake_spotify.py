@@ -0,0 +1,94 @@
+import pytest
+
+from benchmarks.bench_commands import find_regressions
+from benchmarks.fake_spotify import PLAYLIST_ID, FakeSpotify, parse_fields, project
+from spoticli.lib import client
+from spoticli.lib.cache import MetadataCache
+
+
+@pytest.fixture
+def sp(tmp_path, monkeypatch):
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    with FakeSpotify(items=250) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        yield api, client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+
+
+def test_parse_fields():
+
+    assert parse_fields("next,items(track(uri,album(name)))") == {
+        "next": None,
+        "items": {"track": {"uri": None, "album": {"name": None}}},
+    }
+    assert project({"a": [{"b": 1, "c": 2}], "d": 3}, parse_fields("a(b)")) == {
+        "a": [{"b": 1}]
+    }
+
+
+def test_playlist_pages(sp):
+
+    api, sp_auth = sp
+    page = sp_auth.playlist_items(
+        PLAYLIST_ID, fields="next,items(track(uri))", limit=100
+    )
+    uris = [item["track"]["uri"] for item in page["items"]]
+    while page["next"]:
+        page = sp_auth.next(page)
+        uris.extend(item["track"]["uri"] for item in page["items"])
+
+    assert len(uris) == 250
+    assert set(page["items"][0]["track"]) == {"uri"}
+    assert sum(api.requests.values()) == 3
+
+
+def test_market_leaves_out_markets():
+
+    api = FakeSpotify()
+    _, _, track = api.handle("GET", "/v1/tracks/" + "0" * 22, None)
+    _, _, tracks = api.handle("GET", "/v1/tracks?ids=1&market=from_token", None)
+    api.stop()
+
+    assert "available_markets" in track
+    assert "available_markets" not in tracks["tracks"][0]
+
+
+def test_rate_limited(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    with FakeSpotify(items=10, rate_limit=0.5, seed=1) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        sp_auth = client.SpotiCLIClient(
+            auth="token",
+            metadata_cache=MetadataCache(tmp_path / "metadata.db"),
+            status_retries=10,
+            backoff_factor=0,
+        )
+        for _ in range(5):
+            assert sp_auth.devices()["devices"][0]["is_active"]
+
+    assert api.rate_limited
+    assert api.requests["GET me/player/devices"] == 5 + api.rate_limited
+
+
+def test_find_regressions():
+
+    baseline = {
+        "results": [
+            {"scenario": "spa", "items": 10, "median_ms": 100, "requests": 3},
+            {"scenario": "rsa", "items": 10, "median_ms": 100, "requests": 3},
+        ]
+    }
+    results = [
+        {"scenario": "spa", "items": 10, "median_ms": 115, "requests": 3},
+        {"scenario": "rsa", "items": 10, "median_ms": 130, "requests": 4},
+        {"scenario": "now", "items": 10, "median_ms": 500, "requests": 9},
+    ]
+    for result in baseline["results"] + results:
+        result["rate_limited"] = 0
+
+    assert find_regressions(results, baseline, tolerance=0.2) == [
+        "rsa (10 items): 100 ms -> 130 ms",
+        "rsa (10 items): 3 -> 4 requests",
+    ]
@@ -0,0 +1,63 @@
+import pytest
+from click.exceptions import Abort
+from spotipy.client import SpotifyException
+
+from benchmarks.fake_spotify import FakeSpotify
+from spoticli.lib import client, jobs
+from spoticli.lib.async_client import AsyncSpotiCLIClient
+from spoticli.lib.cache import MetadataCache
+
+URIS = [f"spotify:track:{i:022d}" for i in range(10)]
+
+
+def test_journal(tmp_path):
+
+    job = jobs.Job.create("save_albums", URIS * 5, "albums", jobs_dir=tmp_path)
+    job.start()
+    job.acknowledge(0)
+    job.acknowledge(2)
+    with open(job.path, "a") as f:
+        # a line cut off by a crash.
+        f.write('{"ack": 1, "t"')
+
+    loaded = jobs.Job.load(job.path)
+
+    assert [index for index, _ in loaded.pending()] == [1]
+    assert loaded.pending()[0][1] == (URIS * 5)[20:40]
+    assert loaded.done_items == 30
+    assert not loaded.is_finished
+    assert loaded.is_running
+    assert loaded.throughput() > 0
+    assert loaded.eta() == pytest.approx(20 / loaded.throughput())
+    assert [job.id for job in jobs.list_jobs(tmp_path)] == [job.id]
+
+
+def test_resume(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    add_to_queue = AsyncSpotiCLIClient.add_to_queue
+    calls = []
+
+    async def failing_add_to_queue(self, uri, device_id=None):
+        calls.append(uri)
+        if len(calls) == 5:
+            raise SpotifyException(429, -1, "rate limited")
+        await add_to_queue(self, uri, device_id=device_id)
+
+    with FakeSpotify() as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        sp_auth = client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+        job = jobs.Job.create("queue", URIS, "queue", jobs_dir=tmp_path)
+
+        monkeypatch.setattr(AsyncSpotiCLIClient, "add_to_queue", failing_add_to_queue)
+        with pytest.raises(Abort):
+            jobs.run_job(sp_auth, job)
+        assert jobs.Job.load(job.path).done_items == 4
+
+        monkeypatch.setattr(AsyncSpotiCLIClient, "add_to_queue", add_to_queue)
+        jobs.run_job(sp_auth, jobs.Job.load(job.path))
+
+    assert api.queue == URIS
+    assert jobs.Job.load(job.path).is_finished
@@ -0,0 +1,90 @@
+import time
+
+import click
+import pytest
+from click.testing import CliRunner
+from requests.exceptions import RequestException
+
+from spoticli.lib import latency, transport
+from spoticli.spoticli import SpotiCLIGroup
+
+
+@pytest.fixture
+def slow_server(serve):
+    # the first request is slow, the following ones answer straight away.
+    requests_seen = []
+
+    def respond(handler):
+        requests_seen.append(handler.path)
+        if len(requests_seen) == 1:
+            time.sleep(1)
+        handler.send_response(200)
+        handler.send_header("Content-Length", "2")
+        handler.end_headers()
+        handler.wfile.write(b"{}")
+
+    return serve(respond), requests_seen
+
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    stats = latency.LatencyStats(tmp_path / "latency.json")
+    monkeypatch.setattr(latency, "_stats", stats)
+    return stats
+
+
+def test_hedge_delay(stats):
+
+    assert stats.hedge_delay("GET me/player") == latency.DEFAULT_HEDGE_DELAY
+    for i in range(1, 101):
+        stats.record("GET me/player", i / 100)
+    assert stats.hedge_delay("GET me/player") == 0.95
+
+    stats.save()
+    other = latency.LatencyStats(stats.path)
+    other.record("GET me/player", 0.01)
+    other.save()
+
+    assert len(latency.LatencyStats(stats.path)._samples["GET me/player"]) == 101
+
+
+def test_hedged_request(slow_server, stats, monkeypatch):
+
+    prefix, requests_seen = slow_server
+    monkeypatch.setattr(latency, "_hedging", True)
+    for _ in range(latency.MIN_SAMPLES):
+        stats.record("GET me/player", 0.01)
+
+    started = time.perf_counter()
+    response = transport.SpotiCLISession().request("GET", prefix + "me/player")
+
+    assert response.json() == {}
+    assert time.perf_counter() - started < 0.5
+    assert len(requests_seen) == 2
+
+
+def test_timeout_budget(slow_server, stats, monkeypatch):
+
+    prefix, _ = slow_server
+    monkeypatch.setitem(latency.TIMEOUT_BUDGETS, "POST me/player/next", 0.2)
+
+    with pytest.raises(latency.BudgetExceeded) as e:
+        transport.SpotiCLISession().request("POST", prefix + "me/player/next")
+    # callers that handle request errors handle these too.
+    assert isinstance(e.value, RequestException)
+    assert str(e.value) == "Spotify didn't answer 'POST me/player/next' within 0.2s."
+
+
+def test_budget_exceeded_aborts_command():
+    @click.group(cls=SpotiCLIGroup)
+    def main():
+        pass
+
+    @main.command("pause")
+    def pause():
+        raise latency.BudgetExceeded("PUT me/player/pause", 2.0)
+
+    result = CliRunner().invoke(main, ["pause"])
+
+    assert result.exit_code == 1
+    assert "didn't answer 'PUT me/player/pause' within 2.0s." in result.output
@@ -0,0 +1,75 @@
+import pytest
+
+from spoticli.lib import client, metrics
+from spoticli.lib.cache import MetadataCache
+
+
+def test_render():
+
+    m = metrics.Metrics()
+    m.observe("spoticli_api_request_duration_seconds", 0.2, endpoint="me/player")
+    m.observe("spoticli_api_request_duration_seconds", 20, endpoint="me/player")
+    m.inc("spoticli_api_rate_limited")
+    m.inc("spoticli_http_cache_lookups", result='a"b')
+
+    lines = m.render().splitlines()
+
+    assert (
+        'spoticli_api_request_duration_seconds_bucket{endpoint="me/player",le="0.1"} 0.0'
+        in lines
+    )
+    assert (
+        'spoticli_api_request_duration_seconds_bucket{endpoint="me/player",le="0.25"} 1.0'
+        in lines
+    )
+    assert (
+        'spoticli_api_request_duration_seconds_bucket{endpoint="me/player",le="+Inf"} 2.0'
+        in lines
+    )
+    assert (
+        'spoticli_api_request_duration_seconds_count{endpoint="me/player"} 2.0' in lines
+    )
+    assert "spoticli_api_rate_limited_total 1.0" in lines
+    assert 'spoticli_http_cache_lookups_total{result="a\\"b"} 1.0' in lines
+    assert "# TYPE spoticli_api_rate_limited counter" in lines
+    assert lines[-1] == "# EOF"
+
+
+@pytest.fixture
+def rate_limited_server(serve):
+    responses = [429, 200]
+
+    def respond(handler):
+        handler.send_response(responses.pop(0) if responses else 200)
+        handler.send_header("Retry-After", "0")
+        handler.send_header("Content-Length", "2")
+        handler.end_headers()
+        handler.wfile.write(b"{}")
+
+    return serve(respond)
+
+
+def test_client_metrics(rate_limited_server, tmp_path, monkeypatch):
+
+    monkeypatch.setattr(metrics, "_metrics", None)
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    m = metrics.start_metrics()
+    sp = client.SpotiCLIClient(
+        auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+    )
+    sp.prefix = rate_limited_server
+
+    assert sp._get("me/albums") == {}
+    lines = m.render().splitlines()
+
+    assert "spoticli_api_rate_limited_total 1.0" in lines
+    assert any(line.startswith("spoticli_api_backoff_seconds_total") for line in lines)
+    assert (
+        'spoticli_api_requests_total{endpoint="me/albums",method="GET",status="200"} 1.0'
+        in lines
+    )
+    assert not any(line.startswith("spoticli_token_refreshes") for line in lines)
+
+    sp._auth = "refreshed token"
+    sp._get("me/albums")
+    assert "spoticli_token_refreshes_total 1.0" in m.render().splitlines()
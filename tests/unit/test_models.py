@@ -0,0 +1,47 @@
+import sys
+
+import pytest
+
+from spoticli.lib.models import Album, PlayEvent
+
+
+@pytest.fixture
+def album_json():
+    return {
+        "album_type": "single",
+        "artists": [{"name": "Earth, Wind & Fire"}],
+        "name": "September",
+        "release_date": "1978-11-18",
+        "total_tracks": 2,
+        "uri": "spotify:album:0K3F1c4WUgC7RJEkH5sUgz",
+    }
+
+
+def test_play_event_from_json(album_json):
+
+    event = PlayEvent.from_json(
+        {
+            "played_at": "2022-05-01T12:00:00.000Z",
+            "track": {
+                "album": album_json,
+                "artists": [{"name": "Earth, Wind & Fire"}],
+                "duration_ms": 215093,
+                "name": "September",
+                "uri": "spotify:track:2grjqo0Frpf2okIBiifQKs",
+            },
+        }
+    )
+
+    assert event.track.artists == "Earth, Wind & Fire"
+    assert event.track.popularity is None
+    assert event.track.album.uri is sys.intern(album_json["uri"])
+    assert not hasattr(event.track, "__dict__")
+
+
+def test_album_is_full_length(album_json):
+
+    assert Album.from_json(album_json).is_full_length
+    assert not Album.from_json({**album_json, "total_tracks": 1}).is_full_length
+    assert not Album.from_json(
+        {**album_json, "album_type": "compilation"}
+    ).is_full_length
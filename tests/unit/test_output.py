@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from spoticli.lib import output
+
+
+@pytest.fixture
+def rows():
+    return [
+        {"index": 0, "name": "September", "artist(s)": "Earth, Wind & Fire"},
+        {"index": 1, "name": "Tab\there", "artist(s)": "JP Cooper"},
+    ]
+
+
+def _write(output_format, rows):
+    output.set_output_format(output_format)
+    try:
+        with output.row_writer() as writer:
+            for i, row in enumerate(rows):
+                writer.write(row, uri=f"spotify:track:{i}")
+    finally:
+        output.set_output_format("table")
+
+
+def test_ndjson_output(rows, capsys):
+
+    _write("ndjson", rows)
+    lines = capsys.readouterr().out.splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {**row, "uri": f"spotify:track:{i}"} for i, row in enumerate(rows)
+    ]
+
+
+def test_json_output(rows, capsys):
+
+    _write("json", rows)
+    assert json.loads(capsys.readouterr().out)[1]["uri"] == "spotify:track:1"
+
+    _write("json", [])
+    assert json.loads(capsys.readouterr().out) == []
+
+
+def test_tsv_output(rows, capsys):
+
+    _write("tsv", rows)
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines[0] == "index\tname\tartist(s)\turi"
+    assert lines[2] == "1\tTab\\there\tJP Cooper\tspotify:track:1"
+
+
+def test_streaming_table_sampled_widths(rows, capsys):
+
+    with output.row_writer(stream=True) as writer:
+        for row in rows:
+            writer.write(row)
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines[0].split() == ["index", "name", "artist(s)"]
+    assert lines[2].startswith("0      September  Earth, Wind & Fire")
+    assert len(lines) == 4
+
+
+def test_streaming_table_fixed_widths(rows, capsys, monkeypatch):
+
+    with output.row_writer(stream=True, widths={"index": 5, "name": 6}) as writer:
+        writer.write(rows[0])
+        # rows are printed as they're written when the widths are known up front.
+        assert capsys.readouterr().out.splitlines()[2] == "0      Sep..."
+        writer.write(rows[1])
+
+    assert capsys.readouterr().out == "1      Tab...\n"
@@ -0,0 +1,77 @@
+from importlib import import_module
+
+import pytest
+from spotipy.client import SpotifyException
+
+from spoticli.commands import main_setup
+from spoticli.lib.playback import is_restriction_violation, send_playback_command
+
+RESTRICTED = SpotifyException(
+    403,
+    -1,
+    "https://api.spotify.com/v1/me/player/play:\n Player command failed: "
+    "Restriction violated",
+)
+# the package re-exports the function under the module's name.
+start_playback_module = import_module("spoticli.commands.start_playback")
+
+
+class Player:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def current_playback(self, *args, **kwargs):
+        self.calls.append("current_playback")
+        return None
+
+    def start_playback(self, device_id=None, **kwargs):
+        self.calls.append("start_playback")
+        if self.error:
+            raise self.error
+
+
+def test_is_restriction_violation():
+
+    assert is_restriction_violation(RESTRICTED)
+    assert not is_restriction_violation(SpotifyException(403, -1, "Forbidden"))
+    assert not is_restriction_violation(
+        SpotifyException(404, -1, "Restriction violated")
+    )
+
+
+def test_send_playback_command(capsys):
+
+    assert send_playback_command(lambda: None, "Playback is already active.")
+
+    player = Player(error=RESTRICTED)
+    assert not send_playback_command(player.start_playback, "Already active.")
+    assert capsys.readouterr().out == "Already active.\n"
+
+    player = Player(error=SpotifyException(403, -1, "Forbidden"))
+    with pytest.raises(SpotifyException):
+        send_playback_command(player.start_playback, "Already active.")
+
+
+@pytest.mark.parametrize(
+    "fast, calls",
+    [(True, ["start_playback"]), (False, ["current_playback", "start_playback"])],
+)
+def test_start_playback_fast(monkeypatch, capsys, fast, calls):
+
+    monkeypatch.setattr(start_playback_module, "wait_display_playback", print)
+    player = Player(error=RESTRICTED)
+
+    start_playback_module.start_playback(player, None, None, fast=fast)
+
+    assert player.calls == calls
+    assert "Playback is already active." in capsys.readouterr().out
+
+
+def test_load_settings(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(main_setup, "CONFIG_FILE", tmp_path / "spoticli.ini")
+    assert not main_setup.load_settings()["fast"]
+
+    (tmp_path / "spoticli.ini").write_text("[settings]\nfast = true\n")
+    assert main_setup.load_settings()["fast"]
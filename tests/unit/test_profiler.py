@@ -0,0 +1,55 @@
+import time
+
+import pytest
+import requests
+
+from spoticli.lib import profiler
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        (
+            "https://api.spotify.com/v1/playlists/37i9dQZF1DXcBWIGoYBM5M/tracks?limit=1",
+            "playlists/{id}/tracks",
+        ),
+        (
+            "https://api.spotify.com/v1/users/joe.b/playlists",
+            "users/{user_id}/playlists",
+        ),
+        ("https://api.spotify.com/v1/me/albums/contains", "me/albums/contains"),
+    ],
+)
+def test_endpoint(url, expected):
+
+    assert profiler.endpoint(url) == expected
+
+
+def _response(status_code, content=b"{}"):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+def test_summary():
+
+    p = profiler.Profiler()
+    url = "https://api.spotify.com/v1/me/albums"
+    p.record_call("GET", url, _response(200, b"[1, 2]"), time.perf_counter())
+    started = time.perf_counter()
+    p.record_call("GET", url, _response(429), time.perf_counter())
+    p.record_call("PUT", url, None, time.perf_counter())
+    p.record_phase("render", started)
+
+    summary = p.summary()
+
+    get, put = summary["endpoints"][0], summary["endpoints"][1]
+    if get["endpoint"] != "GET me/albums":
+        get, put = put, get
+    assert (get["calls"], get["errors"], get["bytes"]) == (2, 1, 8)
+    assert (put["calls"], put["errors"], put["bytes"]) == (1, 1, 0)
+    (render,) = summary["phases"]
+    assert render["api_ms"] == pytest.approx(
+        sum(call["latency_ms"] for call in p.calls[1:])
+    )
@@ -0,0 +1,15 @@
+from spoticli.lib.projections import PLAYLIST_ALBUMS, fields
+
+
+def test_fields():
+
+    assert fields("next", {"items": {"track": "uri"}}) == "next,items(track(uri))"
+    assert fields({"a": ["b", {"c": ["d", "e"]}], "f": "g"}) == "a(b,c(d,e)),f(g)"
+
+
+def test_playlist_albums():
+
+    assert PLAYLIST_ALBUMS == (
+        "total,"
+        "items(track(album(album_type,artists(name),name,total_tracks,uri,release_date)))"
+    )
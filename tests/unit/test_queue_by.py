@@ -0,0 +1,142 @@
+from importlib import import_module
+
+import pytest
+from click.exceptions import Abort
+
+from spoticli.commands.queue_by import (
+    FEATURE_COLUMNS,
+    filter_tracks,
+    nearest_tracks,
+    parse_key,
+    parse_range,
+    refresh_feature_matrix,
+)
+
+np = pytest.importorskip("numpy")
+# the package re-exports the function under the module's name.
+queue_by_module = import_module("spoticli.commands.queue_by")
+
+
+@pytest.fixture(scope="module")
+def features():
+    rows = [
+        {"tempo": 90.0, "key": 0, "energy": 0.2, "danceability": 0.3},
+        {"tempo": 124.0, "key": 5, "energy": 0.8, "danceability": 0.9},
+        {"tempo": 126.0, "key": 5, "energy": 0.7, "danceability": 0.8},
+        {"tempo": 174.0, "key": 2, "energy": 0.9, "danceability": 0.5},
+    ]
+    return np.array(
+        [[row.get(column, 0.0) for column in FEATURE_COLUMNS] for row in rows],
+        dtype=np.float32,
+    )
+
+
+def test_parse_range():
+
+    assert parse_range(None, None, "120-128") == (120.0, 128.0)
+    assert parse_range(None, None, "0.5") == (0.5, 0.5)
+    assert parse_range(None, None, None) is None
+
+
+def test_parse_key():
+
+    assert parse_key(None, None, "C") == 0
+    assert parse_key(None, None, "f#") == 6
+    assert parse_key(None, None, "Bb") == 10
+    assert parse_key(None, None, "11") == 11
+
+
+def test_filter_tracks(features):
+
+    mask = filter_tracks(features, {"tempo": (120, 130), "energy": (0.75, 1)})
+    assert mask.tolist() == [False, True, False, False]
+
+    mask = filter_tracks(features, {}, key=5)
+    assert mask.tolist() == [False, True, True, False]
+
+
+def test_nearest_tracks(features):
+
+    mask = np.array([True, False, True, True])
+    nearest = nearest_tracks(features, features[1], mask, limit=2)
+
+    assert nearest.tolist() == [2, 3]
+
+
+class SavedTracks:
+    def __init__(self, items):
+        self.items = items
+        self.requested = []
+
+    def current_user_saved_tracks(self, limit=20, offset=0):
+        return {"items": self.items[offset : offset + limit]}
+
+    def audio_features(self, uris):
+        self.requested.extend(uris)
+        return [{column: 1.0 for column in FEATURE_COLUMNS} for _ in uris]
+
+
+def test_refresh_feature_matrix_skips_local_files(tmp_path):
+
+    items = [
+        {"track": {"uri": f"spotify:track:{i:022d}", "is_local": False}}
+        for i in range(60)
+    ]
+    items[3] = {
+        "track": {"uri": "spotify:local:Artist:Album:Title:180", "is_local": True}
+    }
+    sp_auth = SavedTracks(items)
+
+    uris, features = refresh_feature_matrix(sp_auth, path=tmp_path / "features.npz")
+
+    assert len(uris) == len(features) == 59
+    assert not any(uri.startswith("spotify:local:") for uri in sp_auth.requested)
+
+
+class Library(SavedTracks):
+    def __init__(self, items, playing="track"):
+        super().__init__(items)
+        self.playing = playing
+        self.queued = []
+
+    def current_playback(self):
+        return {
+            "currently_playing_type": self.playing,
+            "item": {"uri": "spotify:episode:" + "0" * 22},
+        }
+
+    def tracks(self, uris):
+        # the first track is no longer available.
+        return {
+            "tracks": [None]
+            + [{"uri": uri, "name": "Song", "artists": []} for uri in uris[1:]]
+        }
+
+    def add_to_queue(self, uri, device_id=None):
+        self.queued.append(uri)
+
+
+@pytest.fixture
+def library(features, monkeypatch):
+    uris = np.array([f"spotify:track:{i:022d}" for i in range(len(features))])
+    monkeypatch.setattr(
+        queue_by_module, "refresh_feature_matrix", lambda *a, **k: (uris, features)
+    )
+    monkeypatch.setattr(queue_by_module, "display_table", lambda rows: None)
+    return uris
+
+
+def test_queue_by_skips_unavailable_tracks(library):
+
+    sp_auth = Library([])
+    queue_by_module.queue_by(sp_auth, None, {}, None, False, 10, False)
+
+    assert len(sp_auth.queued) == len(library) - 1
+
+
+def test_queue_by_similar_rejects_episodes(library):
+
+    sp_auth = Library([], playing="episode")
+    with pytest.raises(Abort):
+        queue_by_module.queue_by(sp_auth, None, {}, None, True, 10, False)
+    assert not sp_auth.queued
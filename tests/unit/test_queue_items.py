@@ -0,0 +1,78 @@
+import io
+
+import pytest
+from click.exceptions import Abort
+
+from benchmarks.fake_spotify import PLAYLIST_ID, TRACKS_PER_ALBUM, FakeSpotify
+from spoticli.commands.queue_items import queue_items
+from spoticli.lib import client, jobs
+from spoticli.lib.cache import MetadataCache
+from spoticli.lib.uris import parse_uris
+
+
+def _track(i):
+    return f"spotify:track:{i:022d}"
+
+
+@pytest.fixture
+def sp(tmp_path, monkeypatch):
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    monkeypatch.setattr(jobs, "JOBS_DIR", tmp_path / "jobs")
+    with FakeSpotify(items=8) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        yield api, client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+
+
+def test_parse_uris():
+
+    lines = [
+        "# tonight's set\n",
+        f"https://open.spotify.com/track/{'1' * 22}?si=abc\n",
+        f"https://open.spotify.com/intl-de/album/{'2' * 22}, spotify:track:{'3' * 22}\n",
+        "\n",
+        f"spotify:playlist:{PLAYLIST_ID} not-a-uri\n",
+        f"https://open.spotify.com/artist/{'4' * 22}\n",
+    ]
+
+    uris, invalid = parse_uris(lines)
+
+    assert uris == [
+        f"spotify:track:{'1' * 22}",
+        f"spotify:album:{'2' * 22}",
+        f"spotify:track:{'3' * 22}",
+        f"spotify:playlist:{PLAYLIST_ID}",
+    ]
+    assert invalid == [
+        (5, "not-a-uri"),
+        (6, f"https://open.spotify.com/artist/{'4' * 22}"),
+    ]
+
+
+def test_queue_items(sp):
+
+    api, sp_auth = sp
+    api.queue.append(_track(7))
+    album = f"spotify:album:{1:022d}"
+    lines = io.StringIO(
+        f"{_track(5)}\n{album}\n{_track(5)}\n{_track(7)}\n"
+        f"spotify:playlist:{PLAYLIST_ID}\n"
+    )
+
+    queue_items(sp_auth, lines, device=None)
+
+    album_tracks = [_track(TRACKS_PER_ALBUM + i) for i in range(TRACKS_PER_ALBUM)]
+    # the playlist lists tracks of the first two albums, where track 0 is playing and
+    # the second album was queued already.
+    playlist_tracks = [_track(1), _track(2)]
+    assert api.queue == [_track(7), _track(5), *album_tracks, *playlist_tracks]
+
+
+def test_queue_items_invalid(sp):
+
+    api, sp_auth = sp
+
+    with pytest.raises(Abort):
+        queue_items(sp_auth, io.StringIO(f"{_track(1)}\nnope\n"), device=None)
+    assert api.queue == []
@@ -0,0 +1,100 @@
+from importlib import import_module
+
+import click
+import pytest
+
+from benchmarks.fake_spotify import USER_ID, FakeSpotify
+from spoticli.commands.shell import ShellCompleter, shell
+from spoticli.lib import client
+from spoticli.lib.cache import MetadataCache
+
+
+@pytest.fixture
+def sp(tmp_path, monkeypatch):
+    monkeypatch.setattr(client, "HTTPCache", lambda: None)
+    with FakeSpotify(items=10) as api:
+        monkeypatch.setenv("SPOTICLI_API_PREFIX", api.prefix)
+        yield api, client.SpotiCLIClient(
+            auth="token", metadata_cache=MetadataCache(tmp_path / "metadata.db")
+        )
+
+
+# the package re-exports the function under the module's name.
+shell_module = import_module("spoticli.commands.shell")
+
+
+@click.group(invoke_without_command=True)
+def main():
+    pass
+
+
+@main.command("say")
+@click.option("--device")
+@click.argument("words")
+@click.pass_obj
+def say(obj, device, words):
+    obj["said"].append(words)
+
+
+def test_session_cache(sp):
+
+    api, sp_auth = sp
+    sp_auth.current_user_playlists()
+    sp_auth.current_user_playlists()
+    assert api.requests["GET me/playlists"] == 2
+
+    sp_auth.enable_session_cache()
+    sp_auth.current_user_playlists()
+    sp_auth.current_user_playlists()
+    sp_auth.devices()
+    assert api.requests["GET me/playlists"] == 3
+
+    sp_auth.user_playlist_create(USER_ID, "New")
+    assert sp_auth.peek_session_cache("playlists", 50, 0) is None
+    assert sp_auth.peek_session_cache("devices") is not None
+    sp_auth.current_user_playlists()
+    assert api.requests["GET me/playlists"] == 4
+
+    sp_auth.transfer_playback(sp_auth.devices()["devices"][0]["id"])
+    assert sp_auth.peek_session_cache("devices") is None
+    assert api.requests["GET me/player/devices"] == 1
+
+
+def test_completions_make_no_requests(sp, monkeypatch):
+
+    api, sp_auth = sp
+    sp_auth.enable_session_cache()
+    sp_auth.devices()
+    sp_auth.current_user_playlists(limit=50)
+    with main.make_context("spoticli", [], obj={"sp_auth": sp_auth}) as ctx:
+        completer = ShellCompleter(ctx)
+        requests = sum(api.requests.values())
+
+        assert completer._candidates([], "") == ["say", "exit", "quit"]
+        assert completer._candidates(["say"], "--") == ["--device", "--help"]
+        assert completer.device_ids() == [
+            device["id"] for device in sp_auth.devices()["devices"]
+        ]
+        assert completer.urls()[0].startswith("https://open.spotify.com/playlist/")
+        assert sum(api.requests.values()) == requests
+
+
+def test_shell(monkeypatch, capsys):
+    class SessionClient:
+        def enable_session_cache(self):
+            self.enabled = True
+
+    lines = iter(["say 'a b'", "say 'c", "", "nope", "help say", "say d", "exit"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(lines))
+    monkeypatch.setattr(shell_module, "readline", None)
+    obj = {"sp_auth": SessionClient(), "said": []}
+
+    with main.make_context("spoticli", [], obj=obj) as ctx:
+        shell(ctx)
+
+    assert obj["said"] == ["a b", "d"]
+    assert obj["sp_auth"].enabled
+    out = capsys.readouterr()
+    assert "No closing quotation." in out.out
+    assert "'nope' can't be run here." in out.err
+    assert "Usage: spoticli say [OPTIONS] WORDS" in out.out
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from spoticli.lib import state
+
+TRACK = {"uri": "spotify:track:" + "1" * 22, "duration_ms": 200_000}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "playback.json"
+
+
+def _record(path, is_playing=True, progress_ms=60_000):
+    state.record_playback(
+        {
+            "item": TRACK,
+            "progress_ms": progress_ms,
+            "is_playing": is_playing,
+            "device": {"volume_percent": 40},
+        },
+        path,
+    )
+
+
+def test_snapshot_extrapolates_while_playing(path, monkeypatch):
+
+    _record(path)
+    monkeypatch.setattr(time, "monotonic", lambda real=time.monotonic: real() + 5)
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + 5)
+
+    assert 65_000 <= state.load_playback_snapshot(path)["progress_ms"] < 66_000
+
+
+def test_snapshot_expires(path, monkeypatch):
+
+    _record(path)
+    later = state.MAX_SNAPSHOT_AGE + 1
+    monkeypatch.setattr(time, "monotonic", lambda real=time.monotonic: real() + later)
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + later)
+
+    assert state.load_playback_snapshot(path) is None
+
+
+def test_pause_stops_extrapolation(path, monkeypatch):
+
+    _record(path)
+    state.record_play_state(False, path)
+    monkeypatch.setattr(time, "monotonic", lambda real=time.monotonic: real() + 5)
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + 5)
+
+    snapshot = state.load_playback_snapshot(path)
+    assert not snapshot["is_playing"]
+    assert 60_000 <= snapshot["progress_ms"] < 61_000
+
+
+def test_forget_track_keeps_volume(path):
+
+    _record(path)
+    state.forget_track(path)
+
+    assert state.load_playback_snapshot(path) is None
+    assert state.load_cached_volume(path) == 40
+
+
+def test_playback_without_device_keeps_volume(path):
+
+    _record(path)
+    state.record_playback({"item": TRACK, "progress_ms": 0, "is_playing": True}, path)
+
+    assert state.load_cached_volume(path) == 40
+    assert state.load_playback_snapshot(path)["progress_ms"] < 1_000
+
+
+def test_concurrent_writes_are_kept(path):
+
+    _record(path)
+    writers = [
+        threading.Thread(target=state.record_volume, args=(70, path)),
+        threading.Thread(target=state.record_position, args=(120_000, path)),
+        threading.Thread(target=state.record_play_state, args=(False, path)),
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    snapshot = state.load_playback_snapshot(path)
+    assert not snapshot["is_playing"]
+    assert state.load_cached_volume(path) == 70
+
+
+def test_out_of_order_volume_is_dropped(path):
+
+    decided_at = time.monotonic()
+    state.record_volume(70, path)
+    state.record_volume(60, path, decided_at=decided_at)
+
+    assert state.load_cached_volume(path) == 70
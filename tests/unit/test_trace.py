@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from spoticli.commands.trace import _percentile
+from spoticli.lib import trace
+from spoticli.lib.profiler import Profiler
+
+
+def test_build_spans_excludes_prompts():
+
+    profiler = Profiler()
+    started = time.perf_counter()
+    outer_id, outer_parent = profiler.open_phase()
+    prompt_id, prompt_parent = profiler.open_phase()
+    time.sleep(0.02)
+    profiler.record_phase("prompt", started, prompt_id, prompt_parent)
+    profiler.record_call(
+        "GET", "https://api.spotify.com/v1/me/albums", None, time.perf_counter()
+    )
+    profiler.record_phase("devices", started, outer_id, outer_parent)
+
+    spans = {span["name"]: span for span in trace.build_spans(profiler, "rsa")}
+
+    command, devices = spans["rsa"], spans["devices"]
+    assert devices["parent_id"] == command["span_id"]
+    assert spans["prompt"]["parent_id"] == devices["span_id"]
+    assert spans["GET me/albums"]["parent_id"] == devices["span_id"]
+    assert command["active_ms"] == pytest.approx(
+        command["duration_ms"] - spans["prompt"]["duration_ms"]
+    )
+    assert {span["trace_id"] for span in spans.values()} == {profiler.trace_id}
+
+
+def test_write_trace_rotates(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(trace, "MAX_TRACE_BYTES", 100)
+    path = tmp_path / "trace.jsonl"
+    for i in range(20):
+        trace.write_trace([{"name": "x" * 60, "i": i}], path)
+
+    kept = [span["i"] for span in trace.read_spans(path)]
+    # each file holds two lines before it's rotated, and three are kept besides it.
+    assert kept == list(range(12, 20))
+    assert not (tmp_path / "trace.jsonl.4").exists()
+
+
+def test_percentile():
+
+    values = [float(i) for i in range(1, 101)]
+
+    assert _percentile(values, 50) == 50
+    assert _percentile(values, 99) == 99
+    assert _percentile([3.0], 90) == 3
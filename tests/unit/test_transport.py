@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from spoticli.lib import transport
+from spoticli.lib.cache import HTTPCache
+
+MARKETS = ["AD", "AE", "AG"]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_prune(indent):
+
+    doc = {
+        "available_markets": MARKETS,
+        "items": [
+            {"name": "September", "available_markets": MARKETS, "uri": "a"},
+            {"name": "Tab", "available_markets": MARKETS},
+        ],
+        "description": '"available_markets": []',
+    }
+
+    pruned = transport.prune(json.dumps(doc, indent=indent).encode())
+
+    assert transport.decode_json(pruned) == {
+        "items": [{"name": "September", "uri": "a"}, {"name": "Tab"}],
+        "description": '"available_markets": []',
+    }
+
+
+def test_decoded_response():
+
+    response = transport.DecodedResponse()
+    response._content = b'{"album": {"available_markets": ["AD"], "name": "x"}}'
+    assert response.json() == {"album": {"name": "x"}}
+
+    response._content = b""
+    with pytest.raises(ValueError):
+        response.json()
+
+
+@pytest.fixture
+def server(serve):
+    requests_seen = []
+
+    def respond(handler):
+        etag = handler.headers.get("If-None-Match")
+        requests_seen.append((handler.path, etag))
+        if etag == '"v1"':
+            handler.send_response(304)
+            handler.end_headers()
+            return
+        body = b'{"name": "September"}'
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        if handler.path.startswith(("/v1/playlists", "/v1/me/playlists")):
+            handler.send_header("ETag", '"v1"')
+        elif handler.path.startswith("/v1/tracks"):
+            handler.send_header("Cache-Control", "public, max-age=60")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    return serve(respond), requests_seen
+
+
+def test_conditional_requests(server, tmp_path):
+
+    prefix, requests_seen = server
+    session = transport.SpotiCLISession(http_cache=HTTPCache(tmp_path / "http.db"))
+
+    for _ in range(2):
+        response = session.request("GET", prefix + "playlists/1", params={"a": 1})
+        assert response.json() == {"name": "September"}
+    assert response.from_cache
+    assert requests_seen == [
+        ("/v1/playlists/1?a=1", None),
+        ("/v1/playlists/1?a=1", '"v1"'),
+    ]
+
+    requests_seen.clear()
+    for _ in range(2):
+        assert session.request("GET", prefix + "tracks/1").json()["name"] == "September"
+        assert (
+            session.request("GET", prefix + "me/player").json()["name"] == "September"
+        )
+    # the fresh track isn't requested again, but playback state always is.
+    assert [path for path, _ in requests_seen] == [
+        "/v1/tracks/1",
+        "/v1/me/player",
+        "/v1/me/player",
+    ]
+
+
+def test_user_responses_are_cached_per_token(server, tmp_path):
+
+    prefix, requests_seen = server
+    session = transport.SpotiCLISession(http_cache=HTTPCache(tmp_path / "http.db"))
+
+    for token in ("a", "b", "a"):
+        session.request(
+            "GET", prefix + "me/playlists", headers={"Authorization": f"Bearer {token}"}
+        )
+    # another account's playlists aren't served from the first one's entry.
+    assert requests_seen == [("/v1/me/playlists", None)] * 2 + [
+        ("/v1/me/playlists", '"v1"')
+    ]
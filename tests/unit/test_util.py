@@ -9,7 +9,7 @@ from spoticli.commands.search import (
     parse_playlist_search,
     parse_track_search,
 )
-from spoticli.commands.seek import convert_timestamp
+from spoticli.commands.seek import convert_offset, convert_timestamp
 from spoticli.lib.exceptions import InvalidURL
 from spoticli.lib.util import (
     check_url_format,
@@ -431,3 +431,13 @@ def test_check_url_format_invalid():
 
     with pytest.raises(InvalidURL):
         check_url_format(url_2)
+
+
+def test_convert_offset():
+
+    assert convert_offset("+15") == 15000
+    assert convert_offset("-10") == -10000
+    assert convert_offset("+1:05") == 65000
+
+    with pytest.raises(ValueError):
+        convert_offset("+ten")
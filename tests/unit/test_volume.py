@@ -0,0 +1,123 @@
+import threading
+from functools import partial
+
+import pytest
+
+from spoticli.commands import volume
+from spoticli.lib import state
+from spoticli.lib.state import file_lock
+
+
+class Device:
+    def __init__(self, on_volume=None):
+        self.volumes = []
+        self.on_volume = on_volume
+
+    def volume(self, volume_percent, device_id=None):
+        if self.on_volume:
+            self.on_volume()
+        self.volumes.append(volume_percent)
+
+
+@pytest.fixture
+def playback_state(tmp_path, monkeypatch):
+    path = tmp_path / "playback.json"
+    monkeypatch.setattr(volume, "VOLUME_STATE", tmp_path / "volume.json")
+    monkeypatch.setattr(
+        volume, "load_cached_volume", partial(state.load_cached_volume, path)
+    )
+    monkeypatch.setattr(
+        volume, "record_volume", partial(state.record_volume, path=path)
+    )
+    state.record_volume(50, path)
+    return path
+
+
+def test_coalesces_burst(playback_state):
+
+    device = Device()
+    presses = [
+        threading.Thread(target=change, args=(amount, None, device))
+        for change, amount in [
+            (volume.increase_volume, 10),
+            (volume.increase_volume, 10),
+            (volume.decrease_volume, 5),
+        ]
+    ]
+    for press in presses:
+        press.start()
+    for press in presses:
+        press.join()
+
+    assert device.volumes == [65]
+    assert state.load_cached_volume(playback_state) == 65
+
+
+def test_change_during_request_starts_from_new_volume(playback_state):
+    def press_again():
+        # another change arrives while the first burst's request is in flight.
+        device.on_volume = None
+        volume.increase_volume(10, None, device)
+
+    device = Device(on_volume=press_again)
+    volume.increase_volume(10, None, device)
+
+    assert device.volumes == [70, 60]
+    assert state.load_cached_volume(playback_state) == 70
+
+
+def test_failed_request_rolls_back(playback_state):
+    def fail():
+        raise ConnectionError()
+
+    with pytest.raises(ConnectionError):
+        volume.increase_volume(10, None, Device(on_volume=fail))
+
+    assert state.load_cached_volume(playback_state) == 50
+
+
+def test_previous_volume_is_read_outside_lock(playback_state, monkeypatch):
+    def get_previous_volume(sp_auth):
+        # fails if a change is holding the lock while this asks Spotify.
+        with file_lock(volume.VOLUME_STATE, timeout=0):
+            return 50
+
+    monkeypatch.setattr(volume, "_get_previous_volume", get_previous_volume)
+    device = Device()
+    volume.increase_volume(10, None, device)
+
+    assert device.volumes == [60]
+
+
+@pytest.mark.parametrize("start, amount, expected", [(95, 10, 100), (5, -10, 0)])
+def test_clamps(playback_state, start, amount, expected):
+
+    state.record_volume(start, playback_state)
+    device = Device()
+    volume.increase_volume(amount, None, device)
+
+    assert device.volumes == [expected]
+
+
+@pytest.mark.parametrize(
+    "target, duration, expected",
+    [
+        (60, 0, [60]),
+        (60, 2, [52, 55, 58, 60]),
+        (40, 10, [49, 48, 47, 46, 45, 44, 43, 42, 41, 40]),
+    ],
+)
+def test_fade_steps(playback_state, monkeypatch, target, duration, expected):
+
+    monkeypatch.setattr(volume.time, "sleep", lambda seconds: None)
+    device = Device()
+    volume.fade_volume(target, duration, None, device)
+
+    assert device.volumes == expected
+
+
+def test_parse_duration():
+
+    assert volume.parse_duration(None, None, "500ms") == 0.5
+    assert volume.parse_duration(None, None, "2m") == 120
+    assert volume.parse_duration(None, None, "10") == 10